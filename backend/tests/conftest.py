@@ -0,0 +1,34 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+@pytest.fixture(scope="session")
+def client(tmp_path_factory):
+    # The app resolves storage/, frontend/ and alembic.ini from the working directory
+    workdir = tmp_path_factory.mktemp("trip")
+    (workdir / "frontend").mkdir()
+    (workdir / "frontend" / "index.html").write_text("")
+    (workdir / "alembic.ini").symlink_to(BACKEND_DIR / "alembic.ini")
+    (workdir / "trip").symlink_to(BACKEND_DIR / "trip")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+
+    from fastapi.testclient import TestClient
+
+    from trip.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+    os.chdir(cwd)
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    response = client.post("/api/auth/register", json={"username": "alice", "password": "password123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,28 @@
+import os
+import time
+from io import BytesIO
+
+from PIL import Image
+
+
+def _png() -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (32, 32), "red").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_image_pool_recovers_from_a_dead_worker(client):
+    from trip.utils import images
+
+    # A worker dying mid-job (os._exit, as an OOM kill would) breaks the executor
+    pool, future = images._submit(os._exit, 1)
+    future.exception(timeout=30)
+    filename, size = images.process_image(_png(), 16)
+    assert filename and size > 0
+    assert images.get_image_pool() is not pool
+
+    # Same when the failed job's result is awaited first
+    job = images._submit(os._exit, 1)
+    assert images._image_result(job, time.monotonic() + 30) == ("", 0)
+    filename, size = images.process_image(_png(), 16)
+    assert filename and size > 0
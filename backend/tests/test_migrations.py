@@ -0,0 +1,25 @@
+import pytest
+from fastapi import HTTPException
+from sqlmodel import Session, delete
+
+
+def test_013_keeps_legacy_plaintext_api_tokens(client):
+    from trip.db.core import get_engine
+    from trip.db.migrations import run_migrations
+    from trip.models.models import DataMigration, User
+    from trip.security import api_token_to_user, hash_password, ph
+
+    with Session(get_engine()) as session:
+        session.exec(delete(DataMigration).where(DataMigration.name == "013_revoke_unindexed_api_tokens"))
+        # From before 007: plaintext; from between 007 and the lookup key: argon2 only
+        password = hash_password("password123")
+        session.add(User(username="plain", password=password, api_token="plain-token"))
+        session.add(User(username="hashed", password=password, api_token=ph.hash("old-token")))
+        session.commit()
+
+        run_migrations(session)
+
+        assert api_token_to_user(session, "plain-token").username == "plain"
+        assert session.get(User, "hashed").api_token is None
+        with pytest.raises(HTTPException):
+            api_token_to_user(session, "old-token")
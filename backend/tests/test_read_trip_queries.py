@@ -0,0 +1,44 @@
+import re
+
+
+def _db_count(response) -> int:
+    return int(re.search(r"db-count;desc=(\d+)", response.headers["server-timing"]).group(1))
+
+
+def _create_trip(client, headers, days: int, items_per_day: int) -> int:
+    category_id = client.get("/api/categories", headers=headers).json()[0]["id"]
+    place_ids = [
+        client.post(
+            "/api/places",
+            headers=headers,
+            json={"name": f"P{i}", "lat": 1.0 + i, "lng": 2.0, "place": "P", "category_id": category_id},
+        ).json()["id"]
+        for i in range(min(items_per_day * days, 30))
+    ]
+    trip_id = client.post("/api/trips", headers=headers, json={"name": "T"}).json()["id"]
+    client.put(f"/api/trips/{trip_id}", headers=headers, json={"place_ids": place_ids})
+    for d in range(days):
+        day_json = {"label": f"D{d}", "dt": f"2026-01-{d + 1:02}"}
+        day = client.post(f"/api/trips/{trip_id}/days", headers=headers, json=day_json).json()
+        for i in range(items_per_day):
+            place_id = place_ids[(d * items_per_day + i) % len(place_ids)]
+            response = client.post(
+                f"/api/trips/{trip_id}/days/{day['id']}/items",
+                headers=headers,
+                json={"text": f"item {i}", "time": "10:00", "place": place_id},
+            )
+            assert response.status_code == 200, response.text
+    return trip_id
+
+
+def test_read_trip_query_count_does_not_grow(client, auth_headers):
+    # Relationships are loaded per level (see db/loaders.py), never per day or item
+    small = _create_trip(client, auth_headers, days=1, items_per_day=1)
+    large = _create_trip(client, auth_headers, days=10, items_per_day=30)
+
+    small_read = client.get(f"/api/trips/{small}", headers=auth_headers)
+    large_read = client.get(f"/api/trips/{large}", headers=auth_headers)
+    assert small_read.status_code == large_read.status_code == 200
+    assert sum(len(day["items"]) for day in large_read.json()["days"]) == 300
+
+    assert _db_count(large_read) == _db_count(small_read)
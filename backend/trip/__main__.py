@@ -0,0 +1,30 @@
+import argparse
+import asyncio
+import os
+
+import uvicorn
+
+from .config import get_settings
+from .main import BOOTSTRAPPED_ENV, bootstrap
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m trip", description="Run the TRIP server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=get_settings().WORKERS)
+    args = parser.parse_args()
+
+    asyncio.run(bootstrap())
+    os.environ[BOOTSTRAPPED_ENV] = "1"  # inherited by the workers
+    uvicorn.run(
+        "trip.main:app",
+        host=args.host,
+        port=args.port,
+        workers=max(1, args.workers),
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,12 @@ from trip.models.models import *  # noqa
 
 target_metadata = SQLModel.metadata  # noqa
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    # place_rtree and its shadow tables are managed by hand, see 8c2e4a6f1b39
+    return not (type_ == "table" and name.startswith("place_rtree"))
+
+
 config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name, disable_existing_loggers=False)
@@ -20,6 +26,7 @@ def run_migrations_offline():
         literal_binds=True,
         transactional_ddl=True,
         compare_type=True,
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -35,6 +42,7 @@ def run_migrations_online():
             target_metadata=target_metadata,
             render_as_batch=True,
             transactional_ddl=True,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,28 @@
+"""Backup incremental
+
+Revision ID: 2d8a4c6e0f13
+Revises: 5e1f7c3a9d60
+Create Date: 2026-10-17 12:41:05.882316
+
+"""
+
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "2d8a4c6e0f13"
+down_revision = "5e1f7c3a9d60"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("backup", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("incremental", sa.Boolean(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("backup", schema=None) as batch_op:
+        batch_op.drop_column("incremental")
@@ -0,0 +1,44 @@
+"""GPX track store
+
+Revision ID: 3d9f1b7e5a42
+Revises: 8c2e4a6f1b39
+Create Date: 2026-10-17 17:42:09.318264
+
+"""
+
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3d9f1b7e5a42"
+down_revision = "8c2e4a6f1b39"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # place.gpx and tripitem.gpx keep their column: data migration 010 swaps
+    # the GPX documents they hold for the digest of their stored track
+    op.create_table(
+        "gpxtrack",
+        sa.Column("digest", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("point_count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("digest", name=op.f("pk_gpxtrack")),
+    )
+    op.create_table(
+        "gpxtrackdata",
+        sa.Column("digest", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.Column("points", sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["digest"], ["gpxtrack.digest"], name=op.f("fk_gpxtrackdata_digest_gpxtrack"), ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("digest", name=op.f("pk_gpxtrackdata")),
+    )
+
+
+def downgrade():
+    op.drop_table("gpxtrackdata")
+    op.drop_table("gpxtrack")
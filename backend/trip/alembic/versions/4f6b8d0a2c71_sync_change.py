@@ -0,0 +1,42 @@
+"""Sync change
+
+Revision ID: 4f6b8d0a2c71
+Revises: 7a1c9e3b5d28
+Create Date: 2026-10-17 15:08:12.604381
+
+"""
+
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "4f6b8d0a2c71"
+down_revision = "7a1c9e3b5d28"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "syncchange",
+        sa.Column("user", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("kind", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("object_id", sa.Integer(), nullable=False),
+        sa.Column("seq", sa.Integer(), nullable=False),
+        sa.Column("deleted", sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["user"], ["user.username"], name=op.f("fk_syncchange_user_user"), ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("user", "kind", "object_id", name=op.f("pk_syncchange")),
+    )
+    with op.batch_alter_table("syncchange", schema=None) as batch_op:
+        batch_op.create_index("idx_syncchange_user_seq", ["user", "seq"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("syncchange", schema=None) as batch_op:
+        batch_op.drop_index("idx_syncchange_user_seq")
+
+    op.drop_table("syncchange")
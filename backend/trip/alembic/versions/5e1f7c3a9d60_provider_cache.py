@@ -0,0 +1,41 @@
+"""Provider cache
+
+Revision ID: 5e1f7c3a9d60
+Revises: 9b3d5e7f1a24
+Create Date: 2026-10-17 11:26:40.107615
+
+"""
+
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5e1f7c3a9d60"
+down_revision = "9b3d5e7f1a24"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "providercache",
+        sa.Column("key", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("kind", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("value", sa.JSON(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("last_hit", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("key", name=op.f("pk_providercache")),
+    )
+    with op.batch_alter_table("providercache", schema=None) as batch_op:
+        batch_op.create_index(batch_op.f("ix_providercache_expires_at"), ["expires_at"], unique=False)
+        batch_op.create_index(batch_op.f("ix_providercache_last_hit"), ["last_hit"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("providercache", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_providercache_last_hit"))
+        batch_op.drop_index(batch_op.f("ix_providercache_expires_at"))
+
+    op.drop_table("providercache")
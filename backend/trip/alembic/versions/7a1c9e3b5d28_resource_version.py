@@ -0,0 +1,31 @@
+"""Resource version
+
+Revision ID: 7a1c9e3b5d28
+Revises: 2d8a4c6e0f13
+Create Date: 2026-10-17 14:22:37.410952
+
+"""
+
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "7a1c9e3b5d28"
+down_revision = "2d8a4c6e0f13"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "resourceversion",
+        sa.Column("scope", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("scope", name=op.f("pk_resourceversion")),
+    )
+
+
+def downgrade():
+    op.drop_table("resourceversion")
@@ -0,0 +1,50 @@
+"""Place rtree
+
+Revision ID: 8c2e4a6f1b39
+Revises: 4f6b8d0a2c71
+Create Date: 2026-10-17 16:31:48.215037
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8c2e4a6f1b39"
+down_revision = "4f6b8d0a2c71"
+branch_labels = None
+depends_on = None
+
+# Triggers live on the place table: a later batch_alter_table("place") copies the
+# table and drops them, such a migration has to run PLACE_RTREE_TRIGGERS again.
+PLACE_RTREE_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS place_rtree_insert AFTER INSERT ON place BEGIN
+        INSERT OR REPLACE INTO place_rtree VALUES (new.id, new.lat, new.lat, new.lng, new.lng);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS place_rtree_update AFTER UPDATE OF lat, lng ON place BEGIN
+        UPDATE place_rtree
+        SET min_lat = new.lat, max_lat = new.lat, min_lng = new.lng, max_lng = new.lng
+        WHERE id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS place_rtree_delete AFTER DELETE ON place BEGIN
+        DELETE FROM place_rtree WHERE id = old.id;
+    END
+    """,
+)
+
+
+def upgrade():
+    op.execute("CREATE VIRTUAL TABLE place_rtree USING rtree(id, min_lat, max_lat, min_lng, max_lng)")
+    op.execute("INSERT INTO place_rtree SELECT id, lat, lat, lng, lng FROM place")
+    for trigger in PLACE_RTREE_TRIGGERS:
+        op.execute(trigger)
+
+
+def downgrade():
+    for trigger in ("place_rtree_insert", "place_rtree_update", "place_rtree_delete"):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE place_rtree")
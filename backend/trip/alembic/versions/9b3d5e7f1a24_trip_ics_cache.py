@@ -0,0 +1,36 @@
+"""Trip ICS cache
+
+Revision ID: 9b3d5e7f1a24
+Revises: c4e8a2f71d95
+Create Date: 2026-10-17 10:04:12.553190
+
+"""
+
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9b3d5e7f1a24"
+down_revision = "c4e8a2f71d95"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "tripicscache",
+        sa.Column("trip_id", sa.Integer(), nullable=False),
+        sa.Column("etag", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("body", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("rendered_on", sa.Date(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["trip_id"], ["trip.id"], name=op.f("fk_tripicscache_trip_id_trip"), ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("trip_id", name=op.f("pk_tripicscache")),
+    )
+
+
+def downgrade():
+    op.drop_table("tripicscache")
@@ -0,0 +1,44 @@
+"""GPX track stats
+
+Revision ID: b5e27c9d4f16
+Revises: 3d9f1b7e5a42
+Create Date: 2026-10-17 18:55:37.902144
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b5e27c9d4f16"
+down_revision = "3d9f1b7e5a42"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled for existing tracks by data migration 012
+    with op.batch_alter_table("gpxtrack", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("distance", sa.Float(), nullable=False, server_default="0"))
+        batch_op.add_column(sa.Column("elevation_gain", sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column("elevation_loss", sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column("min_lat", sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column("max_lat", sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column("min_lng", sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column("max_lng", sa.Float(), nullable=True))
+        batch_op.create_index(batch_op.f("ix_gpxtrack_distance"), ["distance"], unique=False)
+        batch_op.create_index(batch_op.f("ix_gpxtrack_elevation_gain"), ["elevation_gain"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("gpxtrack", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_gpxtrack_elevation_gain"))
+        batch_op.drop_index(batch_op.f("ix_gpxtrack_distance"))
+        batch_op.drop_column("max_lng")
+        batch_op.drop_column("min_lng")
+        batch_op.drop_column("max_lat")
+        batch_op.drop_column("min_lat")
+        batch_op.drop_column("elevation_loss")
+        batch_op.drop_column("elevation_gain")
+        batch_op.drop_column("distance")
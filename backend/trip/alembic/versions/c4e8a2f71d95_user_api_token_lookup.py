@@ -0,0 +1,29 @@
+"""User api_token lookup
+
+Revision ID: c4e8a2f71d95
+Revises: f2a4b6c9d1e3
+Create Date: 2026-10-17 09:12:47.318204
+
+"""
+
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c4e8a2f71d95"
+down_revision = "f2a4b6c9d1e3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("user", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("api_token_lookup", sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+        batch_op.create_index(batch_op.f("ix_user_api_token_lookup"), ["api_token_lookup"], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table("user", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_user_api_token_lookup"))
+        batch_op.drop_column("api_token_lookup")
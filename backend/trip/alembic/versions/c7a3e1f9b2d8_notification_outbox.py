@@ -0,0 +1,61 @@
+"""Notification outbox
+
+Revision ID: c7a3e1f9b2d8
+Revises: b5e27c9d4f16
+Create Date: 2026-10-17 21:08:14.530271
+
+"""
+
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c7a3e1f9b2d8"
+down_revision = "b5e27c9d4f16"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "notificationoutbox",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("source", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("due_at", sa.DateTime(), nullable=False),
+        sa.Column("title", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("body", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("status", sa.Enum("PENDING", "FAILED", name="notificationstatus"), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+        sa.Column("last_error", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["user"], ["user.username"], name=op.f("fk_notificationoutbox_user_user"), ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_notificationoutbox")),
+        sa.UniqueConstraint("user", "source", "due_at", name="uq_notificationoutbox_user_source_due_at"),
+    )
+    with op.batch_alter_table("notificationoutbox", schema=None) as batch_op:
+        batch_op.create_index(
+            "idx_notificationoutbox_status_next_attempt_at", ["status", "next_attempt_at"], unique=False
+        )
+
+    # No cursor row yet: the first scan starts from boot time, reminders already
+    # handled by the in-memory loop are not sent again
+    op.create_table(
+        "notificationcursor",
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("until", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("name", name=op.f("pk_notificationcursor")),
+    )
+
+
+def downgrade():
+    op.drop_table("notificationcursor")
+
+    with op.batch_alter_table("notificationoutbox", schema=None) as batch_op:
+        batch_op.drop_index("idx_notificationoutbox_status_next_attempt_at")
+
+    op.drop_table("notificationoutbox")
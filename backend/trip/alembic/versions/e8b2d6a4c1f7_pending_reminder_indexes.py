@@ -0,0 +1,44 @@
+"""Pending reminder indexes
+
+Revision ID: e8b2d6a4c1f7
+Revises: c7a3e1f9b2d8
+Create Date: 2026-10-17 22:41:53.118406
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e8b2d6a4c1f7"
+down_revision = "c7a3e1f9b2d8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Partial: checked reminders never come due, so they stay out of the index
+    with op.batch_alter_table("tripchecklistitem", schema=None) as batch_op:
+        batch_op.create_index(
+            "idx_tripchecklistitem_pending_notify_dt",
+            ["notify_dt"],
+            unique=False,
+            sqlite_where=sa.text("checked IS NOT 1"),
+        )
+
+    with op.batch_alter_table("tripchecklistentry", schema=None) as batch_op:
+        batch_op.create_index(
+            "idx_tripchecklistentry_pending_notify_dt",
+            ["notify_dt"],
+            unique=False,
+            sqlite_where=sa.text("checked IS NOT 1"),
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("tripchecklistentry", schema=None) as batch_op:
+        batch_op.drop_index("idx_tripchecklistentry_pending_notify_dt")
+
+    with op.batch_alter_table("tripchecklistitem", schema=None) as batch_op:
+        batch_op.drop_index("idx_tripchecklistitem_pending_notify_dt")
@@ -0,0 +1,32 @@
+"""Jobs lease
+
+Revision ID: f3c9a7e5d2b1
+Revises: e8b2d6a4c1f7
+Create Date: 2026-10-17 23:37:05.642918
+
+"""
+
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f3c9a7e5d2b1"
+down_revision = "e8b2d6a4c1f7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "lease",
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("holder", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("name", name=op.f("pk_lease")),
+    )
+
+
+def downgrade():
+    op.drop_table("lease")
@@ -15,6 +15,7 @@ CONFIG_FILE = Path("storage/config.env")
 # Marker returned in place of the real OIDC client secret on read, and treated
 # as "unchanged" (i.e. dropped from the update) when received on write.
 OIDC_CLIENT_SECRET_MASK = "********"
+OIDC_SETTINGS = ("OIDC_DISCOVERY_URL", "OIDC_CLIENT_ID", "OIDC_CLIENT_SECRET", "OIDC_REDIRECT_URI")
 
 
 class Settings(BaseSettings):
@@ -28,6 +29,9 @@ class Settings(BaseSettings):
     ASSETS_URL: str = "/api/assets"
     PLACE_IMAGE_SIZE: int = 500
     TRIP_IMAGE_SIZE: int = 600
+    IMAGE_WORKERS: int = 4
+    IMAGE_JOB_TIMEOUT: int = 30
+    IMAGE_VARIANTS_FOLDER: str = "storage/cache/variants"
     ATTACHMENTS_FOLDER: str = "storage/attachments"
     ATTACHMENT_MAX_SIZE: int = 10 * 1024 * 1024  # 10MB
     BACKUPS_FOLDER: str = "storage/backups"
@@ -35,6 +39,10 @@ class Settings(BaseSettings):
     BACKUP_IMPORT_MAX_TOTAL_SIZE: int = 500 * 1024 * 1024  # 500MB
     KML_MAX_ENTRY_SIZE: int = 50 * 1024 * 1024  # 50MB
     PROVIDER_IMPORT_MAX_SIZE: int = 20 * 1024 * 1024  # 20MB
+    PROVIDER_CACHE_MAX_ENTRIES: int = 20000
+    NOTIFY_WORKERS: int = 4
+    METRICS_SLOW_QUERY_MS: int = 100
+    WORKERS: int = 1
 
     SECRET_KEY: str = ""
     ALGORITHM: str = "HS256"
@@ -112,8 +120,7 @@ def update_config(updates: dict) -> Settings:
     CONFIG_FILE.parent.mkdir(parents=True, exist_ok=True)
     CONFIG_FILE.write_text("\n".join(lines) + "\n")
 
-    oidc_keys = {"OIDC_DISCOVERY_URL", "OIDC_CLIENT_ID", "OIDC_CLIENT_SECRET", "OIDC_REDIRECT_URI"}
-    if oidc_keys & updates.keys():
+    if updates.keys() & set(OIDC_SETTINGS):
         # deferred import: security.py imports get_settings from this module,
         # so a top-level import here would create a circular import
         from .security import invalidate_oidc_cache
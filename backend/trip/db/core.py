@@ -5,13 +5,16 @@ from alembic import command
 from alembic.config import Config
 from sqlalchemy import event, text
 from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel import Session, create_engine
 
 from ..config import get_settings
 from ..models.models import Category
+from ..utils.metrics import instrument_engine
 from .migrations import run_migrations
 
 _engine = None
+_async_engine = None
 
 
 def _db_needs_stamp(engine: Engine) -> bool:
@@ -29,9 +32,27 @@ def get_engine():
             f"sqlite:///{get_settings().SQLITE_FILE}",
             connect_args={"check_same_thread": False},
         )
+        instrument_engine(_engine)
     return _engine
 
 
+def get_async_engine() -> AsyncEngine:
+    # The same database through aiosqlite, for async handlers: statements run on the
+    # driver thread, so the event loop keeps serving other requests meanwhile
+    global _async_engine
+    if not _async_engine:
+        _async_engine = create_async_engine(f"sqlite+aiosqlite:///{get_settings().SQLITE_FILE}")
+        instrument_engine(_async_engine.sync_engine)
+    return _async_engine
+
+
+async def dispose_async_engine():
+    global _async_engine
+    if _async_engine:
+        await _async_engine.dispose()
+        _async_engine = None
+
+
 @event.listens_for(Engine, "connect")
 def set_sqlite_pragma(dbapi_connection, connection_record):
     cursor = dbapi_connection.cursor()
@@ -0,0 +1,42 @@
+from sqlalchemy.orm import selectinload
+
+from ..models.models import (Category, Place, Trip, TripBooking, TripDay,
+                             TripItem)
+
+
+def place_graph_options() -> tuple:
+    # Everything PlaceRead.serialize touches, trip_count included.
+    return (
+        selectinload(Place.category).selectinload(Category.image),
+        selectinload(Place.image),
+        selectinload(Place.trips),
+        selectinload(Place.gpx_track),
+    )
+
+
+def item_graph_options() -> tuple:
+    # Everything TripItemRead.serialize touches.
+    return (
+        selectinload(TripItem.place).options(*place_graph_options()),
+        selectinload(TripItem.image),
+        selectinload(TripItem.images),
+        selectinload(TripItem.attachments),
+        selectinload(TripItem.gpx_track),
+    )
+
+
+def trip_graph_options() -> tuple:
+    # The complete relationship tree walked by TripRead/TripShareRead.serialize.
+    # Every level is a selectinload, so a trip costs a fixed number of statements
+    # however many days/items/places it holds. Keep in sync with the serializers.
+    return (
+        selectinload(Trip.image),
+        selectinload(Trip.memberships),
+        selectinload(Trip.shares),
+        selectinload(Trip.attachments),
+        selectinload(Trip.places).options(*place_graph_options()),
+        selectinload(Trip.days).options(
+            selectinload(TripDay.items).options(*item_graph_options()),
+            selectinload(TripDay.bookings).selectinload(TripBooking.attachments),
+        ),
+    )
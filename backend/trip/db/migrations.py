@@ -1,47 +1,181 @@
+import hashlib
 import logging
+import os
+import secrets
+import shutil
+import zlib
 from collections.abc import Callable
 from pathlib import Path
 
+from sqlalchemy import delete, union, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlmodel import Session, select
 
 from ..config import get_settings
-from ..models.models import (Backup, BackupStatus, DataMigration, Image,
-                             TripItem, TripItemImageLink, User)
-from ..security import hash_api_token
-from ..utils.utils import backup_file
+from ..models.models import (DATABASE_SCOPE, DataMigration, GpxTrack,
+                             GpxTrackData, Image, Place, ResourceVersion,
+                             TripItem, TripItemImageLink, User,
+                             store_gpx_track)
+from ..security import api_token_lookup, hash_api_token
+from ..utils.gpx import parse_track
+from ..utils.utils import (backup_file, image_variants_folder_path,
+                           remove_image)
 
 logger = logging.getLogger(__name__)
 
 
-def _007_hash_legacy_api_tokens(session: Session):
-    users = session.exec(select(User).where(User.api_token.is_not(None))).all()
-    legacy = [user for user in users if not user.api_token.startswith("$argon2")]
-    if not legacy:
+def _015_rename_image_variants(session: Session):
+    # Variants were named after the image stem before 015, x.jpg and x.png shared theirs.
+    # They are a cache: drop them, they are rebuilt under the new name on first request
+    shutil.rmtree(image_variants_folder_path(), ignore_errors=True)
+
+
+def _014_database_nonce(session: Session):
+    # New databases, and those from before 014, get the random DATABASE_SCOPE value
+    session.exec(
+        sqlite_insert(ResourceVersion)
+        .values(scope=DATABASE_SCOPE, version=secrets.randbits(62))
+        .on_conflict_do_nothing()
+    )
+    session.commit()
+
+
+def _013_revoke_unindexed_api_tokens(session: Session):
+    # Argon2-hashed tokens can't be turned back into their lookup key, and verifying
+    # them one by one on every lookup is what the key is there to avoid: they are
+    # revoked, their owners generate a new one in the settings. Legacy plaintext
+    # tokens are kept: 007 hashes them with their lookup key.
+    users = session.exec(
+        select(User).where(User.api_token.startswith("$argon2"), User.api_token_lookup.is_(None))
+    ).all()
+    if not users:
         return
 
-    for user in legacy:
-        user.api_token = hash_api_token(user.api_token)
+    for user in users:
+        user.api_token = None
         session.add(user)
     session.commit()
     logger.warning(
-        f"[Migration 007_hash_legacy_api_tokens] Hashed {len(legacy)} legacy plaintext api_token(s)"
+        f"[Migration 013_revoke_unindexed_api_tokens] Revoked {len(users)} api_token(s) without a lookup key, "
+        "their owners must generate a new one"
     )
 
 
-def _005_reap_stuck_backups(session: Session):
-    stuck_backups = session.exec(
-        select(Backup).where(Backup.status.in_([BackupStatus.PENDING, BackupStatus.PROCESSING]))
+def _012_gpx_track_stats(session: Session):
+    # Track statistics are computed on write since 012: fill them for the stored tracks
+    digests = session.exec(
+        select(GpxTrack.digest).where(GpxTrack.point_count > 0, GpxTrack.min_lat.is_(None))
     ).all()
-    if not stuck_backups:
+    for index, digest in enumerate(digests, 1):
+        track_data = session.get(GpxTrackData, digest)
+        _, stats = parse_track(zlib.decompress(track_data.data).decode())
+        session.exec(update(GpxTrack).where(GpxTrack.digest == digest).values(**stats._asdict()))
+        session.expunge(track_data)
+        if index % 100 == 0:
+            session.commit()
+    if digests:
+        session.commit()
+        logger.warning(f"[Migration 012_gpx_track_stats] Computed statistics of {len(digests)} GPX tracks")
+
+
+def _010_gpx_track_store(session: Session):
+    # GPX documents move from place.gpx / tripitem.gpx to the track store, the
+    # columns keep the track digest
+    pending = 0
+    for model in (Place, TripItem):
+        ids = session.exec(select(model.id).where(model.gpx.op("NOT GLOB")("[0-9a-f]" * 64))).all()
+        for object_id in ids:
+            obj = session.get(model, object_id)
+            obj.gpx = store_gpx_track(session, obj.gpx)
+            session.add(obj)
+            pending += 1
+            if pending % 100 == 0:
+                session.commit()
+                session.expunge_all()
+    if pending:
+        session.commit()
+        logger.warning(f"[Migration 010_gpx_track_store] Moved {pending} GPX tracks to the track store")
+
+
+def _011_remove_orphan_gpx_tracks(session: Session):
+    # Tracks are shared by digest, so deleting a place or an item leaves its track
+    # behind: drop the ones nothing references anymore
+    referenced = union(
+        select(Place.gpx).where(Place.gpx.is_not(None)), select(TripItem.gpx).where(TripItem.gpx.is_not(None))
+    )
+    orphans = session.exec(select(GpxTrack.digest).where(GpxTrack.digest.not_in(referenced))).all()
+    if not orphans:
         return
 
-    for backup in stuck_backups:
-        backup.status = BackupStatus.FAILED
-        backup.error_message = "Backup was interrupted by a server restart"
-        session.add(backup)
+    session.exec(delete(GpxTrack).where(GpxTrack.digest.in_(orphans)))
     session.commit()
+    logger.warning(f"[Migration 011_remove_orphan_gpx_tracks] Removed {len(orphans)} orphan GPX tracks")
+
+
+def _009_content_addressed_images(session: Session):
+    # Images are stored as <sha256>.<ext> and shared across Image rows since 009:
+    # rename existing files and point duplicate rows at a single copy
+    images = session.exec(select(Image)).all()
+    if not images:
+        return
+
+    assets = Path(get_settings().ASSETS_FOLDER)
+    renamed: dict[str, str] = {}
+    for filename in {image.filename for image in images}:
+        fp = assets / filename
+        if not fp.is_file():
+            continue
+        with fp.open("rb") as f:
+            target = f"{hashlib.file_digest(f, 'sha256').hexdigest()}{fp.suffix.lower()}"
+        if target != filename:
+            renamed[filename] = target
+    if not renamed:
+        return
+
+    dst = backup_file(Path(get_settings().SQLITE_FILE))
+    logger.warning(f"[Migration 009_content_addressed_images] Database backed up to {dst} before changes")
+
+    # Link, commit, then unlink: an interrupted run leaves orphans for
+    # _002_remove_orphan_image, never an Image row without its file
+    targets = set(renamed.values())
+    bytes_before = sum((assets / filename).stat().st_size for filename in renamed)
+    bytes_before += sum((assets / target).stat().st_size for target in targets if (assets / target).exists())
+    for filename, target in renamed.items():
+        if (assets / target).exists():
+            continue
+        try:
+            os.link(assets / filename, assets / target)
+        except OSError:
+            shutil.copyfile(assets / filename, assets / target)
+
+    for image in images:
+        if image.filename in renamed:
+            image.filename = renamed[image.filename]
+            session.add(image)
+    session.commit()
+
+    for filename in renamed:
+        remove_image(filename)
+    reclaimed = bytes_before - sum((assets / target).stat().st_size for target in targets)
     logger.warning(
-        f"[Migration 005_reap_stuck_backups] Marked {len(stuck_backups)} stuck backup(s) as failed"
+        f"[Migration 009_content_addressed_images] Renamed {len(renamed)} image file(s) into {len(targets)} "
+        f"content-addressed file(s), reclaimed {reclaimed} bytes"
+    )
+
+
+def _007_hash_legacy_api_tokens(session: Session):
+    users = session.exec(select(User).where(User.api_token.is_not(None))).all()
+    legacy = [user for user in users if not user.api_token.startswith("$argon2")]
+    if not legacy:
+        return
+
+    for user in legacy:
+        user.api_token_lookup = api_token_lookup(user.api_token)
+        user.api_token = hash_api_token(user.api_token)
+        session.add(user)
+    session.commit()
+    logger.warning(
+        f"[Migration 007_hash_legacy_api_tokens] Hashed {len(legacy)} legacy plaintext api_token(s)"
     )
 
 
@@ -157,6 +291,11 @@ def _001_image_file_size(session: Session):
 _ONCE_MIGRATIONS: list[tuple[str, Callable[[Session], None]]] = [
     ("001_image_file_size", _001_image_file_size),
     ("006_backfill_tripitem_images", _006_backfill_tripitem_images),
+    ("009_content_addressed_images", _009_content_addressed_images),
+    ("010_gpx_track_store", _010_gpx_track_store),
+    ("012_gpx_track_stats", _012_gpx_track_stats),
+    ("013_revoke_unindexed_api_tokens", _013_revoke_unindexed_api_tokens),
+    ("015_rename_image_variants", _015_rename_image_variants),
 ]
 
 
@@ -174,5 +313,6 @@ def run_migrations(session: Session):
     _002_remove_orphan_image(session)
     _003_set_admin_for_single_user(session)
     _004_bootstrap_admin_from_env(session)
-    _005_reap_stuck_backups(session)
     _007_hash_legacy_api_tokens(session)
+    _011_remove_orphan_gpx_tracks(session)
+    _014_database_nonce(session)
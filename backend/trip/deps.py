@@ -1,13 +1,17 @@
+from collections.abc import Callable
+from hashlib import md5
 from typing import Annotated
 
 import jwt
-from fastapi import Depends, Header, HTTPException
+from fastapi import Depends, Header, HTTPException, Request, Response
 from fastapi.security import OAuth2PasswordBearer
-from sqlmodel import Session
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from . import __version__
 from .config import get_settings
-from .db.core import get_engine
-from .models.models import User
+from .db.core import get_async_engine, get_engine
+from .models.models import DATABASE_SCOPE, ResourceVersion, User
 from .security import api_token_to_user
 
 # auto_error=False so a missing Authorization header doesn't 401 before we get a
@@ -24,6 +28,17 @@ def get_session():
 SessionDep = Annotated[Session, Depends(get_session)]
 
 
+async def get_async_session():
+    # For async handlers, which must not run blocking queries on the event loop.
+    # Objects stay loaded after commit: lazy loads are not available there, so
+    # read models are built from rows loaded with their graph options.
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
+
+
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
+
+
 def _username_from_jwt(session: Session, token: str) -> str:
     try:
         payload = jwt.decode(token, get_settings().SECRET_KEY, algorithms=[get_settings().ALGORITHM])
@@ -64,3 +79,37 @@ def require_admin(
     if not db_user or not db_user.is_admin:
         raise HTTPException(status_code=403, detail="Forbidden")
     return db_user.username
+
+
+def resource_etag(session: Session, scope: str) -> str:
+    # Payloads also depend on the database, the release and on settings baked into them
+    versions = dict(
+        session.exec(
+            select(ResourceVersion.scope, ResourceVersion.version).where(
+                ResourceVersion.scope.in_([scope, DATABASE_SCOPE])
+            )
+        ).all()
+    )
+    settings = get_settings()
+    key = (
+        f"{versions.get(DATABASE_SCOPE, 0)}:{__version__}:{settings.ASSETS_URL}:{settings.DEFAULT_CURRENCY}:"
+        f"{scope}:{versions.get(scope, 0)}"
+    )
+    return f'"{md5(key.encode()).hexdigest()}"'
+
+
+def etag_guard(session: SessionDep, request: Request, response: Response) -> Callable[[str], None]:
+    # Call with the resource scope once access is checked: sets the ETag, or
+    # answers 304 before anything is loaded if the client copy is current
+    def check(scope: str):
+        etag = resource_etag(session, scope)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if_none_match = {tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")}
+        if etag in if_none_match or "*" in if_none_match:
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+
+    return check
+
+
+ETagGuardDep = Annotated[Callable[[str], None], Depends(etag_guard)]
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+
+from sqlalchemy import event, update
+from sqlmodel import Session, select
+
+from .db.core import get_engine
+from .leader import JobWakeup, register_signal, signal_jobs
+from .models.models import Backup, BackupStatus
+from .utils.zip import process_backup_export
+
+logger = logging.getLogger(__name__)
+
+# Backup exports are queued as PENDING rows and run one at a time by the leader
+# worker, so they survive a restart and two workers never export the same backup.
+# A commit adding one wakes the runner, in whichever worker it happens.
+BACKUPS_SIGNAL = "backups"
+
+_wakeup = JobWakeup()
+
+register_signal(BACKUPS_SIGNAL, _wakeup.wake)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_new_backups(session, flush_context):
+    for obj in session.new:
+        if isinstance(obj, Backup) and obj.status == BackupStatus.PENDING:
+            signal_jobs(session, BACKUPS_SIGNAL)
+            return
+
+
+def _fail_interrupted_backups():
+    # Left PROCESSING by a previous leader: its partial zip is useless, the user can retry
+    with Session(get_engine()) as session:
+        session.exec(
+            update(Backup)
+            .where(Backup.status == BackupStatus.PROCESSING)
+            .values(status=BackupStatus.FAILED, error_message="Interrupted by a server restart")
+        )
+        session.commit()
+
+
+def _pending_backups() -> list:
+    with Session(get_engine()) as session:
+        return session.exec(
+            select(Backup.id, Backup.full, Backup.incremental)
+            .where(Backup.status == BackupStatus.PENDING)
+            .order_by(Backup.created_at, Backup.id)
+        ).all()
+
+
+async def backup_job_loop() -> None:
+    _wakeup.start()
+    await asyncio.to_thread(_fail_interrupted_backups)
+    while True:
+        # Cleared before the run: a backup queued during it triggers another one
+        _wakeup.clear()
+        try:
+            for backup in await asyncio.to_thread(_pending_backups):
+                await asyncio.to_thread(process_backup_export, backup.id, backup.full, backup.incremental)
+        except Exception:
+            logger.exception("Error running pending backups")
+        await _wakeup.wait()
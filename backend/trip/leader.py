@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
+from uuid import uuid4
+
+from sqlalchemy import delete, event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from .config import get_settings
+from .db.core import get_engine
+from .models.models import Lease, ResourceVersion
+from .utils.date import dt_utc
+
+logger = logging.getLogger(__name__)
+
+# With several workers, the background jobs (notify scheduler, backup runner) must run
+# in exactly one of them: whichever holds the lease row. The holder renews it every
+# LEASE_RENEW_SECONDS; if it dies, another worker takes over once it has expired.
+JOBS_LEASE = "jobs"
+LEASE_TTL_SECONDS = 30
+LEASE_RENEW_SECONDS = 10
+SIGNAL_POLL_SECONDS = 1
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+
+# Signal name -> wake-up of the job it concerns, thread-safe
+_signal_handlers: dict[str, Callable[[], None]] = {}
+# Signals every worker acts on, not only the leader (e.g. a config change)
+_worker_signal_handlers: dict[str, Callable[[], None]] = {}
+
+
+class JobWakeup:
+    # Wakes a background job sleeping on its event loop. Thread-safe: commits happen
+    # in threadpool threads as well as on the event loop.
+
+    def __init__(self):
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._event: asyncio.Event | None = None
+
+    def start(self):
+        # Called by the job when it starts, on its own loop
+        self._loop, self._event = asyncio.get_running_loop(), asyncio.Event()
+
+    def wake(self):
+        loop, event = self._loop, self._event
+        if loop is not None and event is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(event.set)
+
+    def clear(self):
+        if self._event is not None:
+            self._event.clear()
+
+    async def wait(self, timeout: float | None = None):
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except TimeoutError:
+            pass
+
+
+def register_signal(name: str, handler: Callable[[], None], every_worker: bool = False):
+    (_worker_signal_handlers if every_worker else _signal_handlers)[name] = handler
+
+
+def _signal_scope(name: str) -> str:
+    return f"signal:{name}"
+
+
+def signal_jobs(session: Session, name: str):
+    # Called during a flush. The signal row is bumped in the same transaction, for the
+    # leader to see if it is another worker; this worker's job is woken on commit.
+    stmt = sqlite_insert(ResourceVersion).values(scope=_signal_scope(name), version=1)
+    session.connection().execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ResourceVersion.scope], set_={"version": ResourceVersion.version + 1}
+        )
+    )
+    session.info.setdefault("job_signals", set()).add(name)
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_signaled_jobs(session):
+    for name in session.info.pop("job_signals", ()):
+        if handler := _signal_handlers.get(name) or _worker_signal_handlers.get(name):
+            handler()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_job_signals(session):
+    session.info.pop("job_signals", None)
+
+
+async def _watch(handlers: dict[str, Callable[[], None]]) -> None:
+    # Commits of the other workers. PRAGMA data_version changes whenever another
+    # connection commits and costs no I/O, the signal rows are only read then.
+    if not handlers:
+        return
+    scopes = {_signal_scope(name): name for name in handlers}
+    placeholders = ",".join("?" * len(scopes))
+    conn = sqlite3.connect(get_settings().SQLITE_FILE, check_same_thread=False)
+    try:
+        data_version = None
+        versions: dict[str, int] = {}
+        while True:
+            current = conn.execute("PRAGMA data_version").fetchone()[0]
+            if current != data_version:
+                data_version = current
+                rows = conn.execute(
+                    f"SELECT scope, version FROM resourceversion WHERE scope IN ({placeholders})",
+                    list(scopes),
+                ).fetchall()
+                for scope, version in rows:
+                    if versions.get(scope) != version:
+                        versions[scope] = version
+                        handlers[scopes[scope]]()
+            await asyncio.sleep(SIGNAL_POLL_SECONDS)
+    finally:
+        conn.close()
+
+
+async def watch_signals() -> None:
+    # Leader job: wakes the background jobs
+    await _watch(_signal_handlers)
+
+
+async def watch_worker_signals() -> None:
+    # Runs in every worker, for the signals registered with every_worker
+    await _watch(_worker_signal_handlers)
+
+
+def _acquire_lease(name: str) -> bool:
+    now = dt_utc()
+    expires_at = now + timedelta(seconds=LEASE_TTL_SECONDS)
+    stmt = sqlite_insert(Lease).values(name=name, holder=WORKER_ID, expires_at=expires_at)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Lease.name],
+        set_={"holder": WORKER_ID, "expires_at": expires_at},
+        where=(Lease.holder == WORKER_ID) | (Lease.expires_at < now),
+    )
+    # SQLite serializes writers: of two workers racing for an expired lease, the
+    # second one sees the first one's row and leaves it alone
+    with Session(get_engine()) as session:
+        session.exec(stmt)
+        holder = session.exec(select(Lease.holder).where(Lease.name == name)).one()
+        session.commit()
+    return holder == WORKER_ID
+
+
+def _release_lease(name: str):
+    with Session(get_engine()) as session:
+        session.exec(delete(Lease).where(Lease.name == name, Lease.holder == WORKER_ID))
+        session.commit()
+
+
+def reset_leases():
+    # At boot, before any worker starts: whoever held a lease is gone
+    with Session(get_engine()) as session:
+        session.exec(delete(Lease))
+        session.commit()
+
+
+async def _cancel(tasks: list[asyncio.Task]):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def run_as_leader(jobs: list[Callable[[], Awaitable[None]]], name: str = JOBS_LEASE) -> None:
+    tasks: list[asyncio.Task] = []
+    held_until = None
+    try:
+        while True:
+            try:
+                leader = await asyncio.to_thread(_acquire_lease, name)
+                if leader:
+                    held_until = dt_utc() + timedelta(seconds=LEASE_TTL_SECONDS)
+            except Exception:
+                logger.exception("[LEADER] Lease renewal failed")
+                # Keep the jobs while the lease is still ours, whatever the database says now
+                leader = held_until is not None and dt_utc() < held_until
+
+            if leader and not tasks:
+                logger.info(f"[LEADER] Worker {WORKER_ID} runs the background jobs")
+                tasks = [asyncio.create_task(job()) for job in jobs]
+            elif not leader and tasks:
+                logger.warning(f"[LEADER] Worker {WORKER_ID} lost the lease, stopping the background jobs")
+                await _cancel(tasks)
+                tasks = []
+                held_until = None
+            await asyncio.sleep(LEASE_RENEW_SECONDS)
+    finally:
+        await _cancel(tasks)
+        if held_until is not None:
+            await asyncio.to_thread(_release_lease, name)
@@ -1,8 +1,9 @@
 import asyncio
+import os
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
@@ -10,11 +11,18 @@ from starlette.middleware.gzip import GZipMiddleware
 
 from . import __version__
 from .config import ensure_secret_key, get_settings, migrate_config_file
-from .db.core import init_and_migrate_db
-from .notify import notify_loop
-from .routers import (admin, auth, bookings, categories, places, providers,
-                      settings, trips)
-from .utils.utils import silence_http_logging
+from .db.core import dispose_async_engine, init_and_migrate_db
+from .jobs import backup_job_loop
+from .leader import (reset_leases, run_as_leader, watch_signals,
+                     watch_worker_signals)
+from .notify import notify_loop, shutdown_notify_pool
+from .routers import (admin, auth, bookings, categories, gpx, places,
+                      providers, settings, sync, trips)
+from .utils.http import close_http_client, get_http_client
+from .utils.images import (get_image_variant, negotiate_image_variant,
+                           shutdown_image_pool)
+from .utils.metrics import ServerTimingMiddleware
+from .utils.utils import assets_folder_path, silence_http_logging
 
 migrate_config_file()
 
@@ -26,14 +34,35 @@ Path(get_settings().ASSETS_FOLDER).mkdir(parents=True, exist_ok=True)
 Path(get_settings().ATTACHMENTS_FOLDER).mkdir(parents=True, exist_ok=True)
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+# Set by `python -m trip` once bootstrap() has run, before it starts the workers
+BOOTSTRAPPED_ENV = "TRIP_BOOTSTRAPPED"
+
+
+async def bootstrap():
+    # Once per deployment, not per worker: concurrent workers would race on the
+    # secret key and the migrations
     ensure_secret_key()
     await init_and_migrate_db()
+    reset_leases()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not os.environ.get(BOOTSTRAPPED_ENV):
+        await bootstrap()
     silence_http_logging()
-    notify_task = asyncio.create_task(notify_loop())
+    get_http_client()
+    # Every worker competes for the lease, the holder runs the background jobs
+    jobs_task = asyncio.create_task(run_as_leader([notify_loop, backup_job_loop, watch_signals]))
+    signals_task = asyncio.create_task(watch_worker_signals())
     yield
-    notify_task.cancel()
+    jobs_task.cancel()
+    signals_task.cancel()
+    await asyncio.gather(jobs_task, signals_task, return_exceptions=True)
+    shutdown_notify_pool()
+    await close_http_client()
+    await dispose_async_engine()
+    shutdown_image_pool()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -56,13 +85,32 @@ app.include_router(settings.router)
 app.include_router(trips.router)
 app.include_router(providers.router)
 app.include_router(admin.router)
+app.include_router(sync.router)
+app.include_router(gpx.router)
 
 
 @app.get("/api/info")
-def info():
+async def info():
+    # No I/O: answered on the event loop, not queued behind threadpool work
     return {"version": __version__}
 
 
+@app.get("/api/assets/variants/{filename}")
+def read_image_variant(filename: str, request: Request, w: int = 256):
+    image_fp = assets_folder_path() / filename
+    if Path(filename).name != filename or not image_fp.is_file():
+        raise HTTPException(status_code=404, detail="Not found")
+
+    width, ext = negotiate_image_variant(w, request.headers.get("accept", ""))
+    variant_fp = get_image_variant(filename, width, ext)
+    if not variant_fp:  # Undecodable source, serve it as is
+        return FileResponse(image_fp)
+
+    # Asset filenames are never reused, variants can be cached forever
+    headers = {"Cache-Control": "public, max-age=31536000, immutable", "Vary": "Accept"}
+    return FileResponse(variant_fp, media_type=f"image/{ext}", headers=headers)
+
+
 @app.middleware("http")
 async def not_found_to_spa(request: Request, call_next):
     response = await call_next(request)
@@ -71,5 +119,9 @@ async def not_found_to_spa(request: Request, call_next):
     return response
 
 
+# Added last, so it is the outermost middleware and its total covers the others
+app.add_middleware(ServerTimingMiddleware)
+
+
 app.mount("/api/assets", StaticFiles(directory=get_settings().ASSETS_FOLDER), name="static")
 app.mount("/", StaticFiles(directory=get_settings().FRONTEND_FOLDER, html=True), name="frontend")
@@ -1,17 +1,27 @@
 import re
+import time
+from collections.abc import Collection, Iterable
 from datetime import UTC, date, datetime
 from enum import Enum
 from types import SimpleNamespace
 from typing import Annotated
 
 from pydantic import BaseModel, StringConstraints, field_validator
-from sqlalchemy import (JSON, Column, Index, MetaData, UniqueConstraint, event,
-                        select)
+from sqlalchemy import (JSON, Column, Index, LargeBinary, MetaData,
+                        UniqueConstraint, column, delete, event, inspect,
+                        select, table, text, union)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session, object_session
 from sqlmodel import Field, Relationship, SQLModel
 
 from ..config import get_settings
-from ..utils.utils import remove_attachment, remove_backup, remove_image
+from ..utils.gpx import (GPX_DIGEST_RE, GpxTrackPayload, build_gpx_track,
+                         gpx_digest)
+from ..utils.metrics import timed_serialize
+from ..utils.utils import (IMAGE_RELEASE_GRACE_SECONDS, IMAGE_VARIANT_WIDTHS,
+                           assets_folder_path, remove_attachment,
+                           remove_backup, remove_image)
 
 convention = {
     "ix": "ix_%(column_0_label)s",
@@ -27,8 +37,7 @@ SQLModel.metadata = MetaData(naming_convention=convention)
 @event.listens_for(Session, "after_commit")
 def cleanup_after_commit(session):
     if hasattr(session, "_images_to_delete"):
-        for filename in session._images_to_delete:
-            remove_image(filename)
+        remove_unreferenced_images(session.get_bind(), session._images_to_delete)
         delattr(session, "_images_to_delete")
 
     if hasattr(session, "_attachments_to_delete"):
@@ -42,6 +51,30 @@ def cleanup_after_commit(session):
         delattr(session, "_backups_to_delete")
 
 
+def remove_unreferenced_images(bind: Engine, filenames: Iterable[str]):
+    # Asset files are content-addressed and shared across Image rows: unlink only
+    # the ones no row references anymore and that were not reused just now
+    filenames = set(filenames)
+    if not filenames:
+        return
+
+    with bind.connect() as connection:
+        referenced = set(
+            connection.execute(
+                select(Image.__table__.c.filename).where(Image.__table__.c.filename.in_(filenames))
+            ).scalars()
+        )
+
+    grace_start = time.time() - IMAGE_RELEASE_GRACE_SECONDS
+    for filename in filenames - referenced:
+        try:
+            if (assets_folder_path() / filename).stat().st_mtime > grace_start:
+                continue
+        except OSError:
+            continue
+        remove_image(filename)
+
+
 def _prefix_assets_url(filename: str) -> str:
     base = get_settings().ASSETS_URL
     if not base.endswith("/"):
@@ -49,6 +82,11 @@ def _prefix_assets_url(filename: str) -> str:
     return base + filename
 
 
+def _image_srcset(filename: str) -> str:
+    url = _prefix_assets_url(f"variants/{filename}")
+    return ", ".join(f"{url}?w={width} {width}w" for width in IMAGE_VARIANT_WIDTHS)
+
+
 class TripItemStatusEnum(str, Enum):
     PENDING = "pending"
     CONFIRMED = "booked"
@@ -81,6 +119,11 @@ class BackupStatus(str, Enum):
     FAILED = "failed"
 
 
+class NotificationStatus(str, Enum):
+    PENDING = "pending"
+    FAILED = "failed"
+
+
 class MapProvider(str, Enum):
     OPENSTREETMAP = "osm"
     GOOGLE = "google"
@@ -139,6 +182,7 @@ class ProviderPlaceResult(BaseModel):
     image: str | None = None
     restroom: bool | None = None
     links: list[str] | None = None
+    duplicate_of: int | None = None  # Id of an existing place of the user, on imports
 
 
 class ProviderBoundaries(BaseModel):
@@ -146,15 +190,23 @@ class ProviderBoundaries(BaseModel):
     southwest: LatLng
 
 
+class RouteEncoding(str, Enum):
+    COORDINATES = "coordinates"
+    POLYLINE = "polyline"
+
+
 class RoutingQuery(BaseModel):
     coordinates: list[LatLng]
     profile: str
+    tolerance: float | None = Field(default=None, gt=0)  # meters, Douglas-Peucker simplification
+    encoding: RouteEncoding = RouteEncoding.COORDINATES
 
 
 class RoutingResponse(BaseModel):
     distance: float | None
     duration: float | None
-    coordinates: list[tuple[float, float]]
+    coordinates: list[tuple[float, float]] = []  # [lng, lat], with encoding "coordinates"
+    polyline: str | None = None  # Encoded polyline, precision 5, with encoding "polyline"
 
 
 class ConfigRead(BaseModel):
@@ -165,6 +217,7 @@ class ConfigRead(BaseModel):
     BACKUP_IMPORT_MAX_TOTAL_SIZE: int
     KML_MAX_ENTRY_SIZE: int
     PROVIDER_IMPORT_MAX_SIZE: int
+    PROVIDER_CACHE_MAX_ENTRIES: int
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     REFRESH_TOKEN_EXPIRE_MINUTES: int
     REGISTER_ENABLE: bool
@@ -186,6 +239,7 @@ class ConfigUpdate(BaseModel):
     BACKUP_IMPORT_MAX_TOTAL_SIZE: int | None = None
     KML_MAX_ENTRY_SIZE: int | None = None
     PROVIDER_IMPORT_MAX_SIZE: int | None = None
+    PROVIDER_CACHE_MAX_ENTRIES: int | None = None
     ACCESS_TOKEN_EXPIRE_MINUTES: int | None = None
     REFRESH_TOKEN_EXPIRE_MINUTES: int | None = None
     REGISTER_ENABLE: bool | None = None
@@ -199,6 +253,12 @@ class ConfigUpdate(BaseModel):
     DEFAULT_MAP_LNG: float | None = None
 
 
+class ProviderCacheStats(BaseModel):
+    entries: int
+    hits: int
+    misses: int
+
+
 class TempPasswordRead(BaseModel):
     temporary: str
 
@@ -215,6 +275,7 @@ class MagicLink(MagicLinkBase, table=True):
 
 class MagicLinkRead(MagicLinkBase):
     @classmethod
+    @timed_serialize
     def serialize(cls, obj: MagicLink) -> "MagicLinkRead":
         return cls(token=obj.token, expires=obj.expires)
 
@@ -237,10 +298,12 @@ class Image(ImageBase, table=True):
 class ImageRead(BaseModel):
     id: int
     url: str
+    srcset: str
 
     @classmethod
+    @timed_serialize
     def serialize(cls, obj: Image) -> "ImageRead":
-        return cls(id=obj.id, url=_prefix_assets_url(obj.filename))
+        return cls(id=obj.id, url=_prefix_assets_url(obj.filename), srcset=_image_srcset(obj.filename))
 
 
 @event.listens_for(Image, "after_delete")
@@ -259,6 +322,7 @@ class BackupBase(SQLModel):
     error_message: str | None = None
     file_size: int | None = None
     full: bool = False
+    incremental: bool = False
 
 
 class Backup(BackupBase, table=True):
@@ -285,6 +349,7 @@ class BackupRead(BackupBase):
     user: str
 
     @classmethod
+    @timed_serialize
     def serialize(cls, obj: Backup) -> "BackupRead":
         return cls(
             id=obj.id,
@@ -293,6 +358,7 @@ class BackupRead(BackupBase):
             error_message=obj.error_message,
             filename=obj.filename,
             file_size=obj.file_size,
+            incremental=bool(obj.incremental),
             status=obj.status,
             user=obj.user,
         )
@@ -303,6 +369,47 @@ class DataMigration(SQLModel, table=True):
     applied_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
 
 
+class ProviderCache(SQLModel, table=True):
+    key: str = Field(primary_key=True)
+    kind: str
+    value: dict | list | str = Field(sa_column=Column(JSON, nullable=False))
+    expires_at: datetime = Field(index=True)
+    last_hit: datetime = Field(index=True)
+
+
+class NotificationOutbox(SQLModel, table=True):
+    # Reminders waiting for delivery (see notify.py), deleted once sent. A reminder is
+    # its source ("item:<id>" or "entry:<id>") at a due_at, queued once per recipient.
+    id: int | None = Field(default=None, primary_key=True)
+    user: str = Field(foreign_key="user.username", ondelete="CASCADE")
+    source: str
+    due_at: datetime
+    title: str
+    body: str
+    status: NotificationStatus = Field(default=NotificationStatus.PENDING)
+    attempts: int = 0
+    next_attempt_at: datetime
+    last_error: str | None = None
+
+    __table_args__ = (
+        UniqueConstraint("user", "source", "due_at", name="uq_notificationoutbox_user_source_due_at"),
+        Index("idx_notificationoutbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+
+class NotificationCursor(SQLModel, table=True):
+    # Reminders due up to `until` are in the outbox: a restart scans on from there
+    name: str = Field(primary_key=True)
+    until: datetime
+
+
+class Lease(SQLModel, table=True):
+    # Held by the worker running the background jobs, see leader.py
+    name: str = Field(primary_key=True)
+    holder: str
+    expires_at: datetime
+
+
 class UserBase(SQLModel):
     map_lat: float = get_settings().DEFAULT_MAP_LAT
     map_lng: float = get_settings().DEFAULT_MAP_LNG
@@ -329,6 +436,7 @@ class User(UserBase, table=True):
     apprise_webhook_url: str | None = None
     map_provider: MapProvider = Field(default=MapProvider.OPENSTREETMAP)
     is_admin: bool = False
+    api_token_lookup: str | None = Field(default=None, index=True, unique=True)
 
 
 @event.listens_for(User, "before_delete")
@@ -398,6 +506,7 @@ class UserRead(UserBase):
     is_admin: bool
 
     @classmethod
+    @timed_serialize
     def serialize(cls, obj: User) -> "UserRead":
         return cls(
             username=obj.username,
@@ -433,6 +542,7 @@ class AdminUserRead(UserBase):
     is_admin: bool
 
     @classmethod
+    @timed_serialize
     def serialize(cls, obj: User, places_count: int = 0, storage_bytes: int = 0) -> "AdminUserRead":
         return cls(
             username=obj.username,
@@ -477,6 +587,7 @@ class CategoryRead(CategoryBase):
     color: str
 
     @classmethod
+    @timed_serialize
     def serialize(cls, obj: Category) -> "CategoryRead":
         return cls(
             id=obj.id,
@@ -487,6 +598,93 @@ class CategoryRead(CategoryBase):
         )
 
 
+class GpxTrack(SQLModel, table=True):
+    # One row per distinct GPX document, referenced by digest from Place.gpx and
+    # TripItem.gpx. Reads join this small summary, the blobs stay in GpxTrackData.
+    digest: str = Field(primary_key=True)
+    point_count: int = 0
+    # Computed once on write (utils/gpx.py parse_track), for list views to show, filter and sort on
+    distance: float = Field(default=0, index=True)  # meters
+    elevation_gain: float | None = Field(default=None, index=True)  # meters
+    elevation_loss: float | None = None
+    min_lat: float | None = None
+    max_lat: float | None = None
+    min_lng: float | None = None
+    max_lng: float | None = None
+
+
+class GpxTrackData(SQLModel, table=True):
+    digest: str = Field(foreign_key="gpxtrack.digest", primary_key=True, ondelete="CASCADE")
+    data: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    points: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+
+
+class GpxTrackRead(BaseModel):
+    point_count: int
+    distance: float
+    elevation_gain: float | None
+    elevation_loss: float | None
+    bbox: tuple[float, float, float, float] | None  # west, south, east, north
+
+    @classmethod
+    @timed_serialize
+    def serialize(cls, obj: GpxTrack) -> "GpxTrackRead":
+        return cls(
+            point_count=obj.point_count,
+            distance=obj.distance,
+            elevation_gain=obj.elevation_gain,
+            elevation_loss=obj.elevation_loss,
+            bbox=(obj.min_lng, obj.min_lat, obj.max_lng, obj.max_lat) if obj.point_count else None,
+        )
+
+
+class GpxTrackGeometryRead(BaseModel):
+    point_count: int  # Of the full track, `coordinates` may be simplified
+    coordinates: list[tuple[float, float]]  # [lat, lng]
+
+
+def store_gpx_track(session: Session, gpx: str | None, track: GpxTrackPayload | None = None) -> str | None:
+    # Digest of the stored track for a GPX document, or for a digest of a known track.
+    # `track` is build_gpx_track(gpx) when the caller already built it off the event loop.
+    if not gpx:
+        return None
+    if GPX_DIGEST_RE.fullmatch(gpx):
+        connection = session.connection()
+        return gpx if connection.scalar(select(GpxTrack.digest).where(GpxTrack.digest == gpx)) else None
+
+    digest = gpx_digest(gpx)
+    connection = session.connection()
+    if connection.scalar(select(GpxTrack.digest).where(GpxTrack.digest == digest)):
+        return digest
+    track = track or build_gpx_track(gpx)
+    connection.execute(
+        sqlite_insert(GpxTrack).values(digest=digest, **track.stats._asdict()).on_conflict_do_nothing()
+    )
+    connection.execute(
+        sqlite_insert(GpxTrackData)
+        .values(digest=digest, data=track.data, points=track.points)
+        .on_conflict_do_nothing()
+    )
+    return digest
+
+
+@event.listens_for(Session, "before_flush")
+def store_gpx_tracks(session, flush_context, instances):
+    # Whatever the write path (API, backup import, migration), a GPX document set on a
+    # place or an item is moved to the track store and replaced by its digest
+    for obj in (*session.new, *session.dirty):
+        if not isinstance(obj, (Place, TripItem)) or not obj.gpx:
+            continue
+        if obj in session.new or inspect(obj).attrs.gpx.history.added:
+            obj.gpx = store_gpx_track(session, obj.gpx)
+
+
+def _gpx_track_relationship(model: str) -> Relationship:
+    return Relationship(
+        sa_relationship_kwargs={"primaryjoin": f"foreign({model}.gpx) == GpxTrack.digest", "viewonly": True}
+    )
+
+
 class TripPlaceLink(SQLModel, table=True):
     trip_id: int = Field(foreign_key="trip.id", primary_key=True, ondelete="CASCADE")
     place_id: int = Field(foreign_key="place.id", primary_key=True, index=True, ondelete="CASCADE")
@@ -524,9 +722,19 @@ class Place(PlaceBase, table=True):
 
     trips: list["Trip"] = Relationship(back_populates="places", link_model=TripPlaceLink)
 
+    gpx_track: GpxTrack | None = _gpx_track_relationship("Place")
+
     __table_args__ = (Index("idx_place_user_category", "user", "category_id"),)
 
 
+# R*Tree over place coordinates, filled by triggers on the place table (migration
+# 8c2e4a6f1b39), so every write path keeps it current. Bounds are float32 rounded
+# outward: a box query returns a superset, to be narrowed on Place.lat/lng.
+place_rtree = table(
+    "place_rtree", column("id"), column("min_lat"), column("max_lat"), column("min_lng"), column("max_lng")
+)
+
+
 class PlaceCreate(PlaceBase):
     image: str | None = None
     category_id: int
@@ -545,12 +753,18 @@ class PlaceRead(PlaceBase):
     id: int
     category: CategoryRead
     image: str | None
+    image_srcset: str | None = None
     image_id: int | None
     user: str
     trip_count: int = 0
+    track: GpxTrackRead | None = None
 
     @classmethod
-    def serialize(cls, obj: Place, exclude_gpx=True) -> "PlaceRead":
+    @timed_serialize
+    def serialize(cls, obj: Place, trip_count: int | None = None) -> "PlaceRead":
+        # List queries pass trip_count precomputed, leaving trips unloaded
+        if trip_count is None:
+            trip_count = len(obj.trips)
         return cls(
             id=obj.id,
             user=obj.user,
@@ -565,17 +779,21 @@ class PlaceRead(PlaceBase):
             duration=obj.duration,
             visited=obj.visited,
             image=_prefix_assets_url(obj.image.filename) if obj.image else None,
+            image_srcset=_image_srcset(obj.image.filename) if obj.image else None,
             image_id=obj.image_id,
             favorite=obj.favorite,
-            gpx=("1" if obj.gpx else None)
-            if exclude_gpx
-            else obj.gpx,  # Generic PlaceRead. Avoid large resp.
+            gpx=obj.gpx,  # Track digest, see routers/gpx.py
+            track=GpxTrackRead.serialize(obj.gpx_track) if obj.gpx_track else None,
             restroom=obj.restroom,
             links=obj.links,
-            trip_count=len(obj.trips),
+            trip_count=trip_count,
         )
 
 
+class PlaceNearRead(PlaceRead):
+    distance: float  # meters
+
+
 class TripBase(SQLModel):
     name: str
     archived: bool | None = None
@@ -627,6 +845,7 @@ class TripReadBase(TripBase):
     collaborators: list["TripMemberRead"]
 
     @classmethod
+    @timed_serialize
     def serialize(cls, obj: Trip) -> "TripRead":
         return cls(
             id=obj.id,
@@ -651,6 +870,7 @@ class TripRead(TripBase):
     attachments: list["TripAttachmentRead"]
 
     @classmethod
+    @timed_serialize
     def serialize(cls, obj: Trip) -> "TripRead":
         return cls(
             id=obj.id,
@@ -696,6 +916,7 @@ class TripMemberRead(BaseModel):
     joined_at: datetime | None = None
 
     @classmethod
+    @timed_serialize
     def serialize(cls, obj: TripMember) -> "TripMemberRead":
         return cls(
             user=obj.user, invited_by=obj.invited_by, invited_at=obj.invited_at, joined_at=obj.joined_at
@@ -763,6 +984,7 @@ class TripBookingRead(TripBookingBase):
     attachments: list["TripAttachmentRead"]
 
     @classmethod
+    @timed_serialize
     def serialize(cls, obj: TripBooking) -> "TripBookingRead":
         return cls(
             id=obj.id,
@@ -785,6 +1007,7 @@ class TripDayRead(TripDayBase):
     bookings: list[TripBookingRead]
 
     @classmethod
+    @timed_serialize
     def serialize(cls, obj: TripDay) -> "TripDayRead":
         return cls(
             id=obj.id,
@@ -853,6 +1076,8 @@ class TripItem(TripItemBase, table=True):
 
     images: list["Image"] = Relationship(link_model=TripItemImageLink)
 
+    gpx_track: GpxTrack | None = _gpx_track_relationship("TripItem")
+
 
 class ItemImageInput(BaseModel):
     id: int | None = None
@@ -886,12 +1111,15 @@ class TripItemRead(TripItemBase):
     day_id: int
     status: TripItemStatusEnum | None
     image: str | None
+    image_srcset: str | None = None
     image_id: int | None
     images: list[ImageRead]
     paid_by: str | None
     attachments: list["TripAttachmentRead"]
+    track: GpxTrackRead | None = None
 
     @classmethod
+    @timed_serialize
     def serialize(cls, obj: TripItem) -> "TripItemRead":
         return cls(
             id=obj.id,
@@ -905,9 +1133,11 @@ class TripItemRead(TripItemBase):
             status=obj.status,
             place=PlaceRead.serialize(obj.place) if obj.place else None,
             image=_prefix_assets_url(obj.image.filename) if obj.image else None,
+            image_srcset=_image_srcset(obj.image.filename) if obj.image else None,
             image_id=obj.image_id,
             images=[ImageRead.serialize(img) for img in obj.images],
             gpx=obj.gpx,
+            track=GpxTrackRead.serialize(obj.gpx_track) if obj.gpx_track else None,
             paid_by=obj.paid_by,
             links=obj.links,
             attachments=[TripAttachmentRead.serialize(att) for att in obj.attachments],
@@ -949,8 +1179,10 @@ class TripShareItemRead(TripItemBase):
     image: str | None
     image_id: int | None
     paid_by: str | None
+    track: GpxTrackRead | None = None
 
     @classmethod
+    @timed_serialize
     def serialize(cls, obj: TripItem) -> "TripShareItemRead":
         return cls(
             id=obj.id,
@@ -966,6 +1198,7 @@ class TripShareItemRead(TripItemBase):
             image=None,
             image_id=None,
             gpx=obj.gpx,
+            track=GpxTrackRead.serialize(obj.gpx_track) if obj.gpx_track else None,
             paid_by=None,
             links=obj.links,
         )
@@ -977,6 +1210,7 @@ class TripShareDayRead(TripDayBase):
     bookings: list[TripShareBookingRead]
 
     @classmethod
+    @timed_serialize
     def serialize(cls, obj: TripDay) -> "TripShareDayRead":
         return cls(
             id=obj.id,
@@ -996,6 +1230,7 @@ class TripShareRead(TripBase):
     places: list["PlaceRead"]
 
     @classmethod
+    @timed_serialize
     def serialize(cls, obj: Trip) -> "TripShareRead":
         return cls(
             id=obj.id,
@@ -1009,6 +1244,15 @@ class TripShareRead(TripBase):
         )
 
 
+class TripIcsCache(SQLModel, table=True):
+    # Rendered calendar feed of a trip, see read_trip_calendar_feed. Rows are dropped
+    # by track_resource_changes in the same transaction as whatever they were built from.
+    trip_id: int = Field(foreign_key="trip.id", primary_key=True, ondelete="CASCADE")
+    etag: str
+    body: str
+    rendered_on: date
+
+
 class TripPackingListItemBase(SQLModel):
     text: str | None = None
     qt: int | None = None
@@ -1056,6 +1300,7 @@ class TripPackingListItemRead(TripPackingListItemBase):
     id: int
 
     @classmethod
+    @timed_serialize
     def serialize(cls, obj: "TripPackingListItem") -> "TripPackingListItemRead":
         return cls(
             id=obj.id,
@@ -1078,6 +1323,11 @@ class TripChecklistItem(TripChecklistItemBase, table=True):
     trip_id: int = Field(foreign_key="trip.id", ondelete="CASCADE", index=True)
     trip: Trip | None = Relationship(back_populates="checklist_items")
 
+    # Pending reminders only, what the notify scheduler looks up
+    __table_args__ = (
+        Index("idx_tripchecklistitem_pending_notify_dt", "notify_dt", sqlite_where=text("checked IS NOT 1")),
+    )
+
 
 class TripChecklistItemCreate(TripChecklistItemBase):
     text: str
@@ -1111,6 +1361,7 @@ class TripChecklistItemRead(TripChecklistItemBase):
     id: int
 
     @classmethod
+    @timed_serialize
     def serialize(cls, obj: "TripChecklistItem") -> "TripChecklistItemRead":
         return cls(
             id=obj.id,
@@ -1167,6 +1418,7 @@ class TripPackingListEntryRead(TripPackingListEntryBase):
     id: int
 
     @classmethod
+    @timed_serialize
     def serialize(cls, obj: "TripPackingListEntry") -> "TripPackingListEntryRead":
         return cls(
             id=obj.id,
@@ -1217,6 +1469,7 @@ class TripPackingListRead(TripPackingListBase):
     items: list[TripPackingListEntryRead]
 
     @classmethod
+    @timed_serialize
     def serialize(cls, obj: "TripPackingList") -> "TripPackingListRead":
         return cls(
             id=obj.id,
@@ -1237,6 +1490,10 @@ class TripChecklistEntry(TripChecklistEntryBase, table=True):
     checklist_id: int = Field(foreign_key="tripchecklist.id", ondelete="CASCADE", index=True)
     checklist: "TripChecklist" = Relationship(back_populates="items")
 
+    __table_args__ = (
+        Index("idx_tripchecklistentry_pending_notify_dt", "notify_dt", sqlite_where=text("checked IS NOT 1")),
+    )
+
 
 class TripChecklistEntryCreate(TripChecklistEntryBase):
     text: str
@@ -1270,6 +1527,7 @@ class TripChecklistEntryRead(TripChecklistEntryBase):
     id: int
 
     @classmethod
+    @timed_serialize
     def serialize(cls, obj: "TripChecklistEntry") -> "TripChecklistEntryRead":
         return cls(
             id=obj.id,
@@ -1319,6 +1577,7 @@ class TripChecklistRead(TripChecklistBase):
     items: list[TripChecklistEntryRead]
 
     @classmethod
+    @timed_serialize
     def serialize(cls, obj: "TripChecklist") -> "TripChecklistRead":
         return cls(
             id=obj.id,
@@ -1365,6 +1624,7 @@ class TripAttachmentRead(TripAttachmentBase):
     uploaded_by: str
 
     @classmethod
+    @timed_serialize
     def serialize(cls, obj: TripAttachment) -> "TripAttachmentRead":
         return cls(
             id=obj.id,
@@ -1373,3 +1633,326 @@ class TripAttachmentRead(TripAttachmentBase):
             uploaded_by=obj.uploaded_by,
             stored_filename=obj.stored_filename,
         )
+
+
+class ResourceVersion(SQLModel, table=True):
+    # Change counter behind the ETag of a cached read (see deps.etag_guard):
+    # "user:<username>" for places and categories, "trip:<id>" for a trip; the
+    # SYNC_SCOPE row is the global cursor of /api/sync. Rows are never deleted, so a reused trip id keeps counting up.
+    # "signal:<name>" rows wake a background job of the leader worker (see leader.signal_jobs).
+    scope: str = Field(primary_key=True)
+    version: int = 0
+
+
+def _bump_resource_versions(connection, scopes: set[str]):
+    stmt = sqlite_insert(ResourceVersion).values([{"scope": scope, "version": 1} for scope in scopes])
+    connection.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ResourceVersion.scope], set_={"version": ResourceVersion.version + 1}
+        )
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def track_resource_changes(session, flush_context, instances):
+    # Before, not after, the flush: rows the database cascades away (trip links of
+    # a deleted place or trip) can still be followed to the payloads they appear in.
+    trip_ids: set[int] = set()
+    deleted_trip_ids: set[int] = set()
+    day_ids: set[int] = set()
+    item_ids: set[int] = set()
+    booking_ids: set[int] = set()
+    packing_list_ids: set[int] = set()
+    checklist_ids: set[int] = set()
+    category_ids: set[int] = set()
+    place_ids: set[int] = set()
+    usernames: set[str] = set()
+
+    modified = [obj for obj in session.dirty if session.is_modified(obj)]
+    for obj in (*session.new, *modified, *session.deleted):
+        if isinstance(obj, Trip):
+            if obj.id is None:
+                continue  # See track_new_trips
+            trip_ids.add(obj.id)
+            if obj in session.deleted:
+                deleted_trip_ids.add(obj.id)
+            history = inspect(obj).attrs.places.history
+            place_ids.update(place.id for place in (*history.added, *history.deleted))
+        elif isinstance(obj, Place):
+            place_ids.add(obj.id)
+            usernames.add(obj.user)
+        elif isinstance(obj, Category):
+            category_ids.add(obj.id)
+            usernames.add(obj.user)
+        elif isinstance(obj, TripPlaceLink):
+            trip_ids.add(obj.trip_id)
+            place_ids.add(obj.place_id)
+        elif isinstance(obj, TripItem):
+            day_ids.add(obj.day_id)
+        elif isinstance(obj, (TripItemImageLink, TripItemAttachmentLink)):
+            item_ids.add(obj.item_id)
+        elif isinstance(obj, TripBookingAttachmentLink):
+            booking_ids.add(obj.booking_id)
+        elif isinstance(obj, TripPackingListEntry):
+            packing_list_ids.add(obj.packing_list_id)
+        elif isinstance(obj, TripChecklistEntry):
+            checklist_ids.add(obj.checklist_id)
+        elif not isinstance(obj, TripIcsCache) and getattr(obj, "trip_id", None) is not None:
+            trip_ids.add(obj.trip_id)  # TripDay, TripBooking, TripMember, TripShare, lists, attachments
+
+    if not any((trip_ids, day_ids, item_ids, booking_ids, packing_list_ids, checklist_ids, category_ids, place_ids)):
+        return
+
+    connection = session.connection()
+    if deleted_trip_ids:
+        place_ids.update(
+            connection.execute(
+                select(TripPlaceLink.place_id).where(TripPlaceLink.trip_id.in_(deleted_trip_ids))
+            ).scalars()
+        )
+    if category_ids:
+        place_ids.update(connection.execute(select(Place.id).where(Place.category_id.in_(category_ids))).scalars())
+    place_ids.discard(None)
+
+    queries = []
+    if day_ids:
+        queries.append(select(TripDay.trip_id).where(TripDay.id.in_(day_ids)))
+    if item_ids:
+        queries.append(select(TripDay.trip_id).join(TripItem).where(TripItem.id.in_(item_ids)))
+    if booking_ids:
+        queries.append(select(TripBooking.trip_id).where(TripBooking.id.in_(booking_ids)))
+    if packing_list_ids:
+        queries.append(select(TripPackingList.trip_id).where(TripPackingList.id.in_(packing_list_ids)))
+    if checklist_ids:
+        queries.append(select(TripChecklist.trip_id).where(TripChecklist.id.in_(checklist_ids)))
+    if place_ids:
+        # PlaceRead carries trip_count: every trip listing one of these places changes
+        queries.append(select(TripPlaceLink.trip_id).where(TripPlaceLink.place_id.in_(place_ids)))
+        usernames.update(connection.execute(select(Place.user).where(Place.id.in_(place_ids))).scalars())
+    if queries:
+        trip_ids.update(connection.execute(union(*queries)).scalars())
+
+    if trip_ids:
+        connection.execute(delete(TripIcsCache).where(TripIcsCache.trip_id.in_(trip_ids)))
+    scopes = {f"trip:{trip_id}" for trip_id in trip_ids} | {f"user:{username}" for username in usernames}
+    if scopes:
+        _bump_resource_versions(connection, scopes)
+
+
+@event.listens_for(Session, "after_flush")
+def track_new_trips(session, flush_context):
+    # New trips only get their id in the flush, and it may be one a deleted trip had
+    scopes = {f"trip:{obj.id}" for obj in session.new if isinstance(obj, Trip)}
+    if scopes:
+        _bump_resource_versions(session.connection(), scopes)
+
+
+SYNC_SCOPE = "sync"
+# Its version is a random value, set per database and replaced on restore: part of
+# every ETag, so a recreated or restored database never reuses one for other content
+DATABASE_SCOPE = "database"
+
+
+class SyncChange(SQLModel, table=True):
+    # Latest change of every row /api/sync replicates, once per user who can see it.
+    # seq is the SYNC_SCOPE counter of the flush that wrote it, deleted rows stay as
+    # tombstones; a reused id simply overwrites its tombstone with a newer seq.
+    user: str = Field(foreign_key="user.username", ondelete="CASCADE", primary_key=True)
+    kind: str = Field(primary_key=True)  # place, category, trip, day, item
+    object_id: int = Field(primary_key=True)
+    seq: int
+    deleted: bool = False
+
+    __table_args__ = (Index("idx_syncchange_user_seq", "user", "seq"),)
+
+
+class TripDaySyncRead(TripDayBase):
+    id: int
+    trip_id: int
+
+    @classmethod
+    @timed_serialize
+    def serialize(cls, obj: TripDay) -> "TripDaySyncRead":
+        return cls(id=obj.id, trip_id=obj.trip_id, dt=obj.dt, label=obj.label, notes=obj.notes)
+
+
+class SyncDeletedRead(BaseModel):
+    places: list[int] = []
+    categories: list[int] = []
+    trips: list[int] = []
+    days: list[int] = []
+    items: list[int] = []
+
+
+class SyncRead(BaseModel):
+    cursor: int
+    full: bool
+    places: list[PlaceRead] = []
+    categories: list[CategoryRead] = []
+    trips: list[TripReadBase] = []
+    days: list[TripDaySyncRead] = []
+    items: list[TripItemRead] = []
+    deleted: SyncDeletedRead = SyncDeletedRead()
+
+
+def _sync_audience(connection, trip_ids: Iterable[int]) -> dict[int, set[str]]:
+    # Owner and joined members of each trip, the users its rows are synced to
+    audience: dict[int, set[str]] = {trip_id: set() for trip_id in trip_ids}
+    if audience:
+        rows = connection.execute(
+            union(
+                select(Trip.id, Trip.user).where(Trip.id.in_(audience)),
+                select(TripMember.trip_id, TripMember.user).where(
+                    TripMember.trip_id.in_(audience), TripMember.joined_at.is_not(None)
+                ),
+            )
+        )
+        for trip_id, user in rows:
+            audience[trip_id].add(user)
+    return audience
+
+
+def _sync_changes(session, objects: Iterable, deleted: Collection) -> dict[tuple[str, str, int], bool]:
+    # (user, kind, id) -> tombstone, for every synced row `objects` alter. The payloads
+    # are denormalized: an item embeds its place, a place its category and trip_count,
+    # a trip its days count and collaborators, so those follow their dependencies.
+    changes: dict[tuple[str, str, int], bool] = {}
+    trip_rows: dict[int, dict[tuple[str, int], bool]] = {}
+    place_rows: dict[int, bool] = {}
+    item_rows: dict[int, bool] = {}
+    category_ids: set[int] = set()
+    attachment_ids: set[int] = set()
+    joined: set[tuple[int, str]] = set()
+    left: set[tuple[int, str]] = set()
+
+    def mark(rows: dict, key, is_deleted: bool = False):
+        rows[key] = rows.get(key, False) or is_deleted
+
+    for obj in objects:
+        is_deleted = obj in deleted
+        if isinstance(obj, Place):
+            mark(place_rows, obj.id, is_deleted)
+        elif isinstance(obj, Category):
+            mark(changes, (obj.user, "category", obj.id), is_deleted)
+            if not is_deleted:
+                category_ids.add(obj.id)
+        elif isinstance(obj, Trip):
+            mark(trip_rows.setdefault(obj.id, {}), ("trip", obj.id), is_deleted)
+            history = inspect(obj).attrs.places.history
+            for place in (*history.added, *history.deleted):
+                mark(place_rows, place.id)
+        elif isinstance(obj, TripDay):
+            rows = trip_rows.setdefault(obj.trip_id, {})
+            mark(rows, ("day", obj.id), is_deleted)
+            mark(rows, ("trip", obj.trip_id))
+        elif isinstance(obj, TripItem):
+            mark(item_rows, obj.id, is_deleted)
+        elif isinstance(obj, (TripItemImageLink, TripItemAttachmentLink)):
+            mark(item_rows, obj.item_id)
+        elif isinstance(obj, TripPlaceLink):
+            mark(place_rows, obj.place_id)
+        elif isinstance(obj, TripAttachment):
+            attachment_ids.add(obj.id)
+        elif isinstance(obj, TripMember):
+            mark(trip_rows.setdefault(obj.trip_id, {}), ("trip", obj.trip_id))
+            history = inspect(obj).attrs.joined_at.history
+            if is_deleted:
+                if obj.joined_at:
+                    left.add((obj.trip_id, obj.user))
+            elif obj.joined_at and not any(history.deleted):
+                joined.add((obj.trip_id, obj.user))
+    place_rows.pop(None, None)
+
+    if not any((changes, trip_rows, place_rows, item_rows, category_ids, attachment_ids, joined)):
+        return changes
+
+    connection = session.connection()
+    if category_ids:
+        places = connection.execute(select(Place.id).where(Place.category_id.in_(category_ids)))
+        for place_id in places.scalars():
+            mark(place_rows, place_id)
+    if place_rows:
+        places = connection.execute(select(Place.id, Place.user).where(Place.id.in_(place_rows)))
+        for place_id, user in places:
+            mark(changes, (user, "place", place_id), place_rows[place_id])
+
+    queries = []
+    if item_rows:
+        queries.append(select(TripItem.id, TripDay.trip_id).join(TripDay).where(TripItem.id.in_(item_rows)))
+    if place_rows:
+        queries.append(
+            select(TripItem.id, TripDay.trip_id).join(TripDay).where(TripItem.place_id.in_(place_rows))
+        )
+    if attachment_ids:
+        queries.append(
+            select(TripItem.id, TripDay.trip_id)
+            .join(TripDay)
+            .join(TripItemAttachmentLink)
+            .where(TripItemAttachmentLink.attachment_id.in_(attachment_ids))
+        )
+    if queries:
+        for item_id, trip_id in connection.execute(union(*queries)):
+            mark(trip_rows.setdefault(trip_id, {}), ("item", item_id), item_rows.get(item_id, False))
+
+    audience = _sync_audience(connection, trip_rows)
+    for trip_id, user in left:
+        audience.get(trip_id, set()).discard(user)
+        changes[(user, "trip", trip_id)] = True  # The client drops the trip's days and items with it
+    for trip_id, rows in trip_rows.items():
+        for user in audience[trip_id]:
+            for (kind, object_id), is_deleted in rows.items():
+                mark(changes, (user, kind, object_id), is_deleted)
+
+    if joined:
+        # A new member gets the whole trip, not just what changed in this flush
+        trip_ids = {trip_id for trip_id, _ in joined}
+        snapshot: dict[int, list[tuple[str, int]]] = {trip_id: [("trip", trip_id)] for trip_id in trip_ids}
+        for day_id, trip_id in connection.execute(
+            select(TripDay.id, TripDay.trip_id).where(TripDay.trip_id.in_(trip_ids))
+        ):
+            snapshot[trip_id].append(("day", day_id))
+        for item_id, trip_id in connection.execute(
+            select(TripItem.id, TripDay.trip_id).join(TripDay).where(TripDay.trip_id.in_(trip_ids))
+        ):
+            snapshot[trip_id].append(("item", item_id))
+        for trip_id, user in joined:
+            for kind, object_id in snapshot[trip_id]:
+                mark(changes, (user, kind, object_id))
+    return changes
+
+
+@event.listens_for(Session, "before_flush")
+def collect_sync_changes(session, flush_context, instances):
+    # Updates and deletes are resolved before the flush, while cascaded rows and the
+    # members of a deleted trip can still be looked up; inserts wait for their ids.
+    modified = [obj for obj in session.dirty if session.is_modified(obj)]
+    session.info["sync_changes"] = _sync_changes(session, [*modified, *session.deleted], session.deleted)
+
+
+@event.listens_for(Session, "after_flush")
+def record_sync_changes(session, flush_context):
+    changes = session.info.pop("sync_changes", {})
+    for key, is_deleted in _sync_changes(session, session.new, ()).items():
+        changes[key] = changes.get(key, False) or is_deleted
+    if not changes:
+        return
+
+    connection = session.connection()
+    counter = sqlite_insert(ResourceVersion).values(scope=SYNC_SCOPE, version=1)
+    seq = connection.execute(
+        counter.on_conflict_do_update(
+            index_elements=[ResourceVersion.scope], set_={"version": ResourceVersion.version + 1}
+        ).returning(ResourceVersion.version)
+    ).scalar_one()
+
+    stmt = sqlite_insert(SyncChange)
+    connection.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[SyncChange.user, SyncChange.kind, SyncChange.object_id],
+            set_={"seq": stmt.excluded.seq, "deleted": stmt.excluded.deleted},
+        ),
+        [
+            {"user": user, "kind": kind, "object_id": object_id, "seq": seq, "deleted": is_deleted}
+            for (user, kind, object_id), is_deleted in changes.items()
+        ],
+    )
@@ -1,35 +1,93 @@
 import asyncio
 import logging
-from datetime import datetime
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache
 
 import apprise
+from sqlalchemy import delete, event, func, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlmodel import Session, select
 
+from .config import get_settings
 from .db.core import get_engine
-from .models.models import (Trip, TripChecklist, TripChecklistEntry,
-                            TripChecklistItem, TripMember, User)
+from .leader import JobWakeup, register_signal, signal_jobs
+from .models.models import (NotificationCursor, NotificationOutbox,
+                            NotificationStatus, Trip, TripChecklist,
+                            TripChecklistEntry, TripChecklistItem, TripMember,
+                            User)
 from .utils.date import dt_utc
 
 logger = logging.getLogger(__name__)
 
-CHECK_INTERVAL_SECONDS = 60
+# Reminders go through the persisted notificationoutbox: each run of the scheduler
+# queues the ones that came due since the persisted cursor, then hands the outbox to
+# a bounded pool of delivery threads, one task per webhook URL. Rows are deleted once
+# sent, so a restart resumes from both the cursor and whatever is still pending.
+# Between runs the scheduler sleeps until the next due reminder or retry, or until a
+# commit touching a reminder wakes it up, in whichever worker it happens.
+REMINDERS_CURSOR = "reminders"
+REMINDERS_SIGNAL = "reminders"
+OUTBOX_INSERT_CHUNK = 500
+MAX_ATTEMPTS = 6
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 3600
+FAILED_RETENTION = timedelta(days=7)
+APPRISE_CLIENTS_MAX = 256
 
+_pool: ThreadPoolExecutor | None = None
+_in_flight: set[int] = set()
+_wakeup = JobWakeup()
 
-def _seconds_until_next_tick(now: datetime) -> float:
-    epoch = now.timestamp()
-    return (epoch // CHECK_INTERVAL_SECONDS + 1) * CHECK_INTERVAL_SECONDS - epoch
+register_signal(REMINDERS_SIGNAL, _wakeup.wake)
 
 
-def _send_notification(webhook_url: str, title: str, body: str) -> None:
-    try:
-        client = apprise.Apprise()
-        if not client.add(webhook_url):
-            logger.warning("Invalid apprise webhook URL, skipping notification")
+@event.listens_for(Session, "after_flush")
+def _track_reminder_changes(session, flush_context):
+    # new and dirty still hold the flushed objects here
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, (TripChecklistItem, TripChecklistEntry)) and obj.notify_dt is not None:
+            signal_jobs(session, REMINDERS_SIGNAL)
             return
+
+
+def get_notify_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=max(1, get_settings().NOTIFY_WORKERS), thread_name_prefix="notify"
+        )
+    return _pool
+
+
+def shutdown_notify_pool():
+    # Deliveries cut short stay pending in the outbox and are sent after the restart
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+    _in_flight.clear()
+
+
+@lru_cache(maxsize=APPRISE_CLIENTS_MAX)
+def _apprise_client(webhook_url: str) -> apprise.Apprise | None:
+    # Parsing the URL and loading its plugin is done once per webhook, not per message
+    client = apprise.Apprise()
+    if not client.add(webhook_url):
+        return None
+    return client
+
+
+def _send_notification(client: apprise.Apprise, title: str, body: str) -> str | None:
+    # The error, None once sent
+    try:
         if not client.notify(title=title, body=body):
-            logger.warning("Apprise notification failed to send")
-    except Exception:
+            return "Apprise notification failed to send"
+    except Exception as exc:
         logger.exception("Error sending apprise notification")
+        return str(exc) or type(exc).__name__
+    return None
 
 
 def _due_items(session: Session, since: datetime, until: datetime):
@@ -53,46 +111,217 @@ def _due_entries(session: Session, since: datetime, until: datetime):
     ).all()
 
 
-def run_due_notifications(since: datetime, until: datetime) -> None:
+def _due_notifications(session: Session, since: datetime, until: datetime) -> list[dict]:
+    due = [(f"item:{item.id}", item, trip) for item, trip in _due_items(session, since, until)]
+    due += [(f"entry:{entry.id}", entry, trip) for entry, trip in _due_entries(session, since, until)]
+    if not due:
+        return []
+
+    trip_ids = {trip.id for _, _, trip in due}
+    members = session.exec(
+        select(TripMember.trip_id, TripMember.user).where(
+            TripMember.trip_id.in_(trip_ids), TripMember.joined_at.is_not(None)
+        )
+    ).all()
+    recipients_by_trip: dict[int, set[str]] = {}
+    for trip_id, member in members:
+        recipients_by_trip.setdefault(trip_id, set()).add(member)
+    for _, _, trip in due:
+        recipients_by_trip.setdefault(trip.id, set()).add(trip.user)
+
+    usernames = {u for recipients in recipients_by_trip.values() for u in recipients}
+    subscribed = set(
+        session.exec(
+            select(User.username).where(User.username.in_(usernames), User.apprise_webhook_url.is_not(None))
+        ).all()
+    )
+
+    return [
+        {
+            "user": username,
+            "source": source,
+            "due_at": item.notify_dt,
+            "title": f"{trip.name}",
+            "body": f"**{item.text}** _(due {item.notify_dt.strftime('%Y-%m-%d %H:%M')})_",
+            "next_attempt_at": until,
+        }
+        for source, item, trip in due
+        for username in recipients_by_trip.get(trip.id, ())
+        if username in subscribed
+    ]
+
+
+def enqueue_due_notifications(until: datetime) -> None:
     with Session(get_engine()) as session:
-        due = list(_due_items(session, since, until)) + list(_due_entries(session, since, until))
-        if not due:
-            return
+        cursor = session.get(NotificationCursor, REMINDERS_CURSOR)
+        if cursor is None:
+            # First run: reminders before now were handled before the outbox existed
+            cursor = NotificationCursor(name=REMINDERS_CURSOR, until=until)
+        elif until > cursor.until:
+            rows = _due_notifications(session, cursor.until, until)
+            for start in range(0, len(rows), OUTBOX_INSERT_CHUNK):
+                session.exec(
+                    sqlite_insert(NotificationOutbox)
+                    .values(rows[start : start + OUTBOX_INSERT_CHUNK])
+                    .on_conflict_do_nothing()
+                )
+            cursor.until = until
+
+        session.exec(
+            delete(NotificationOutbox).where(
+                NotificationOutbox.status == NotificationStatus.FAILED,
+                NotificationOutbox.next_attempt_at < until - FAILED_RETENTION,
+            )
+        )
+        session.add(cursor)
+        session.commit()
+
 
-        trip_ids = {trip.id for _, trip in due}
-        members = session.exec(
-            select(TripMember.trip_id, TripMember.user).where(
-                TripMember.trip_id.in_(trip_ids), TripMember.joined_at.is_not(None)
+def _next_run_at(now: datetime) -> datetime | None:
+    # Earliest pending reminder or retry, through the partial notify_dt indexes
+    with Session(get_engine()) as session:
+        cursor = session.get(NotificationCursor, REMINDERS_CURSOR)
+        since = cursor.until if cursor else now
+        candidates = [
+            session.exec(
+                select(func.min(model.notify_dt)).where(model.notify_dt > since, model.checked.is_not(True))
+            ).one()
+            for model in (TripChecklistItem, TripChecklistEntry)
+        ]
+        candidates.append(
+            session.exec(
+                select(func.min(NotificationOutbox.next_attempt_at)).where(
+                    NotificationOutbox.status == NotificationStatus.PENDING,
+                    NotificationOutbox.next_attempt_at > now,
+                )
+            ).one()
+        )
+    return min(filter(None, candidates), default=None)
+
+
+def _stale_sources(session: Session, rows: list) -> set[str]:
+    # Sources no longer due at the queued time: checked, deleted or moved since
+    ids: dict[str, set[int]] = defaultdict(set)
+    for row in rows:
+        kind, _, object_id = row.source.partition(":")
+        ids[kind].add(int(object_id))
+
+    current: dict[str, datetime] = {}
+    for kind, model in (("item", TripChecklistItem), ("entry", TripChecklistEntry)):
+        if ids[kind]:
+            pending = session.exec(
+                select(model.id, model.notify_dt).where(model.id.in_(ids[kind]), model.checked.is_not(True))
+            ).all()
+            current.update((f"{kind}:{object_id}", notify_dt) for object_id, notify_dt in pending)
+    return {row.source for row in rows if current.get(row.source) != row.due_at}
+
+
+def _pending_deliveries(now: datetime, skip: set[int]) -> dict[str, dict[str, list]]:
+    # webhook URL -> recipient -> outbox rows, oldest first
+    with Session(get_engine()) as session:
+        rows = session.exec(
+            select(
+                NotificationOutbox.id,
+                NotificationOutbox.user,
+                NotificationOutbox.source,
+                NotificationOutbox.due_at,
+                NotificationOutbox.title,
+                NotificationOutbox.body,
+                NotificationOutbox.attempts,
+                User.apprise_webhook_url,
+            )
+            .join(User, User.username == NotificationOutbox.user)
+            .where(
+                NotificationOutbox.status == NotificationStatus.PENDING,
+                NotificationOutbox.next_attempt_at <= now,
             )
+            .order_by(NotificationOutbox.due_at, NotificationOutbox.id)
         ).all()
-        recipients_by_trip: dict[int, set[str]] = {}
-        for trip_id, member in members:
-            recipients_by_trip.setdefault(trip_id, set()).add(member)
-        for _, trip in due:
-            recipients_by_trip.setdefault(trip.id, set()).add(trip.user)
-
-        usernames = {u for recipients in recipients_by_trip.values() for u in recipients}
-        users = {u.username: u for u in session.exec(select(User).where(User.username.in_(usernames))).all()}
-
-        for item, trip in due:
-            for username in recipients_by_trip.get(trip.id, ()):
-                user = users.get(username)
-                if not user or not user.apprise_webhook_url:
-                    continue
-                _send_notification(
-                    user.apprise_webhook_url,
-                    f"{trip.name}",
-                    f"**{item.text}** _(due {item.notify_dt.strftime('%Y-%m-%d %H:%M')})_",
+
+        stale = _stale_sources(session, rows)
+        dropped = [row.id for row in rows if not row.apprise_webhook_url or row.source in stale]
+        if dropped:
+            session.exec(delete(NotificationOutbox).where(NotificationOutbox.id.in_(dropped)))
+            session.commit()
+        rows = [row for row in rows if row.apprise_webhook_url and row.source not in stale]
+
+    deliveries: dict[str, dict[str, list]] = defaultdict(lambda: defaultdict(list))
+    for row in rows:
+        if row.id not in skip:
+            deliveries[row.apprise_webhook_url][row.user].append(row)
+    return deliveries
+
+
+def _digest(rows: list) -> tuple[str, str]:
+    # Everything due for a recipient goes out as one message
+    if len(rows) == 1:
+        return rows[0].title, rows[0].body
+    return f"{len(rows)} reminders", "\n".join(f"{row.title}: {row.body}" for row in rows)
+
+
+def _record_failure(session: Session, rows: list, error: str, retry: bool, now: datetime):
+    for row in rows:
+        attempts = row.attempts + 1
+        values = {"attempts": attempts, "last_error": error}
+        if retry and attempts < MAX_ATTEMPTS:
+            delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+            values["next_attempt_at"] = now + timedelta(seconds=delay)
+        else:
+            values["status"] = NotificationStatus.FAILED
+            values["next_attempt_at"] = now
+            logger.warning(f"[NOTIFY] Giving up on a notification for {row.user}: {error}")
+        session.exec(update(NotificationOutbox).where(NotificationOutbox.id == row.id).values(**values))
+
+
+def _deliver(webhook_url: str, rows_by_user: dict[str, list]) -> None:
+    # Runs in the notify pool, sends every digest of a webhook in turn
+    client = _apprise_client(webhook_url)
+    for rows in rows_by_user.values():
+        if client is None:
+            error = "Invalid apprise webhook URL"
+        else:
+            error = _send_notification(client, *_digest(rows))
+        with Session(get_engine()) as session:
+            if error is None:
+                session.exec(
+                    delete(NotificationOutbox).where(NotificationOutbox.id.in_([row.id for row in rows]))
                 )
+            else:
+                _record_failure(session, rows, error, client is not None, dt_utc())
+            session.commit()
+
+
+async def dispatch_outbox() -> None:
+    # Does not wait for the sends: a slow webhook only holds its own pool thread, and
+    # its rows are skipped by later ticks until it is done
+    deliveries = await asyncio.to_thread(_pending_deliveries, dt_utc(), set(_in_flight))
+    loop = asyncio.get_running_loop()
+    for webhook_url, rows_by_user in deliveries.items():
+        ids = {row.id for rows in rows_by_user.values() for row in rows}
+        _in_flight.update(ids)
+        future = loop.run_in_executor(get_notify_pool(), _deliver, webhook_url, rows_by_user)
+        future.add_done_callback(lambda f, ids=ids: _delivery_done(f, ids))
+
+
+def _delivery_done(future: asyncio.Future, ids: set[int]):
+    _in_flight.difference_update(ids)
+    _wakeup.wake()  # failed rows now have a retry time
+    if not future.cancelled() and future.exception():
+        logger.error(f"[NOTIFY] Delivery failed: {future.exception()}")
 
 
 async def notify_loop() -> None:
-    last_checked = dt_utc()
+    _wakeup.start()
     while True:
-        await asyncio.sleep(_seconds_until_next_tick(dt_utc()))
-        now = dt_utc()
+        # Cleared before the run: a commit landing during it triggers another one
+        _wakeup.clear()
         try:
-            await asyncio.to_thread(run_due_notifications, last_checked, now)
+            await asyncio.to_thread(enqueue_due_notifications, dt_utc())
+            await dispatch_outbox()
+            next_run_at = await asyncio.to_thread(_next_run_at, dt_utc())
         except Exception:
             logger.exception("Error running due notifications")
-        last_checked = now
+            next_run_at = dt_utc() + timedelta(seconds=RETRY_BASE_SECONDS)
+
+        timeout = None if next_run_at is None else max(0.0, (next_run_at - dt_utc()).total_seconds())
+        await _wakeup.wait(timeout)
@@ -1,24 +1,39 @@
 from pathlib import Path
 from typing import Annotated
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse, PlainTextResponse
 from sqlmodel import func, select
 
-from ..config import (OIDC_CLIENT_SECRET_MASK, Settings, get_settings,
-                      update_config)
+from ..config import (OIDC_CLIENT_SECRET_MASK, OIDC_SETTINGS, Settings,
+                      get_settings, reload_settings, update_config)
 from ..deps import SessionDep, require_admin
+from ..leader import register_signal, signal_jobs
 from ..models.models import (AdminUserRead, Backup, BackupRead, BackupStatus,
                              ConfigRead, ConfigUpdate, Image, MagicLink,
-                             MagicLinkRead, Place, TempPasswordRead,
-                             TripAttachment, User)
-from ..security import hash_password
+                             MagicLinkRead, Place, ProviderCacheStats,
+                             TempPasswordRead, TripAttachment, User)
+from ..security import hash_password, invalidate_oidc_cache
 from ..utils.date import dt_utc, dt_utc_offset
+from ..utils.metrics import render_metrics
+from ..utils.providers.cache import cache_clear, cache_stats
 from ..utils.utils import generate_urlsafe
-from ..utils.zip import process_backup_export
 
 router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
 
+# A config edit is written to config.env by one worker: the others reload it on this signal
+SETTINGS_SIGNAL = "settings"
+
+
+def _reload_server_config():
+    previous = get_settings()
+    settings = reload_settings()
+    if any(getattr(previous, key) != getattr(settings, key) for key in OIDC_SETTINGS):
+        invalidate_oidc_cache()
+
+
+register_signal(SETTINGS_SIGNAL, _reload_server_config, every_worker=True)
+
 
 def _get_quotas(session: SessionDep) -> tuple[dict[str, int], dict[str, int]]:
     places_by_user: dict[str, int] = {
@@ -28,10 +43,14 @@ def _get_quotas(session: SessionDep) -> tuple[dict[str, int], dict[str, int]]:
         ).all()
     }
 
+    # A content-addressed file shared by several of a user's images counts once
+    user_files = select(Image.user, Image.filename, Image.file_size).distinct().subquery()
     image_storage: dict[str, int] = {
         username: total
         for username, total in session.exec(
-            select(Image.user, func.coalesce(func.sum(Image.file_size), 0)).group_by(Image.user)
+            select(user_files.c.user, func.coalesce(func.sum(user_files.c.file_size), 0)).group_by(
+                user_files.c.user
+            )
         ).all()
     }
 
@@ -179,14 +198,33 @@ def update_server_config(config_update: ConfigUpdate, session: SessionDep) -> Co
         # Frontend echoed back the masked placeholder unchanged; don't overwrite the real secret.
         updates.pop("OIDC_CLIENT_SECRET")
     new_settings = update_config(updates)
+    signal_jobs(session, SETTINGS_SIGNAL)
+    session.commit()
     return _config_read_with_masked_secret(new_settings)
 
 
+@router.get("/provider-cache", response_model=ProviderCacheStats)
+def read_provider_cache_stats(session: SessionDep) -> ProviderCacheStats:
+    return cache_stats(session)
+
+
+@router.delete("/provider-cache")
+def clear_provider_cache(session: SessionDep):
+    cache_clear(session)
+    return {}
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @router.post("/backups", response_model=BackupRead)
 def create_admin_backup(
-    background_tasks: BackgroundTasks,
     session: SessionDep,
     current_user: Annotated[str, Depends(require_admin)],
+    incremental: bool = False,
 ) -> BackupRead:
     existing = session.exec(
         select(Backup).where(
@@ -198,11 +236,10 @@ def create_admin_backup(
     if existing:
         raise HTTPException(status_code=409, detail="A backup is already in progress")
 
-    db_backup = Backup(user=current_user, full=True)
+    db_backup = Backup(user=current_user, full=True, incremental=incremental)
     session.add(db_backup)
     session.commit()
     session.refresh(db_backup)
-    background_tasks.add_task(process_backup_export, db_backup.id, True)
     return BackupRead.serialize(db_backup)
 
 
@@ -231,7 +268,8 @@ def download_backup(
         raise HTTPException(status_code=404, detail="Not found")
 
     iso_date = db_backup.created_at.strftime("%Y-%m-%d")
-    filename = f"TRIP_{iso_date}_full_backup.zip"
+    kind = "incremental" if db_backup.incremental else "full"
+    filename = f"TRIP_{iso_date}_{kind}_backup.zip"
     return FileResponse(path=fp, filename=filename, media_type="application/zip")
 
 
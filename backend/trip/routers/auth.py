@@ -9,7 +9,7 @@ from sqlmodel import delete, select
 
 from ..config import get_settings
 from ..db.core import init_user_data
-from ..deps import SessionDep, get_current_username
+from ..deps import AsyncSessionDep, SessionDep, get_current_username
 from ..models.models import (AuthParams, LoginRegisterModel, MagicLink,
                              PendingTOTP, Token, UpdateUserPassword, User)
 from ..security import (create_access_token, create_tokens,
@@ -46,7 +46,7 @@ async def auth_params() -> AuthParams:
 
 @router.post("/oidc/login", response_model=Token)
 async def oidc_login(
-    session: SessionDep,
+    session: AsyncSessionDep,
     code: str = Body(..., embed=True),
     state: str = Body(..., embed=True),
     oidc_state: str = Cookie(None),
@@ -101,20 +101,20 @@ async def oidc_login(
     if not username:
         raise HTTPException(status_code=401, detail="OIDC login failed, preferred_username missing")
 
-    user = session.get(User, username)
+    user = await session.get(User, username)
     if not user:
-        is_first_user = session.exec(select(User)).first() is None
+        is_first_user = (await session.exec(select(User))).first() is None
         # TODO: password is non-null, we must init the pw with something, the model is not made for OIDC
         user = User(
             username=username,
-            password=hash_password(generate_filename("find-something-else")),
+            password=await asyncio.to_thread(hash_password, generate_filename("find-something-else")),
             is_admin=is_first_user,
         )
         session.add(user)
-        session.commit()
+        await session.commit()
         if is_first_user:
             logger.critical(f"[OIDC Login] First user registered, {username} is admin")
-        init_user_data(session, username)
+        await session.run_sync(init_user_data, username)
 
     return create_tokens(data={"sub": username})
 
@@ -144,12 +144,12 @@ def login(req: LoginRegisterModel, session: SessionDep) -> Token | PendingTOTP:
 
 @router.post("/login_totp", response_model=Token)
 async def login_verify_totp(
-    session: SessionDep,
+    session: AsyncSessionDep,
     username: str = Body(..., embed=True),
     pending_code: str = Body(..., embed=True),
     code: str = Body(..., embed=True),
 ) -> Token:
-    user = session.get(User, username)
+    user = await session.get(User, username)
     if not user or not user.totp_enabled:
         raise HTTPException(status_code=401, detail="Invalid TOTP flow")
 
@@ -233,13 +233,13 @@ def refresh_token(refresh_token: str = Body(..., embed=True)):
 @router.post("/update_password")
 async def update_password(
     data: UpdateUserPassword,
-    session: SessionDep,
+    session: AsyncSessionDep,
     current_user: Annotated[str, Depends(get_current_username)],
 ):
     if get_settings().OIDC_CLIENT_ID and get_settings().OIDC_CLIENT_SECRET:
         raise HTTPException(status_code=400, detail="Bad request")
 
-    db_user = session.get(User, current_user)
+    db_user = await session.get(User, current_user)
     if db_user.totp_enabled:
         if not data.code:
             raise HTTPException(status_code=400, detail="Bad request: TOTP missing")
@@ -248,10 +248,11 @@ async def update_password(
         if not success:
             raise HTTPException(status_code=403, detail="Invalid code")
 
-    if not verify_password(data.current, db_user.password):
+    # argon2 is CPU bound by design, kept off the event loop
+    if not await asyncio.to_thread(verify_password, data.current, db_user.password):
         raise HTTPException(status_code=403, detail="Invalid credentials")
 
-    db_user.password = hash_password(data.updated)
+    db_user.password = await asyncio.to_thread(hash_password, data.updated)
     session.add(db_user)
-    session.commit()
+    await session.commit()
     return {}
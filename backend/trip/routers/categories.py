@@ -5,19 +5,22 @@ from sqlalchemy.orm import selectinload
 from sqlmodel import select
 
 from ..config import get_settings
-from ..deps import SessionDep, get_current_username
+from ..deps import ETagGuardDep, SessionDep, get_current_username
 from ..models.models import (Category, CategoryCreate, CategoryRead,
-                             CategoryUpdate, Image, Place)
+                             CategoryUpdate, Image, Place,
+                             remove_unreferenced_images)
 from ..security import verify_exists_and_owns
-from ..utils.utils import b64img_decode, remove_image, save_image_to_file
+from ..utils.images import process_image
+from ..utils.utils import b64img_decode
 
 router = APIRouter(prefix="/api/categories", tags=["categories"])
 
 
 @router.get("", response_model=list[CategoryRead])
 def read_categories(
-    session: SessionDep, current_user: Annotated[str, Depends(get_current_username)]
+    session: SessionDep, etag_guard: ETagGuardDep, current_user: Annotated[str, Depends(get_current_username)]
 ) -> list[CategoryRead]:
+    etag_guard(f"user:{current_user}")
     db_categories = session.exec(
         select(Category).options(selectinload(Category.image)).where(Category.user == current_user)
     ).all()
@@ -35,7 +38,7 @@ def post_category(
     filename = None
     if category.image:
         image_bytes = b64img_decode(category.image)
-        filename, file_size = save_image_to_file(image_bytes, get_settings().PLACE_IMAGE_SIZE)
+        filename, file_size = process_image(image_bytes, get_settings().PLACE_IMAGE_SIZE)
         if not filename:
             raise HTTPException(status_code=400, detail="Bad request")
 
@@ -51,7 +54,7 @@ def post_category(
     except Exception:
         session.rollback()
         if filename:
-            remove_image(filename)
+            remove_unreferenced_images(session.get_bind(), [filename])
         raise HTTPException(status_code=500, detail="Failed to create")
     return CategoryRead.serialize(new_category)
 
@@ -71,7 +74,7 @@ def update_category(
     filename = None
     if category_image:
         image_bytes = b64img_decode(category_image)
-        filename, file_size = save_image_to_file(image_bytes, get_settings().PLACE_IMAGE_SIZE)
+        filename, file_size = process_image(image_bytes, get_settings().PLACE_IMAGE_SIZE)
         if not filename:
             raise HTTPException(status_code=400, detail="Bad request")
 
@@ -94,7 +97,7 @@ def update_category(
     except Exception:
         session.rollback()
         if filename:
-            remove_image(filename)
+            remove_unreferenced_images(session.get_bind(), [filename])
         raise HTTPException(status_code=500, detail="Failed to update")
     return CategoryRead.serialize(db_category)
 
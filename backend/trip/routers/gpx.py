@@ -0,0 +1,41 @@
+import zlib
+
+from fastapi import APIRouter, HTTPException, Query, Response
+
+from ..deps import SessionDep
+from ..models.models import GpxTrack, GpxTrackData, GpxTrackGeometryRead
+from ..utils.gpx import GPX_DIGEST_RE, GPX_MAX_ZOOM, track_coordinates
+
+router = APIRouter(prefix="/api/gpx", tags=["gpx"])
+
+# Tracks are content-addressed: a digest always serves the same bytes. Like asset
+# filenames, the digest found in a place or item read is what grants access, so
+# shared trips can draw their tracks too.
+IMMUTABLE_HEADERS = {"Cache-Control": "public, max-age=31536000, immutable"}
+
+
+def _get_track(session: SessionDep, digest: str) -> tuple[GpxTrack, GpxTrackData]:
+    track = session.get(GpxTrack, digest) if GPX_DIGEST_RE.fullmatch(digest) else None
+    data = session.get(GpxTrackData, digest) if track else None
+    if not data:
+        raise HTTPException(status_code=404, detail="Not found")
+    return track, data
+
+
+@router.get("/{digest}", response_model=GpxTrackGeometryRead)
+def read_gpx_track(
+    session: SessionDep, digest: str, zoom: int | None = Query(default=None, ge=0, le=GPX_MAX_ZOOM)
+) -> Response:
+    # The track points, Douglas-Peucker simplified to half a pixel at `zoom` when given
+    track, data = _get_track(session, digest)
+    geometry = GpxTrackGeometryRead(
+        point_count=track.point_count, coordinates=track_coordinates(data.points, track.point_count, zoom)
+    )
+    return Response(geometry.model_dump_json(), media_type="application/json", headers=IMMUTABLE_HEADERS)
+
+
+@router.get("/{digest}/file")
+def read_gpx_file(session: SessionDep, digest: str) -> Response:
+    # The GPX document as uploaded
+    _, data = _get_track(session, digest)
+    return Response(zlib.decompress(data.data), media_type="application/gpx+xml", headers=IMMUTABLE_HEADERS)
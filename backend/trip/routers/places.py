@@ -1,42 +1,273 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+from sqlalchemy import func, tuple_
 from sqlalchemy.orm import selectinload
 from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from ..config import get_settings
-from ..deps import SessionDep, get_current_username
-from ..models.models import Image, Place, PlaceCreate, PlaceRead, PlaceUpdate
+from ..db.core import get_engine
+from ..db.loaders import place_graph_options
+from ..deps import (AsyncSessionDep, ETagGuardDep, SessionDep,
+                    get_current_username)
+from ..models.models import (Category, GpxTrack, Image, Place, PlaceCreate,
+                             PlaceNearRead, PlaceRead, PlaceUpdate,
+                             TripPlaceLink, place_rtree,
+                             remove_unreferenced_images, store_gpx_track)
 from ..security import verify_exists_and_owns
-from ..utils.utils import (b64img_decode, download_file, patch_image,
-                           remove_image, save_image_to_file)
+from ..utils.geo import MAX_DISTANCE_M, bbox_around, haversine_m
+from ..utils.gpx import GPX_DIGEST_RE, build_gpx_track
+from ..utils.images import process_image, process_patch_image
+from ..utils.utils import b64img_decode, download_file
 
 router = APIRouter(prefix="/api/places", tags=["places"])
 
 
-@router.get("", response_model=list[PlaceRead])
+PLACE_FIELDS = frozenset(PlaceRead.model_fields)
+PLACES_PAGE_MAX = 1000
+PLACES_VIEWPORT_LIMIT = 500
+PLACES_NEAREST_MAX = 100
+NEAREST_START_RADIUS = 1000  # meters
+PLACE_SORTS = {"distance": GpxTrack.distance, "elevation_gain": GpxTrack.elevation_gain}
+_place_list = TypeAdapter(list[PlaceRead])
+
+
+def _parse_bbox(bbox: str) -> tuple[float, float, float, float]:
+    # west,south,east,north; west > east for a box across the antimeridian
+    try:
+        west, south, east, north = (float(value) for value in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Bad request")
+    if not (-180 <= west <= 180 and -180 <= east <= 180 and -90 <= south <= north <= 90):
+        raise HTTPException(status_code=400, detail="Bad request")
+    return west, south, east, north
+
+
+def _place_rows():
+    # (Place, trip_count) for PlaceRead.serialize: the count is computed in SQL, so the
+    # linked trips are not loaded
+    trip_count = (
+        select(func.count()).where(TripPlaceLink.place_id == Place.id).correlate(Place).scalar_subquery()
+    )
+    return select(Place, trip_count).options(
+        selectinload(Place.image),
+        selectinload(Place.category).selectinload(Category.image),
+        selectinload(Place.gpx_track),
+    )
+
+
+def _in_bbox(west: float, south: float, east: float, north: float):
+    # Places inside the box, looked up in the R*Tree and then checked exactly
+    def box(west: float, east: float):
+        return (
+            (place_rtree.c.min_lat <= north)
+            & (place_rtree.c.max_lat >= south)
+            & (place_rtree.c.min_lng <= east)
+            & (place_rtree.c.max_lng >= west)
+        )
+
+    if west <= east:
+        candidates, lng_check = box(west, east), Place.lng.between(west, east)
+    else:
+        candidates, lng_check = box(west, 180) | box(-180, east), (Place.lng >= west) | (Place.lng <= east)
+    return (
+        Place.id.in_(select(place_rtree.c.id).where(candidates)) & Place.lat.between(south, north) & lng_check
+    )
+
+
+@router.get("", response_model=None, responses={200: {"model": list[PlaceRead]}})
 def read_places(
-    session: SessionDep, current_user: Annotated[str, Depends(get_current_username)]
-) -> list[PlaceRead]:
-    db_places = session.exec(
+    session: SessionDep,
+    response: Response,
+    etag_guard: ETagGuardDep,
+    current_user: Annotated[str, Depends(get_current_username)],
+    category: int | None = None,
+    visited: bool | None = None,
+    favorite: bool | None = None,
+    bbox: str | None = None,
+    q: str | None = None,
+    track: bool | None = None,
+    min_distance: float | None = None,
+    max_distance: float | None = None,
+    min_elevation_gain: float | None = None,
+    max_elevation_gain: float | None = None,
+    sort: str | None = None,
+    after: int | None = None,
+    limit: int | None = None,
+    fields: str | None = None,
+) -> Response:
+    # Without parameters: every place, as before. Pages are keyset on id: pass the
+    # last id received as `after`, a page shorter than `limit` is the last one.
+    # `fields` (comma separated, id always included) trims each place to those keys.
+    # Track filters and `sort` (a PLACE_SORTS key, "-" prefixed for descending) use the
+    # stats stored with the GPX track, places without one sort first.
+    if sort is not None and sort.removeprefix("-") not in PLACE_SORTS:
+        raise HTTPException(status_code=400, detail="Bad request")
+    projection = None
+    if fields:
+        projection = {field.strip() for field in fields.split(",") if field.strip()} | {"id"}
+        if not projection <= PLACE_FIELDS:
+            raise HTTPException(status_code=400, detail="Bad request")
+    if limit is not None and not 1 <= limit <= PLACES_PAGE_MAX:
+        raise HTTPException(status_code=400, detail="Bad request")
+
+    etag_guard(f"user:{current_user}")
+    query = _place_rows().where(Place.user == current_user).order_by(Place.id)
+    if category is not None:
+        query = query.where(Place.category_id == category)
+    if visited is not None:
+        query = query.where(func.coalesce(Place.visited, False) == visited)
+    if favorite is not None:
+        query = query.where(func.coalesce(Place.favorite, False) == favorite)
+    if bbox:
+        query = query.where(_in_bbox(*_parse_bbox(bbox)))
+    if q:
+        query = query.where(
+            Place.name.icontains(q, autoescape=True)
+            | Place.place.icontains(q, autoescape=True)
+            | Place.description.icontains(q, autoescape=True)
+        )
+    if track is not None:
+        query = query.where(Place.gpx.is_not(None) if track else Place.gpx.is_(None))
+    track_filters = []
+    if min_distance is not None:
+        track_filters.append(GpxTrack.distance >= min_distance)
+    if max_distance is not None:
+        track_filters.append(GpxTrack.distance <= max_distance)
+    if min_elevation_gain is not None:
+        track_filters.append(GpxTrack.elevation_gain >= min_elevation_gain)
+    if max_elevation_gain is not None:
+        track_filters.append(GpxTrack.elevation_gain <= max_elevation_gain)
+    if track_filters or sort:
+        query = query.outerjoin(GpxTrack, GpxTrack.digest == Place.gpx).where(*track_filters)
+
+    if sort:
+        # Keyset on (sort key, id): the key of the `after` place is looked up, so the
+        # cursor stays a plain id
+        key = func.coalesce(PLACE_SORTS[sort.removeprefix("-")], -1)
+        descending = sort.startswith("-")
+        query = query.order_by(None).order_by(
+            *((key.desc(), Place.id.desc()) if descending else (key, Place.id))
+        )
+        if after is not None:
+            after_key = (
+                select(key)
+                .select_from(Place)
+                .outerjoin(GpxTrack, GpxTrack.digest == Place.gpx)
+                .where(Place.id == after)
+                .scalar_subquery()
+            )
+            cursor = tuple_(after_key, after)
+            query = query.where(
+                tuple_(key, Place.id) < cursor if descending else tuple_(key, Place.id) > cursor
+            )
+    elif after is not None:
+        query = query.where(Place.id > after)
+    if limit is not None:
+        query = query.limit(limit)
+
+    places = [
+        PlaceRead.serialize(place, trip_count=count) for place, count in session.exec(query).all()
+    ]
+    # Encoded by pydantic-core in one pass: jsonable_encoder walking thousands of
+    # places costs more than the query. Carries the ETag headers set above.
+    body = _place_list.dump_json(places, include={"__all__": projection} if projection else None)
+    return Response(body, media_type="application/json", headers=response.headers)
+
+
+@router.get("/viewport", response_model=None, responses={200: {"model": list[PlaceRead]}})
+def read_places_viewport(
+    session: SessionDep,
+    response: Response,
+    etag_guard: ETagGuardDep,
+    current_user: Annotated[str, Depends(get_current_username)],
+    bbox: str,
+    limit: int = PLACES_VIEWPORT_LIMIT,
+    fields: str | None = None,
+) -> Response:
+    # The places of a map viewport, west,south,east,north
+    return read_places(session, response, etag_guard, current_user, bbox=bbox, limit=limit, fields=fields)
+
+
+@router.get("/nearest", response_model=list[PlaceNearRead])
+def read_nearest_places(
+    session: SessionDep,
+    etag_guard: ETagGuardDep,
+    current_user: Annotated[str, Depends(get_current_username)],
+    lat: float,
+    lng: float,
+    limit: int = 10,
+    radius: int | None = None,
+) -> list[PlaceNearRead]:
+    # The `limit` places closest to lat,lng, within `radius` meters if given
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180 and 1 <= limit <= PLACES_NEAREST_MAX):
+        raise HTTPException(status_code=400, detail="Bad request")
+    if radius is not None and radius <= 0:
+        raise HTTPException(status_code=400, detail="Bad request")
+
+    etag_guard(f"user:{current_user}")
+    # Without a radius the search circle grows until it holds `limit` places: the
+    # nearest ones inside it are then the nearest overall
+    search = radius or NEAREST_START_RADIUS
+    while True:
+        candidates = session.exec(
+            select(Place.id, Place.lat, Place.lng).where(
+                Place.user == current_user, _in_bbox(*bbox_around(lat, lng, search))
+            )
+        ).all()
+        distances = sorted(
+            (distance, place_id)
+            for place_id, place_lat, place_lng in candidates
+            if (distance := haversine_m(lat, lng, place_lat, place_lng)) <= search
+        )
+        if radius or len(distances) >= limit or search >= MAX_DISTANCE_M:
+            break
+        search *= 4
+    nearest = {place_id: distance for distance, place_id in distances[:limit]}
+
+    rows = session.exec(_place_rows().where(Place.id.in_(nearest))).all()
+    places = [
+        PlaceNearRead(
+            **PlaceRead.serialize(place, trip_count=count).model_dump(),
+            distance=round(nearest[place.id], 1),
+        )
+        for place, count in rows
+    ]
+    return sorted(places, key=lambda place: place.distance)
+
+
+async def _store_gpx_track(session: AsyncSession, gpx: str | None) -> str | None:
+    # Parsing and simplifying a track is CPU bound, kept off the event loop
+    track = None
+    if gpx and not GPX_DIGEST_RE.fullmatch(gpx):
+        track = await run_in_threadpool(build_gpx_track, gpx)
+    return await session.run_sync(store_gpx_track, gpx, track)
+
+
+async def _read_place(session: AsyncSession, place_id: int) -> PlaceRead:
+    query = (
         select(Place)
-        .options(selectinload(Place.image), selectinload(Place.category), selectinload(Place.trips))
-        .where(Place.user == current_user)
-    ).all()
-    return [PlaceRead.serialize(p) for p in db_places]
+        .options(*place_graph_options())
+        .where(Place.id == place_id)
+        .execution_options(populate_existing=True)
+    )
+    db_place = (await session.exec(query)).one()
+    return PlaceRead.serialize(db_place)
 
 
 @router.post("", response_model=PlaceRead)
 async def create_place(
-    place: PlaceCreate, session: SessionDep, current_user: Annotated[str, Depends(get_current_username)]
+    place: PlaceCreate, session: AsyncSessionDep, current_user: Annotated[str, Depends(get_current_username)]
 ) -> PlaceRead:
     new_place = Place(
         name=place.name,
         lat=place.lat,
         lng=place.lng,
         place=place.place,
-        gpx=place.gpx,
+        gpx=await _store_gpx_track(session, place.gpx),
         allowdog=place.allowdog,
         description=place.description,
         price=place.price,
@@ -51,84 +282,86 @@ async def create_place(
     filename = None
     if place.image:
         if place.image[:4] == "http":
-            fp, file_size = await download_file(place.image)
+            fp, _ = await download_file(place.image)
             if fp:
-                filename = fp.split("/")[-1]
-                await run_in_threadpool(patch_image, fp)
+                filename, file_size = await run_in_threadpool(process_patch_image, fp)
+            if filename:
                 image = Image(filename=filename, file_size=file_size, user=current_user)
                 session.add(image)
-                session.flush()
+                await session.flush()
                 new_place.image_id = image.id
         else:
             image_bytes = b64img_decode(place.image)
             filename, file_size = await run_in_threadpool(
-                save_image_to_file, image_bytes, get_settings().PLACE_IMAGE_SIZE
+                process_image, image_bytes, get_settings().PLACE_IMAGE_SIZE
             )
             if not filename:
                 raise HTTPException(status_code=400, detail="Bad request")
             image = Image(filename=filename, file_size=file_size, user=current_user)
             session.add(image)
-            session.flush()
+            await session.flush()
             new_place.image_id = image.id
 
     try:
         session.add(new_place)
-        session.commit()
+        await session.commit()
     except Exception:
-        session.rollback()
+        await session.rollback()
         if filename:
-            remove_image(filename)
+            await run_in_threadpool(remove_unreferenced_images, get_engine(), [filename])
         raise HTTPException(status_code=500, detail="Failed to create")
-    return PlaceRead.serialize(new_place)
+    return await _read_place(session, new_place.id)
 
 
 @router.put("/{place_id}", response_model=PlaceRead)
 async def update_place(
-    session: SessionDep,
+    session: AsyncSessionDep,
     place_id: int,
     place: PlaceUpdate,
     current_user: Annotated[str, Depends(get_current_username)],
 ) -> PlaceRead:
-    db_place = session.get(Place, place_id)
+    db_place = await session.get(Place, place_id)
     verify_exists_and_owns(current_user, db_place)
 
     place_data = place.model_dump(exclude_unset=True)
+    if place_data.get("gpx"):
+        place_data["gpx"] = await _store_gpx_track(session, place_data["gpx"])
     image = place_data.pop("image", None)
     filename = None
     if image:
         image_updated = False
         if image[:4] == "http":
-            fp, file_size = await download_file(place.image)
+            fp, _ = await download_file(place.image)
             if fp:
-                filename = fp.split("/")[-1]
-                await run_in_threadpool(patch_image, fp)
+                filename, file_size = await run_in_threadpool(process_patch_image, fp)
+            if filename:
                 image = Image(filename=filename, file_size=file_size, user=current_user)
                 session.add(image)
-                session.flush()
+                await session.flush()
                 image_updated = True
         else:
             image_bytes = b64img_decode(place.image)
             filename, file_size = await run_in_threadpool(
-                save_image_to_file, image_bytes, get_settings().PLACE_IMAGE_SIZE
+                process_image, image_bytes, get_settings().PLACE_IMAGE_SIZE
             )
             if not filename:
                 raise HTTPException(status_code=400, detail="Bad request")
             image = Image(filename=filename, file_size=file_size, user=current_user)
             session.add(image)
-            session.flush()
-            session.refresh(db_place)
+            await session.flush()
+            await session.refresh(db_place)
             image_updated = True
 
         if image_updated:
             if db_place.image_id:
-                old_image = session.get(Image, db_place.image_id)
+                old_image = await session.get(Image, db_place.image_id)
                 try:
-                    session.delete(old_image)
+                    await session.delete(old_image)
                     db_place.image_id = None
-                    session.refresh(db_place)
+                    await session.refresh(db_place)
                 except Exception:
                     if filename:
-                        remove_image(filename)
+                        await run_in_threadpool(remove_unreferenced_images, get_engine(), [filename])
                     raise HTTPException(status_code=400, detail="Bad request")
             db_place.image_id = image.id
 
@@ -137,13 +370,13 @@ async def update_place(
 
     try:
         session.add(db_place)
-        session.commit()
+        await session.commit()
     except Exception:
-        session.rollback()
+        await session.rollback()
         if filename:
-            remove_image(filename)
+            await run_in_threadpool(remove_unreferenced_images, get_engine(), [filename])
         raise HTTPException(status_code=500, detail="Failed to update")
-    return PlaceRead.serialize(db_place)
+    return await _read_place(session, db_place.id)
 
 
 @router.delete("/{place_id}")
@@ -175,9 +408,9 @@ def get_place(
 ) -> PlaceRead:
     db_place = session.exec(
         select(Place)
-        .options(selectinload(Place.image), selectinload(Place.category))
+        .options(*place_graph_options())
         .where(Place.id == place_id)
     ).first()
     verify_exists_and_owns(current_user, db_place)
 
-    return PlaceRead.serialize(db_place, exclude_gpx=False)
+    return PlaceRead.serialize(db_place)
@@ -1,15 +1,19 @@
 import asyncio
 import logging
+from itertools import pairwise
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from ..config import get_settings
-from ..deps import SessionDep, get_current_username
-from ..models.models import (LatitudeLongitude, ProviderBoundaries,
-                             ProviderPlaceResult, RoutingQuery,
-                             RoutingResponse, User)
+from ..deps import AsyncSessionDep, get_current_username
+from ..models.models import (LatitudeLongitude, LatLng, Place,
+                             ProviderBoundaries, ProviderPlaceResult,
+                             RoutingQuery, RoutingResponse, User)
 from ..utils.csv import extract_takeout_urls
+from ..utils.duplicates import DEFAULT_DUPLICATE_DIST, PlaceGrid
 from ..utils.providers import (BaseMapProvider, GoogleMapsProvider,
                                OpenStreetMapProvider)
 from ..utils.utils import enforce_upload_size
@@ -20,9 +24,13 @@ router = APIRouter(prefix="/api/completions", tags=["completions"])
 
 logger = logging.getLogger(__name__)
 
+# Provider calls a single request runs at once (bulk lookups, route legs): the
+# upstream APIs rate-limit per key, a day of 30 legs must not fire 30 requests at once
+PROVIDER_CONCURRENCY = 4
 
-def _get_user(session: SessionDep, current_user: str) -> User:
-    db_user = session.get(User, current_user)
+
+async def _get_user(session: AsyncSession, current_user: str) -> User:
+    db_user = await session.get(User, current_user)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
@@ -35,8 +43,8 @@ def _raise_missing_apikey(db_user, raise_msg=""):
         )
 
 
-def _get_map_provider(session: SessionDep, current_user: str) -> BaseMapProvider:
-    db_user = _get_user(session, current_user)
+async def _get_map_provider(session: AsyncSession, current_user: str) -> BaseMapProvider:
+    db_user = await _get_user(session, current_user)
     provider_type = getattr(db_user, "map_provider", "osm").lower()
     if provider_type == "google":
         _raise_missing_apikey(db_user)
@@ -45,6 +53,25 @@ def _get_map_provider(session: SessionDep, current_user: str) -> BaseMapProvider
     return OpenStreetMapProvider()
 
 
+async def _flag_duplicates(
+    session: AsyncSession, current_user: str, results: list[ProviderPlaceResult]
+) -> list[ProviderPlaceResult]:
+    # Points each imported candidate at the existing place it duplicates, if any
+    db_user = await _get_user(session, current_user)
+    if db_user.duplicate_dist == 0 or not results:
+        return results
+
+    places = (
+        await session.exec(
+            select(Place.id, Place.name, Place.lat, Place.lng).where(Place.user == current_user)
+        )
+    ).all()
+    grid = PlaceGrid(places, db_user.duplicate_dist or DEFAULT_DUPLICATE_DIST)
+    for result in results:
+        result.duplicate_of = grid.find_duplicate(result.name, result.lat, result.lng)
+    return results
+
+
 def _merge_kmz_result(
     kmz_place: dict, provider_result: ProviderPlaceResult | None
 ) -> ProviderPlaceResult | None:
@@ -83,7 +110,7 @@ async def _process_batch(
     if not items:
         return []
 
-    semaphore = asyncio.Semaphore(4)
+    semaphore = asyncio.Semaphore(PROVIDER_CONCURRENCY)
 
     async def _process_with_semaphore(item):
         async with semaphore:
@@ -107,14 +134,15 @@ async def _process_batch(
 @router.post("/bulk")
 async def bulk_to_places(
     data: list[str],
-    session: SessionDep,
+    session: AsyncSessionDep,
     current_user: Annotated[str, Depends(get_current_username)],
 ) -> list[ProviderPlaceResult]:
-    provider = _get_map_provider(session, current_user)
+    provider = await _get_map_provider(session, current_user)
+    # Read once: the batch runs concurrently and a session can't be shared between tasks
+    db_user = await _get_user(session, current_user)
 
     async def _process_content(content: str, provider: BaseMapProvider) -> ProviderPlaceResult | None:
         if "google.com/maps" in content:
-            db_user = _get_user(session, current_user)
             _raise_missing_apikey(db_user, "Google Maps links provided but missing API key")
             provider = GoogleMapsProvider(api_key=db_user.google_apikey)
             if result := await provider.url_to_place(content):
@@ -124,19 +152,20 @@ async def bulk_to_places(
                 return await provider.result_to_place(results[0])
         return None
 
-    return await _process_batch(data, provider, _process_content)
+    results = await _process_batch(data, provider, _process_content)
+    return await _flag_duplicates(session, current_user, results)
 
 
 @router.get("/search")
 async def text_search(
     q: str,
-    session: SessionDep,
+    session: AsyncSessionDep,
     current_user: Annotated[str, Depends(get_current_username)],
 ) -> list[ProviderPlaceResult]:
     if not q or not q.strip():
         raise HTTPException(status_code=400, detail="Query required")
 
-    provider = _get_map_provider(session, current_user)
+    provider = await _get_map_provider(session, current_user)
     results = await provider.text_search(q.strip())
 
     if not results:
@@ -151,10 +180,10 @@ async def text_search(
 @router.post("/nearby")
 async def nearby_search(
     data: LatitudeLongitude,
-    session: SessionDep,
+    session: AsyncSessionDep,
     current_user: Annotated[str, Depends(get_current_username)],
 ) -> list[ProviderPlaceResult]:
-    provider = _get_map_provider(session, current_user)
+    provider = await _get_map_provider(session, current_user)
 
     location = {"latitude": data.latitude, "longitude": data.longitude}
     results = await provider.search_nearby(location)
@@ -171,13 +200,13 @@ async def nearby_search(
 @router.get("/geocode")
 async def geocode_search(
     q: str,
-    session: SessionDep,
+    session: AsyncSessionDep,
     current_user: Annotated[str, Depends(get_current_username)],
 ) -> ProviderBoundaries:
     if not q or not q.strip():
         raise HTTPException(status_code=400, detail="Query required")
 
-    provider = _get_map_provider(session, current_user)
+    provider = await _get_map_provider(session, current_user)
     if not (bounds := await provider.geocode(q.strip())):
         raise HTTPException(status_code=404, detail="Location not found")
     return bounds
@@ -186,26 +215,68 @@ async def geocode_search(
 @router.post("/route")
 async def get_route(
     data: RoutingQuery,
-    session: SessionDep,
+    session: AsyncSessionDep,
     current_user: Annotated[str, Depends(get_current_username)],
 ) -> RoutingResponse:
     if len(data.coordinates) < 2:
         raise HTTPException(status_code=400, detail="Coordinates required")
-    provider = _get_map_provider(session, current_user)
-    return await provider.get_route(data)
+    provider = await _get_map_provider(session, current_user)
+    return await provider.cached_route(data)
+
+
+@router.post("/routes")
+async def get_route_legs(
+    data: RoutingQuery,
+    session: AsyncSessionDep,
+    current_user: Annotated[str, Depends(get_current_username)],
+) -> list[RoutingResponse | None]:
+    # Every consecutive leg of a day in one call. Legs come from the route cache
+    # unless their endpoints moved, so reopening an itinerary only computes what changed.
+    if len(data.coordinates) < 2:
+        raise HTTPException(status_code=400, detail="Coordinates required")
+    provider = await _get_map_provider(session, current_user)
+
+    semaphore = asyncio.Semaphore(PROVIDER_CONCURRENCY)
+
+    async def _route_leg(origin: LatLng, destination: LatLng) -> RoutingResponse:
+        async with semaphore:
+            return await provider.cached_route(
+                RoutingQuery(
+                    coordinates=[origin, destination],
+                    profile=data.profile,
+                    tolerance=data.tolerance,
+                    encoding=data.encoding,
+                )
+            )
+
+    results = await asyncio.gather(
+        *[_route_leg(origin, destination) for origin, destination in pairwise(data.coordinates)],
+        return_exceptions=True,
+    )
+    if all(isinstance(r, HTTPException) for r in results):
+        raise results[0]
+
+    legs = []
+    for r in results:
+        if isinstance(r, Exception):
+            logger.error(f"[ROUTE LEGS]: A leg failed, {r}")
+            legs.append(None)
+        else:
+            legs.append(r)
+    return legs
 
 
 #####
 ## Google-specific
 @router.post("/mymaps-import")
 async def google_mymaps_kmz_import(
-    session: SessionDep,
+    session: AsyncSessionDep,
     current_user: Annotated[str, Depends(get_current_username)],
     file: UploadFile = File(...),
 ) -> list[ProviderPlaceResult]:
     enforce_upload_size(file, get_settings().PROVIDER_IMPORT_MAX_SIZE)
 
-    db_user = _get_user(session, current_user)
+    db_user = await _get_user(session, current_user)
     _raise_missing_apikey(db_user)
     provider = GoogleMapsProvider(api_key=db_user.google_apikey)
 
@@ -235,18 +306,19 @@ async def google_mymaps_kmz_import(
 
         return _merge_kmz_result(place, result)
 
-    return await _process_batch(places, provider, _process_kml_place)
+    results = await _process_batch(places, provider, _process_kml_place)
+    return await _flag_duplicates(session, current_user, results)
 
 
 @router.post("/takeout-import")
 async def google_takeout_csv_import(
-    session: SessionDep,
+    session: AsyncSessionDep,
     current_user: Annotated[str, Depends(get_current_username)],
     file: UploadFile = File(...),
 ) -> list[ProviderPlaceResult]:
     enforce_upload_size(file, get_settings().PROVIDER_IMPORT_MAX_SIZE)
 
-    db_user = _get_user(session, current_user)
+    db_user = await _get_user(session, current_user)
     _raise_missing_apikey(db_user)
     provider = GoogleMapsProvider(api_key=db_user.google_apikey)
 
@@ -262,19 +334,20 @@ async def google_takeout_csv_import(
             return await provider.result_to_place(place_data)
         return None
 
-    return await _process_batch(urls, provider, _process_url)
+    results = await _process_batch(urls, provider, _process_url)
+    return await _flag_duplicates(session, current_user, results)
 
 
 @router.get("/google/resolve-shortlink/{link_id}")
 async def google_resolve_shortlink(
     link_id: str,
-    session: SessionDep,
+    session: AsyncSessionDep,
     current_user: Annotated[str, Depends(get_current_username)],
 ) -> ProviderPlaceResult:
     if not link_id:
         raise HTTPException(status_code=400, detail="Google ID is missing, resolve failed")
 
-    db_user = _get_user(session, current_user)
+    db_user = await _get_user(session, current_user)
     _raise_missing_apikey(db_user)
     provider = GoogleMapsProvider(api_key=db_user.google_apikey)
     url = await provider._resolve_shortlink(link_id)
@@ -1,19 +1,19 @@
 from pathlib import Path
 from typing import Annotated
 
-from fastapi import (APIRouter, BackgroundTasks, Body, Depends, File,
-                     HTTPException, UploadFile)
+from fastapi import (APIRouter, Body, Depends, File, HTTPException,
+                     UploadFile)
 from fastapi.responses import FileResponse
 from sqlmodel import select
 
 from ..config import get_settings
-from ..deps import SessionDep, get_current_username
+from ..deps import AsyncSessionDep, SessionDep, get_current_username
 from ..models.models import (Backup, BackupRead, BackupStatus, User, UserRead,
                              UserUpdate)
-from ..security import generate_totp_secret, hash_api_token, verify_totp_code
+from ..security import (api_token_lookup, generate_totp_secret, hash_api_token,
+                        verify_totp_code)
 from ..utils.utils import check_update, generate_urlsafe
-from ..utils.zip import (process_backup_export, process_backup_import,
-                         process_legacy_import)
+from ..utils.zip import process_backup_import, process_legacy_import
 
 router = APIRouter(prefix="/api/settings", tags=["settings"])
 
@@ -56,8 +56,10 @@ def put_user_settings(
 
 
 @router.post("/totp")
-async def enable_totp(session: SessionDep, current_user: Annotated[str, Depends(get_current_username)]):
-    db_user = session.get(User, current_user)
+async def enable_totp(
+    session: AsyncSessionDep, current_user: Annotated[str, Depends(get_current_username)]
+):
+    db_user = await session.get(User, current_user)
     if not db_user:
         raise HTTPException(status_code=404, detail="The resource does not exist")
 
@@ -67,17 +69,17 @@ async def enable_totp(session: SessionDep, current_user: Annotated[str, Depends(
     totp_secret = generate_totp_secret()
     db_user.totp_secret = totp_secret
     session.add(db_user)
-    session.commit()
+    await session.commit()
     return {"secret": totp_secret}
 
 
 @router.post("/totp/verify")
 async def verify_totp(
-    session: SessionDep,
+    session: AsyncSessionDep,
     current_user: Annotated[str, Depends(get_current_username)],
     code: str = Body(..., embed=True),
 ):
-    db_user = session.get(User, current_user)
+    db_user = await session.get(User, current_user)
     if not db_user:
         raise HTTPException(status_code=404, detail="The resource does not exist")
 
@@ -90,17 +92,17 @@ async def verify_totp(
 
     db_user.totp_enabled = True
     session.add(db_user)
-    session.commit()
+    await session.commit()
     return {}
 
 
 @router.delete("/totp")
 async def delete_totp(
-    session: SessionDep,
+    session: AsyncSessionDep,
     current_user: Annotated[str, Depends(get_current_username)],
     code: str = Body(..., embed=True),
 ):
-    db_user = session.get(User, current_user)
+    db_user = await session.get(User, current_user)
     if not db_user or not db_user.totp_enabled or not db_user.totp_secret:
         raise HTTPException(status_code=400, detail="Bad request")
 
@@ -112,18 +114,17 @@ async def delete_totp(
     db_user.totp_enabled = False
 
     session.add(db_user)
-    session.commit()
+    await session.commit()
     return {}
 
 
 @router.get("/checkversion")
-async def check_version(session: SessionDep, current_user: Annotated[str, Depends(get_current_username)]):
+async def check_version(current_user: Annotated[str, Depends(get_current_username)]):
     return await check_update()
 
 
 @router.post("/backups", response_model=BackupRead)
 def create_backup_export(
-    background_tasks: BackgroundTasks,
     session: SessionDep,
     current_user: Annotated[str, Depends(get_current_username)],
 ) -> BackupRead:
@@ -141,7 +142,6 @@ def create_backup_export(
     session.add(db_backup)
     session.commit()
     session.refresh(db_backup)
-    background_tasks.add_task(process_backup_export, db_backup.id)
     return BackupRead.serialize(db_backup)
 
 
@@ -224,6 +224,7 @@ def generate_user_api_token(
 
     token = generate_urlsafe()
     setattr(db_user, "api_token", hash_api_token(token))
+    setattr(db_user, "api_token_lookup", api_token_lookup(token))
     session.add(db_user)
     session.commit()
     return token
@@ -236,6 +237,7 @@ def delete_user_api_token(session: SessionDep, current_user: Annotated[str, Depe
         raise HTTPException(status_code=400, detail="Bad request")
 
     setattr(db_user, "api_token", None)
+    setattr(db_user, "api_token_lookup", None)
     session.add(db_user)
     session.commit()
     return {}
@@ -0,0 +1,129 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+
+from ..db.loaders import item_graph_options, place_graph_options
+from ..deps import SessionDep, get_current_username
+from ..models.models import (SYNC_SCOPE, Category, CategoryRead, Place,
+                             PlaceRead, ResourceVersion, SyncChange,
+                             SyncDeletedRead, SyncRead, Trip, TripDay,
+                             TripDaySyncRead, TripItem, TripItemRead,
+                             TripMember, TripReadBase)
+
+router = APIRouter(prefix="/api/sync", tags=["sync"])
+
+SYNC_KINDS = ("place", "category", "trip", "day", "item")
+
+
+def _visible_trip_ids(current_user: str):
+    return (
+        select(Trip.id)
+        .outerjoin(TripMember)
+        .where(
+            (Trip.user == current_user)
+            | ((TripMember.user == current_user) & (TripMember.joined_at.is_not(None)))
+        )
+    )
+
+
+@router.get("", response_model=SyncRead)
+def read_sync(
+    session: SessionDep, current_user: Annotated[str, Depends(get_current_username)], since: int = 0
+) -> SyncRead:
+    # Rows changed after the `since` cursor plus the ids deleted meanwhile; a trip in
+    # deleted.trips takes its days and items along. No cursor, or one this database
+    # never issued (restored backup), gets a full snapshot to rebuild the replica from.
+    # The cursor is read first: every change it covers is committed by then, anything
+    # committed while the rows are read is sent once more on the next call.
+    cursor = (
+        session.exec(select(ResourceVersion.version).where(ResourceVersion.scope == SYNC_SCOPE)).first() or 0
+    )
+    full = since <= 0 or since > cursor
+
+    ids: dict[str, set[int]] = {kind: set() for kind in SYNC_KINDS}
+    tombstones: dict[str, set[int]] = {kind: set() for kind in SYNC_KINDS}
+    if not full:
+        changes = session.exec(
+            select(SyncChange.kind, SyncChange.object_id, SyncChange.deleted).where(
+                SyncChange.user == current_user, SyncChange.seq > since
+            )
+        )
+        for kind, object_id, deleted in changes:
+            (tombstones if deleted else ids)[kind].add(object_id)
+
+    def changed(query, column, kind: str):
+        # Everything visible on a full sync, the changed ids of `kind` otherwise
+        return query if full else query.where(column.in_(ids[kind]))
+
+    visible_trip_ids = _visible_trip_ids(current_user)
+    places = categories = trips = days = items = []
+    if full or ids["place"]:
+        places = session.exec(
+            changed(
+                select(Place).options(*place_graph_options()).where(Place.user == current_user),
+                Place.id,
+                "place",
+            )
+        ).all()
+    if full or ids["category"]:
+        categories = session.exec(
+            changed(
+                select(Category).options(selectinload(Category.image)).where(Category.user == current_user),
+                Category.id,
+                "category",
+            )
+        ).all()
+    if full or ids["trip"]:
+        trips = session.exec(
+            changed(
+                select(Trip)
+                .options(selectinload(Trip.image), selectinload(Trip.days), selectinload(Trip.memberships))
+                .where(Trip.id.in_(visible_trip_ids)),
+                Trip.id,
+                "trip",
+            )
+        ).all()
+    if full or ids["day"]:
+        days = session.exec(
+            changed(select(TripDay).where(TripDay.trip_id.in_(visible_trip_ids)), TripDay.id, "day")
+        ).all()
+    if full or ids["item"]:
+        items = session.exec(
+            changed(
+                select(TripItem)
+                .options(*item_graph_options())
+                .join(TripDay)
+                .where(TripDay.trip_id.in_(visible_trip_ids)),
+                TripItem.id,
+                "item",
+            )
+        ).all()
+
+    # A changed row that is gone or no longer visible is as good as deleted
+    for kind, rows in (
+        ("place", places),
+        ("category", categories),
+        ("trip", trips),
+        ("day", days),
+        ("item", items),
+    ):
+        tombstones[kind].update(ids[kind].difference(row.id for row in rows))
+
+    return SyncRead(
+        cursor=cursor,
+        full=full,
+        places=[PlaceRead.serialize(place) for place in places],
+        categories=[CategoryRead.serialize(category) for category in categories],
+        trips=[TripReadBase.serialize(trip) for trip in trips],
+        days=[TripDaySyncRead.serialize(day) for day in days],
+        items=[TripItemRead.serialize(item) for item in items],
+        deleted=SyncDeletedRead(
+            places=sorted(tombstones["place"]),
+            categories=sorted(tombstones["category"]),
+            trips=sorted(tombstones["trip"]),
+            days=sorted(tombstones["day"]),
+            items=sorted(tombstones["item"]),
+        ),
+    )
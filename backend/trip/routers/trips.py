@@ -1,32 +1,34 @@
+from datetime import UTC, datetime
 from hashlib import md5
-from io import BytesIO
 from typing import Annotated
 
 from fastapi import (APIRouter, Depends, File, HTTPException, Request,
                      Response, UploadFile)
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy import update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import selectinload
 from sqlmodel import select
 
 from ..config import get_settings
-from ..deps import SessionDep, get_current_username
+from ..db.loaders import trip_graph_options
+from ..deps import (AsyncSessionDep, ETagGuardDep, SessionDep,
+                    get_current_username)
 from ..models.models import (Image, ItemImageInput, Place, Trip,
                              TripAttachment, TripAttachmentRead,
-                             TripBalanceEntry, TripBooking,
-                             TripCalendarDetails, TripChecklist,
-                             TripChecklistCreate, TripChecklistEntry,
-                             TripChecklistEntryCreate, TripChecklistEntryRead,
-                             TripChecklistEntryUpdate, TripChecklistItem,
-                             TripChecklistItemCreate, TripChecklistItemRead,
-                             TripChecklistItemUpdate, TripChecklistRead,
-                             TripChecklistUpdate, TripCreate, TripDay,
-                             TripDayBase, TripDayRead, TripInvitationRead,
-                             TripItem, TripItemCreate, TripItemRead,
-                             TripItemUpdate, TripMember, TripMemberCreate,
-                             TripMemberRead, TripPackingList,
-                             TripPackingListCreate, TripPackingListEntry,
-                             TripPackingListEntryCreate,
+                             TripBalanceEntry, TripCalendarDetails,
+                             TripChecklist, TripChecklistCreate,
+                             TripChecklistEntry, TripChecklistEntryCreate,
+                             TripChecklistEntryRead, TripChecklistEntryUpdate,
+                             TripChecklistItem, TripChecklistItemCreate,
+                             TripChecklistItemRead, TripChecklistItemUpdate,
+                             TripChecklistRead, TripChecklistUpdate,
+                             TripCreate, TripDay, TripDayBase, TripDayRead,
+                             TripIcsCache, TripInvitationRead, TripItem,
+                             TripItemCreate, TripItemRead, TripItemUpdate,
+                             TripMember, TripMemberCreate, TripMemberRead,
+                             TripPackingList, TripPackingListCreate,
+                             TripPackingListEntry, TripPackingListEntryCreate,
                              TripPackingListEntryRead,
                              TripPackingListEntryUpdate, TripPackingListItem,
                              TripPackingListItemCreate,
@@ -34,13 +36,14 @@ from ..models.models import (Image, ItemImageInput, Place, Trip,
                              TripPackingListItemUpdate, TripPackingListRead,
                              TripPackingListUpdate, TripRead, TripReadBase,
                              TripShare, TripShareCreate, TripShareDetails,
-                             TripShareRead, TripUpdate, User)
+                             TripShareRead, TripUpdate, User,
+                             remove_unreferenced_images)
 from ..utils.date import dt_utc
 from ..utils.ical import build_trip_ics, ics_filename
+from ..utils.images import process_image, process_images
 from ..utils.utils import (attachments_trip_folder_path, b64img_decode,
-                           generate_urlsafe, remove_image, save_attachment,
-                           save_image_to_file)
-from ..utils.zip import zip_trip_attachments
+                           generate_urlsafe, save_attachment)
+from ..utils.zip import stream_trip_attachments
 
 router = APIRouter(prefix="/api/trips", tags=["trips"])
 
@@ -176,17 +179,13 @@ def has_pending_invitations(
 
 @router.get("/{trip_id}", response_model=TripRead)
 def read_trip(
-    session: SessionDep, trip_id: int, current_user: Annotated[str, Depends(get_current_username)]
+    session: SessionDep,
+    trip_id: int,
+    etag_guard: ETagGuardDep,
+    current_user: Annotated[str, Depends(get_current_username)],
 ) -> TripRead:
-    db_trip = session.exec(
-        select(Trip)
-        .options(
-            selectinload(Trip.days).selectinload(TripDay.items),
-            selectinload(Trip.days).selectinload(TripDay.bookings).selectinload(TripBooking.attachments),
-            selectinload(Trip.places),
-            selectinload(Trip.image),
-            selectinload(Trip.memberships),
-        )
+    is_allowed = session.exec(
+        select(Trip.id)
         .outerjoin(TripMember)
         .where(
             Trip.id == trip_id,
@@ -194,9 +193,11 @@ def read_trip(
             | ((TripMember.user == current_user) & (TripMember.joined_at.is_not(None))),
         )
     ).first()
-
-    if not db_trip:
+    if not is_allowed:
         raise HTTPException(status_code=404, detail="Not found")
+
+    etag_guard(f"trip:{trip_id}")
+    db_trip = session.exec(select(Trip).options(*trip_graph_options()).where(Trip.id == trip_id)).one()
     return TripRead.serialize(db_trip)
 
 
@@ -209,7 +210,7 @@ def create_trip(
     filename = None
     if trip.image:
         image_bytes = b64img_decode(trip.image)
-        filename, file_size = save_image_to_file(image_bytes, get_settings().TRIP_IMAGE_SIZE)
+        filename, file_size = process_image(image_bytes, get_settings().TRIP_IMAGE_SIZE)
         if not filename:
             raise HTTPException(status_code=400, detail="Bad request")
 
@@ -224,7 +225,7 @@ def create_trip(
     except Exception:
         session.rollback()
         if filename:
-            remove_image(filename)
+            remove_unreferenced_images(session.get_bind(), [filename])
         raise HTTPException(status_code=500, detail="Failed to create")
     return TripReadBase.serialize(new_trip)
 
@@ -266,7 +267,7 @@ def update_trip(
     filename = None
     if trip_image:
         image_bytes = b64img_decode(trip_image)
-        filename, file_size = save_image_to_file(image_bytes, get_settings().TRIP_IMAGE_SIZE)
+        filename, file_size = process_image(image_bytes, get_settings().TRIP_IMAGE_SIZE)
         if not filename:
             raise HTTPException(status_code=400, detail="Bad request")
 
@@ -289,8 +290,12 @@ def update_trip(
     except Exception:
         session.rollback()
         if filename:
-            remove_image(filename)
+            remove_unreferenced_images(session.get_bind(), [filename])
         raise HTTPException(status_code=500, detail="Failed to update")
+
+    # commit() expired db_trip; reload it with the full graph instead of lazy-loading
+    # it row by row during serialization.
+    db_trip = session.exec(select(Trip).options(*trip_graph_options()).where(Trip.id == trip_id)).one()
     return TripRead.serialize(db_trip)
 
 
@@ -434,24 +439,32 @@ def _resolve_item_images(
     current_user: str,
     allowed_image_ids: set[int],
 ) -> tuple[list[Image], list[str]]:
-    resolved: list[Image] = []
-    new_filenames: list[str] = []
+    existing: dict[int, Image] = {}
     for entry in images:
         if entry.id is not None:
             image = session.get(Image, entry.id) if entry.id in allowed_image_ids else None
             if not image:
                 raise HTTPException(status_code=400, detail="Image not found")
-            resolved.append(image)
+            existing[entry.id] = image
+
+    # New gallery images are decoded together in the image pool
+    uploads = [entry for entry in images if entry.id is None and entry.data]
+    saved = dict(zip(map(id, uploads), process_images([(b64img_decode(entry.data), 0) for entry in uploads])))
+    new_filenames = [filename for filename, _ in saved.values() if filename]
+    if len(new_filenames) != len(uploads):
+        remove_unreferenced_images(session.get_bind(), new_filenames)
+        raise HTTPException(status_code=400, detail="Bad request")
+
+    resolved: list[Image] = []
+    for entry in images:
+        if entry.id is not None:
+            resolved.append(existing[entry.id])
         elif entry.data:
-            image_bytes = b64img_decode(entry.data)
-            filename, file_size = save_image_to_file(image_bytes, 0)
-            if not filename:
-                raise HTTPException(status_code=400, detail="Bad request")
-            new_filenames.append(filename)
+            filename, file_size = saved[id(entry)]
             image = Image(filename=filename, file_size=file_size, user=current_user)
             session.add(image)
-            session.flush()
             resolved.append(image)
+    session.flush()
     return resolved, new_filenames
 
 
@@ -531,8 +544,7 @@ def create_tripitem(
         session.commit()
     except Exception:
         session.rollback()
-        for fn in new_filenames:
-            remove_image(fn)
+        remove_unreferenced_images(session.get_bind(), new_filenames)
         raise HTTPException(status_code=500, detail="Failed to create")
     return TripItemRead.serialize(new_item)
 
@@ -633,8 +645,7 @@ def update_tripitem(
         session.commit()
     except Exception:
         session.rollback()
-        for fn in new_filenames:
-            remove_image(fn)
+        remove_unreferenced_images(session.get_bind(), new_filenames)
         raise HTTPException(status_code=500, detail="Failed to update")
     return TripItemRead.serialize(db_item)
 
@@ -676,13 +687,13 @@ def delete_tripitem(
 
 @router.get("/{trip_id}/attachments/{attachment_id}/download")
 async def download_trip_attachment(
-    session: SessionDep,
+    session: AsyncSessionDep,
     trip_id: int,
     attachment_id: int,
     current_user: Annotated[str, Depends(get_current_username)],
 ):
-    _get_verified_trip(session, trip_id, current_user)
-    attachment = session.get(TripAttachment, attachment_id)
+    await session.run_sync(_get_verified_trip, trip_id, current_user)
+    attachment = await session.get(TripAttachment, attachment_id)
     if not attachment or attachment.trip_id != trip_id:
         raise HTTPException(status_code=404, detail="Attachment not found")
 
@@ -694,7 +705,7 @@ async def download_trip_attachment(
 
 
 @router.get("/{trip_id}/attachments/download-all")
-async def download_all_trip_attachments(
+def download_all_trip_attachments(
     session: SessionDep,
     trip_id: int,
     current_user: Annotated[str, Depends(get_current_username)],
@@ -704,10 +715,8 @@ async def download_all_trip_attachments(
     if not attachments:
         raise HTTPException(status_code=404, detail="No attachments to download")
 
-    buf = BytesIO()
-    zip_trip_attachments(trip_id, attachments, buf)
-    return Response(
-        content=buf.getvalue(),
+    return StreamingResponse(
+        stream_trip_attachments(trip_id, attachments),
         media_type="application/zip",
         headers={"Content-Disposition": "attachment; filename=attachments.zip"},
     )
@@ -1458,21 +1467,21 @@ def create_trip_attachment(
 
 @router.delete("/{trip_id}/attachments/{attachment_id}")
 async def delete_trip_attachment(
-    session: SessionDep,
+    session: AsyncSessionDep,
     trip_id: int,
     attachment_id: int,
     current_user: Annotated[str, Depends(get_current_username)],
 ):
-    db_trip = _get_verified_trip(session, trip_id, current_user)
+    db_trip = await session.run_sync(_get_verified_trip, trip_id, current_user)
     if db_trip.archived:
         raise HTTPException(status_code=400, detail="Bad request")
 
-    attachment = session.get(TripAttachment, attachment_id)
+    attachment = await session.get(TripAttachment, attachment_id)
     if not attachment or attachment.trip_id != trip_id:
         raise HTTPException(status_code=404, detail="Attachment not found")
 
-    session.delete(attachment)
-    session.commit()
+    await session.delete(attachment)
+    await session.commit()
     return {}
 
 
@@ -1482,7 +1491,7 @@ def read_shared_trip(
     token: str,
 ) -> TripRead | TripShareRead:
     share = _trip_from_token_or_404(session, token)
-    db_trip = session.get(Trip, share.trip_id)
+    db_trip = session.exec(select(Trip).options(*trip_graph_options()).where(Trip.id == share.trip_id)).first()
     if not db_trip:
         raise HTTPException(status_code=404, detail="Not found")
 
@@ -1500,13 +1509,33 @@ def read_trip_calendar_feed(session: SessionDep, token: str, request: Request):
     # Subscription feed. Calendar clients can't send an Authorization header, so
     # the token in the URL is the whole credential - hence a dedicated,
     # revocable, read-only one rather than the user's api_token.
-    trip = _trip_for_ics(session, Trip.ics_token == token)
-    body = build_trip_ics(trip)
+    # Only the token lookup and the cached row are read here; the trip graph is
+    # loaded solely to re-render after invalidate_trip_ics_cache dropped the row
+    # or the day (and so DTSTAMP) rolled over.
+    row = session.exec(
+        select(Trip.id, TripIcsCache.etag, TripIcsCache.body, TripIcsCache.rendered_on)
+        .outerjoin(TripIcsCache, TripIcsCache.trip_id == Trip.id)
+        .where(Trip.ics_token == token)
+    ).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Not found")
+
+    trip_id, etag, body, rendered_on = row
+    today = datetime.now(UTC).date()
+    if etag is None or rendered_on != today:
+        body = build_trip_ics(_trip_for_ics(session, Trip.id == trip_id))
+        # Feeds get polled forever by every subscribed device; DTSTAMP is coarse
+        # enough (see utils/ical.py) that the body is byte-stable within a day, so
+        # this actually collapses to a 304 instead of resending the whole calendar.
+        etag = f'"{md5(body.encode()).hexdigest()}"'
+        values = {"etag": etag, "body": body, "rendered_on": today}
+        session.exec(
+            sqlite_insert(TripIcsCache)
+            .values(trip_id=trip_id, **values)
+            .on_conflict_do_update(index_elements=[TripIcsCache.trip_id], set_=values)
+        )
+        session.commit()
 
-    # Feeds get polled forever by every subscribed device; DTSTAMP is coarse
-    # enough (see utils/ical.py) that the body is byte-stable within a day, so
-    # this actually collapses to a 304 instead of resending the whole calendar.
-    etag = f'"{md5(body.encode()).hexdigest()}"'
     if request.headers.get("if-none-match") == etag:
         return Response(status_code=304, headers={"ETag": etag})
 
@@ -1571,16 +1600,18 @@ def read_shared_trip_checklists(
 
 @router.get("/shared/{token}/attachments/{attachment_id}/download")
 async def download_shared_trip_attachment(
-    session: SessionDep,
+    session: AsyncSessionDep,
     token: str,
     attachment_id: int,
 ):
-    _trip = _trip_from_token_or_404(session, token)
+    _trip = await session.run_sync(_trip_from_token_or_404, token)
     if not _trip.is_full_access:
         raise HTTPException(status_code=404, detail="Attachment not found")
-    attachment = session.exec(
-        select(TripAttachment).where(
-            TripAttachment.trip_id == _trip.trip_id, TripAttachment.id == attachment_id
+    attachment = (
+        await session.exec(
+            select(TripAttachment).where(
+                TripAttachment.trip_id == _trip.trip_id, TripAttachment.id == attachment_id
+            )
         )
     ).first()
 
@@ -1595,7 +1626,7 @@ async def download_shared_trip_attachment(
 
 
 @router.get("/shared/{token}/attachments/download-all")
-async def download_all_shared_trip_attachments(
+def download_all_shared_trip_attachments(
     session: SessionDep,
     token: str,
 ):
@@ -1611,10 +1642,8 @@ async def download_all_shared_trip_attachments(
     if not attachments:
         raise HTTPException(status_code=404, detail="No attachments to download")
 
-    buf = BytesIO()
-    zip_trip_attachments(db_trip.id, attachments, buf)
-    return Response(
-        content=buf.getvalue(),
+    return StreamingResponse(
+        stream_trip_attachments(db_trip.id, attachments),
         media_type="application/zip",
         headers={"Content-Disposition": "attachment; filename=attachments.zip"},
     )
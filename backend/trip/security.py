@@ -1,4 +1,5 @@
 from datetime import UTC, datetime, timedelta
+from hashlib import sha256
 
 import jwt
 import pyotp
@@ -72,21 +73,35 @@ def hash_api_token(api_token: str) -> str:
     return ph.hash(api_token)
 
 
+def api_token_lookup(api_token: str) -> str:
+    # Index key used to find the single candidate row. Tokens are 256-bit random
+    # (generate_urlsafe), so a plain SHA-256 is safe to store; the argon2 hash in
+    # User.api_token remains the credential that is actually verified.
+    return sha256(api_token.encode()).hexdigest()
+
+
+def _verify_api_token(hashed: str | None, api_token: str) -> bool:
+    if not hashed:
+        return False
+    try:
+        return ph.verify(hashed, api_token)
+    except (
+        argon_exceptions.VerifyMismatchError,
+        argon_exceptions.VerificationError,
+        argon_exceptions.InvalidHashError,
+    ):
+        return False
+
+
 def api_token_to_user(session: Session, api_token: str) -> User:
     if not api_token:
         raise HTTPException(status_code=400, detail="Bad Request")
 
-    candidates = session.exec(select(User).where(User.api_token.is_not(None))).all()
-    for user in candidates:
-        try:
-            ph.verify(user.api_token, api_token)
-            return user
-        except (
-            argon_exceptions.VerifyMismatchError,
-            argon_exceptions.VerificationError,
-            argon_exceptions.InvalidHashError,
-        ):
-            continue
+    lookup = api_token_lookup(api_token)
+    user = session.exec(select(User).where(User.api_token_lookup == lookup)).first()
+    # One argon2 verify at most: tokens without a lookup key were revoked (migration 013)
+    if user and _verify_api_token(user.api_token, api_token):
+        return user
 
     raise HTTPException(status_code=401, detail="Invalid Token")
 
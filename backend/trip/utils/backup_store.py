@@ -0,0 +1,177 @@
+import argparse
+import json
+import logging
+import os
+import re
+import secrets
+import shutil
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from hashlib import sha256
+from pathlib import Path
+from zipfile import ZIP_DEFLATED, ZipFile
+
+from .. import __version__ as trip_version
+from ..config import get_settings
+from ..models.models import DATABASE_SCOPE
+from .date import dt_utc
+from .utils import assets_folder_path, attachments_folder_path
+
+logger = logging.getLogger(__name__)
+
+# Incremental admin backups: every asset/attachment is kept once, by sha256, in
+# BACKUPS_FOLDER/objects. A backup archive only holds the SQLite snapshot and a
+# manifest mapping each storage path to its object, so a run copies just the
+# files that are new since the previous one and never recompresses JPEG/PDF.
+MANIFEST_NAME = "manifest.json"
+INDEX_NAME = "index.json"
+HASH_BLOCK_SIZE = 1024 * 1024
+_DIGEST_RE = re.compile(r"[0-9a-f]{64}")
+
+
+def objects_folder_path() -> Path:
+    return Path(get_settings().BACKUPS_FOLDER) / "objects"
+
+
+def _object_path(digest: str) -> Path:
+    return objects_folder_path() / digest[:2] / digest
+
+
+def _load_index() -> dict:
+    # path -> [size, mtime_ns, sha256] of the previous run, so unchanged files
+    # (asset filenames are random and never rewritten) are not re-read
+    try:
+        return json.loads((objects_folder_path() / INDEX_NAME).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _store_file(fp: Path, cached: list | None) -> tuple[str, int, int, bool]:
+    stat = fp.stat()
+    if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+        digest = cached[2]
+        if _object_path(digest).exists():
+            return digest, stat.st_size, stat.st_mtime_ns, False
+
+    hasher = sha256()
+    with fp.open("rb") as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            hasher.update(block)
+    digest = hasher.hexdigest()
+
+    target = _object_path(digest)
+    if target.exists():
+        return digest, stat.st_size, stat.st_mtime_ns, False
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f"{digest}.tmp{os.getpid()}")
+    shutil.copyfile(fp, tmp)
+    tmp.replace(target)
+    return digest, stat.st_size, stat.st_mtime_ns, True
+
+
+def _collect_files() -> dict[str, Path]:
+    files: dict[str, Path] = {}
+    for zip_dir, path in (("assets", assets_folder_path()), ("attachments", attachments_folder_path())):
+        if not path.exists():
+            continue
+        for fp in path.rglob("*"):
+            if fp.is_file():
+                files[f"{zip_dir}/{fp.relative_to(path).as_posix()}"] = fp
+    return files
+
+
+def _read_manifest(zip_fp: Path) -> dict:
+    with ZipFile(zip_fp) as zipf:
+        return json.loads(zipf.read(MANIFEST_NAME))
+
+
+def _prune_objects(started: float):
+    # Drop objects no remaining incremental backup references. Objects written
+    # after this run started are kept: they may belong to a concurrent export.
+    referenced: set[str] = set()
+    for zip_fp in Path(get_settings().BACKUPS_FOLDER).glob("*_incremental_backup_*.zip"):
+        try:
+            referenced.update(entry["sha256"] for entry in _read_manifest(zip_fp)["files"].values())
+        except Exception as exc:
+            logger.error(f"[BACKUP EXPORT]: Unreadable manifest ({zip_fp.name}), skipping prune: {exc}")
+            return
+
+    for fp in objects_folder_path().glob("??/*"):
+        if fp.name not in referenced and fp.stat().st_mtime < started:
+            fp.unlink(missing_ok=True)
+
+
+def incremental_backup_export(zip_fp: Path, previous: str | None = None):
+    started = time.time()
+    objects_folder_path().mkdir(parents=True, exist_ok=True)
+    index = _load_index()
+    files = _collect_files()
+
+    with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as pool:
+        results = dict(zip(files, pool.map(lambda p: _store_file(files[p], index.get(p)), files)))
+
+    manifest = {
+        "_": {"version": trip_version, "at": dt_utc().isoformat(), "previous": previous},
+        "files": {path: {"sha256": digest, "size": size} for path, (digest, size, _, _) in results.items()},
+    }
+    with ZipFile(zip_fp, "w", ZIP_DEFLATED, compresslevel=6) as zipf:
+        with tempfile.NamedTemporaryFile() as tmp:
+            with (
+                closing(sqlite3.connect(get_settings().SQLITE_FILE)) as src,
+                closing(sqlite3.connect(tmp.name)) as dst,
+            ):
+                src.backup(dst)
+            zipf.write(tmp.name, "trip.sqlite")
+        zipf.writestr(MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False))
+
+    index_fp = objects_folder_path() / INDEX_NAME
+    index_fp.write_text(json.dumps({path: [size, mtime, digest] for path, (digest, size, mtime, _) in results.items()}))
+    _prune_objects(started)
+
+    new_objects = sum(1 for *_, created in results.values() if created)
+    logger.info(f"[BACKUP EXPORT]: Incremental backup, {len(results)} files, {new_objects} new objects")
+
+
+def restore_incremental_backup(zip_fp: Path, target_dir: Path):
+    # Rebuilds a storage folder (trip.sqlite, assets/, attachments/) from an
+    # incremental backup and the objects store next to it.
+    manifest = _read_manifest(zip_fp)
+    for path, entry in manifest["files"].items():
+        # Object paths are built from the digests: anything else could escape the store
+        if not isinstance(entry.get("sha256"), str) or not _DIGEST_RE.fullmatch(entry["sha256"]):
+            raise ValueError(f"Invalid manifest digest for {path!r}")
+    missing = [path for path, entry in manifest["files"].items() if not _object_path(entry["sha256"]).exists()]
+    if missing:
+        raise ValueError(f"{len(missing)} objects missing from {objects_folder_path()}, eg. {missing[0]}")
+
+    target_dir.mkdir(parents=True, exist_ok=True)
+    with ZipFile(zip_fp) as zipf:
+        with zipf.open("trip.sqlite") as src, (target_dir / "trip.sqlite").open("wb") as dst:
+            shutil.copyfileobj(src, dst)
+    # The restored content differs from what clients cached under the live database's ETags
+    with closing(sqlite3.connect(target_dir / "trip.sqlite")) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO resourceversion (scope, version) VALUES (?, ?)",
+            (DATABASE_SCOPE, secrets.randbits(62)),
+        )
+
+    for path, entry in manifest["files"].items():
+        dest = (target_dir / path).resolve()
+        if not dest.is_relative_to(target_dir.resolve()):
+            raise ValueError(f"Invalid manifest path {path!r}")
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(_object_path(entry["sha256"]), dest)
+
+
+if __name__ == "__main__":
+    # python -m trip.utils.backup_store restore storage/backups/TRIP_..._incremental_backup_....zip /restore/storage
+    parser = argparse.ArgumentParser(description="Restore an incremental TRIP backup")
+    parser.add_argument("command", choices=["restore"])
+    parser.add_argument("backup", type=Path)
+    parser.add_argument("target", type=Path)
+    args = parser.parse_args()
+    restore_incremental_backup(args.backup, args.target)
@@ -0,0 +1,99 @@
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+
+from .geo import EARTH_RADIUS_M, haversine_m
+
+DEFAULT_DUPLICATE_DIST = 5  # Same default as the frontend's duplicate check
+DUPLICATE_SAME_SPOT_M = 15  # Closer than this: a duplicate whatever the names
+DUPLICATE_NEAR_M = 250  # Closer than this: a duplicate when the names are similar
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+_NON_ALNUM_RE = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_name(name: str) -> str:
+    # "Café de l'Opéra " -> "cafe de l opera"
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+    ascii_name = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_ALNUM_RE.sub(" ", ascii_name).strip()
+
+
+def within_edit_distance(source: str, target: str, max_dist: int) -> bool:
+    # Levenshtein distance < max_dist. Only cells less than max_dist off the diagonal
+    # can stay under the limit, so each row computes that band and stops early.
+    if source == target:
+        return max_dist > 0
+    if abs(len(source) - len(target)) >= max_dist:
+        return False
+    band = max_dist - 1
+    size = len(target)
+    previous = [j if j <= band else max_dist for j in range(size + 1)]
+    for i, source_char in enumerate(source, 1):
+        low, high = max(1, i - band), min(size, i + band)
+        current = [max_dist] * (size + 1)
+        current[low - 1] = i if low == 1 and i <= band else max_dist
+        row_min = current[low - 1]
+        for j in range(low, high + 1):
+            cost = previous[j - 1] + (source_char != target[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost
+            if cost < row_min:
+                row_min = cost
+        if row_min >= max_dist:
+            return False
+        previous = current
+    return previous[size] < max_dist
+
+
+class PlaceGrid:
+    # A user's places bucketed in a spatial hash of DUPLICATE_NEAR_M cells: checking a
+    # candidate only reads the few cells around it, not the whole library.
+
+    def __init__(self, places: Iterable[tuple[int, str, float, float]], max_dist: int):
+        self.max_dist = max_dist
+        self.cell = DUPLICATE_NEAR_M / METERS_PER_DEGREE
+        self.columns = math.ceil(360 / self.cell)
+        self.cells: dict[tuple[int, int], list[tuple[int, str, float, float]]] = defaultdict(list)
+        self.names: dict[str, int] = {}
+        for place_id, name, lat, lng in places:
+            key = normalize_name(name)
+            self.names.setdefault(key, place_id)
+            self.cells[self._cell(lat, lng)].append((place_id, key, lat, lng))
+
+    def _cell(self, lat: float, lng: float) -> tuple[int, int]:
+        return math.floor((lat + 90) / self.cell), math.floor((lng + 180) / self.cell) % self.columns
+
+    def _near(self, lat: float, lng: float) -> Iterator[tuple[int, str, float, float]]:
+        row, column = self._cell(lat, lng)
+        # A cell is narrower than DUPLICATE_NEAR_M east-west away from the equator
+        spread = math.ceil(1 / max(math.cos(math.radians(lat)), 1e-9))
+        if 2 * spread + 1 >= self.columns:
+            columns = range(self.columns)
+        else:
+            columns = [(column + offset) % self.columns for offset in range(-spread, spread + 1)]
+        for cell_row in (row - 1, row, row + 1):
+            for cell_column in columns:
+                yield from self.cells.get((cell_row, cell_column), ())
+
+    def find_duplicate(self, name: str | None, lat: float | None, lng: float | None) -> int | None:
+        # Id of the closest existing place this candidate duplicates
+        key = normalize_name(name or "")
+        if lat is None or lng is None:
+            return self.names.get(key) if key else None
+
+        best: tuple[float, int] | None = None
+        for place_id, place_key, place_lat, place_lng in self._near(lat, lng):
+            distance = haversine_m(lat, lng, place_lat, place_lng)
+            if distance > DUPLICATE_NEAR_M or (best and distance >= best[0]):
+                continue
+            if distance <= DUPLICATE_SAME_SPOT_M or (
+                key and within_edit_distance(key, place_key, self.max_dist)
+            ):
+                best = (distance, place_id)
+        return best[1] if best else None
@@ -0,0 +1,32 @@
+import math
+
+EARTH_RADIUS_M = 6371008.8
+MAX_DISTANCE_M = math.pi * EARTH_RADIUS_M  # Half the circumference: reaches every point
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bbox_around(lat: float, lng: float, radius_m: float) -> tuple[float, float, float, float]:
+    # (west, south, east, north) covering every point within radius_m of lat,lng.
+    # west > east when the box crosses the antimeridian.
+    angle = radius_m / EARTH_RADIUS_M
+    south = math.degrees(math.radians(lat) - angle)
+    north = math.degrees(math.radians(lat) + angle)
+    if south <= -90 or north >= 90 or angle >= math.pi / 2:
+        # Reaches a pole: every longitude is in range
+        return -180.0, max(south, -90.0), 180.0, min(north, 90.0)
+
+    # Widest longitude offset of the circle, at the latitude its tangent points touch
+    dlng = math.degrees(math.asin(math.sin(angle) / math.cos(math.radians(lat))))
+    west, east = lng - dlng, lng + dlng
+    if west < -180:
+        west += 360
+    if east > 180:
+        east -= 360
+    return west, south, east, north
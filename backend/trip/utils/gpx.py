@@ -0,0 +1,217 @@
+import logging
+import math
+import re
+import sys
+import zlib
+from array import array
+from collections.abc import Iterator
+from hashlib import sha256
+from io import BytesIO
+from itertools import compress
+from typing import NamedTuple
+
+import defusedxml.ElementTree as ET
+
+from .geo import haversine_m
+
+logger = logging.getLogger(__name__)
+
+# Place.gpx and TripItem.gpx hold the sha256 of the track, its GPX is in GpxTrackData
+GPX_DIGEST_RE = re.compile(r"[0-9a-f]{64}")
+GPX_COORD_SCALE = 1e6  # Packed as int32 microdegrees, ~0.1 m
+GPX_TILE_SIZE = 256
+GPX_MAX_ZOOM = 22
+GPX_PIXEL_TOLERANCE = 0.5  # Simplified tracks stay within half a pixel of the original
+GPX_ELEVATION_THRESHOLD = 5.0  # meters, smaller elevation changes are treated as noise
+
+
+class GpxTrackStats(NamedTuple):
+    point_count: int = 0
+    distance: float = 0.0  # meters, gaps between segments excluded
+    elevation_gain: float | None = None  # meters, None without <ele>
+    elevation_loss: float | None = None
+    min_lat: float | None = None
+    max_lat: float | None = None
+    min_lng: float | None = None
+    max_lng: float | None = None
+
+
+class GpxTrackPayload(NamedTuple):
+    digest: str
+    stats: GpxTrackStats
+    data: bytes  # zlib compressed GPX document
+    points: bytes  # zlib compressed pack_track_points()
+
+
+def gpx_digest(gpx: str) -> str:
+    return sha256(gpx.encode()).hexdigest()
+
+
+def _local_name(tag: str) -> str:
+    return tag.rpartition("}")[2]
+
+
+def iter_track_points(gpx: str) -> Iterator[tuple[float, float, float | None, bool]]:
+    # (lat, lng, elevation, starts a segment) of every trkpt in document order. Streamed:
+    # elements are dropped once read, so a large track never sits in memory as a tree.
+    segment_start = True
+    try:
+        for event, elem in ET.iterparse(BytesIO(gpx.encode()), events=("start", "end")):
+            name = _local_name(elem.tag)
+            if event == "start":
+                if name == "trkseg":
+                    segment_start = True
+                continue
+            if name != "trkpt":
+                continue
+            try:
+                lat, lng = float(elem.get("lat")), float(elem.get("lon"))
+            except (TypeError, ValueError):
+                elem.clear()
+                continue
+            elevation = None
+            for child in elem:
+                if _local_name(child.tag) == "ele":
+                    try:
+                        elevation = float(child.text)
+                    except (TypeError, ValueError):
+                        pass
+                    break
+            elem.clear()
+            yield lat, lng, elevation, segment_start
+            segment_start = False
+    except ET.ParseError as exc:
+        logger.warning(f"[GPX]: Could not parse the rest of the track: {exc}")
+
+
+def parse_track(gpx: str) -> tuple[list[tuple[float, float]], GpxTrackStats]:
+    # The (lat, lng) points, segments joined as the map draws them, and their statistics
+    points: list[tuple[float, float]] = []
+    distance = gain = loss = 0.0
+    reference = None  # Elevation the next climb or descent is measured from
+    for lat, lng, elevation, segment_start in iter_track_points(gpx):
+        if points and not segment_start:
+            distance += haversine_m(*points[-1], lat, lng)
+        points.append((lat, lng))
+        if elevation is None:
+            continue
+        if reference is None:
+            reference = elevation
+        elif abs(delta := elevation - reference) >= GPX_ELEVATION_THRESHOLD:
+            # Hysteresis: GPS altitude jitter below the threshold is not counted as climbing
+            if delta > 0:
+                gain += delta
+            else:
+                loss -= delta
+            reference = elevation
+
+    if not points:
+        return points, GpxTrackStats()
+    lats = [lat for lat, _ in points]
+    lngs = [lng for _, lng in points]
+    has_elevation = reference is not None
+    return points, GpxTrackStats(
+        point_count=len(points),
+        distance=round(distance, 1),
+        elevation_gain=round(gain, 1) if has_elevation else None,
+        elevation_loss=round(loss, 1) if has_elevation else None,
+        min_lat=min(lats),
+        max_lat=max(lats),
+        min_lng=min(lngs),
+        max_lng=max(lngs),
+    )
+
+
+def douglas_peucker_tolerances(points: list[tuple[float, float]]) -> array:
+    # For every point, the largest tolerance (in degrees of latitude) at which Douglas-Peucker
+    # still keeps it: endpoints are infinite. The split point of a range does not depend on
+    # the tolerance, so capping each point by its parent's value nests every level, and
+    # keeping the points above a tolerance gives exactly the Douglas-Peucker output for it.
+    size = len(points)
+    tolerances = array("f", bytes(4 * size))
+    if not size:
+        return tolerances
+    tolerances[0] = tolerances[-1] = math.inf
+
+    # Planar distances: longitudes shrunk to the track latitude
+    scale = math.cos(math.radians(points[0][0]))
+    xs = [lng * scale for _, lng in points]
+    ys = [lat for lat, _ in points]
+    stack = [(0, size - 1, math.inf)]
+    while stack:
+        first, last, bound = stack.pop()
+        if last - first < 2:
+            continue
+        ax, ay = xs[first], ys[first]
+        dx, dy = xs[last] - ax, ys[last] - ay
+        length = dx * dx + dy * dy
+        farthest, index = -1.0, first + 1
+        for k in range(first + 1, last):
+            px, py = xs[k] - ax, ys[k] - ay
+            if length:
+                # Distance to the segment, not the line: loop tracks start where they end
+                t = (px * dx + py * dy) / length
+                t = 0.0 if t < 0 else 1.0 if t > 1 else t
+                px -= t * dx
+                py -= t * dy
+            distance = px * px + py * py
+            if distance > farthest:
+                farthest, index = distance, k
+        tolerance = min(math.sqrt(farthest), bound)
+        tolerances[index] = tolerance
+        stack.append((first, index, tolerance))
+        stack.append((index, last, tolerance))
+    return tolerances
+
+
+def pack_track_points(points: list[tuple[float, float]]) -> bytes:
+    # Little endian int32 latitudes, int32 longitudes, then float32 tolerances
+    lats = array("i", (round(lat * GPX_COORD_SCALE) for lat, _ in points))
+    lngs = array("i", (round(lng * GPX_COORD_SCALE) for _, lng in points))
+    tolerances = douglas_peucker_tolerances(points)
+    if sys.byteorder == "big":
+        for values in (lats, lngs, tolerances):
+            values.byteswap()
+    return lats.tobytes() + lngs.tobytes() + tolerances.tobytes()
+
+
+def unpack_track_points(packed: bytes, point_count: int) -> tuple[array, array, array]:
+    lats, lngs, tolerances = array("i"), array("i"), array("f")
+    size = 4 * point_count
+    lats.frombytes(packed[:size])
+    lngs.frombytes(packed[size : 2 * size])
+    tolerances.frombytes(packed[2 * size : 3 * size])
+    if sys.byteorder == "big":
+        for values in (lats, lngs, tolerances):
+            values.byteswap()
+    return lats, lngs, tolerances
+
+
+def build_gpx_track(gpx: str) -> GpxTrackPayload:
+    # Parsed once at write time: reads only decompress the packed arrays.
+    # A document without readable points is kept as is, for download.
+    points, stats = parse_track(gpx)
+    return GpxTrackPayload(
+        digest=gpx_digest(gpx),
+        stats=stats,
+        data=zlib.compress(gpx.encode(), 9),
+        points=zlib.compress(pack_track_points(points), 9),
+    )
+
+
+def zoom_tolerance(zoom: int, lat: float) -> float:
+    # GPX_PIXEL_TOLERANCE pixels of a Web Mercator map at `zoom`, in degrees of latitude
+    degrees_per_pixel = 360 / (GPX_TILE_SIZE * 2**zoom)
+    return GPX_PIXEL_TOLERANCE * degrees_per_pixel * math.cos(math.radians(lat))
+
+
+def track_coordinates(packed: bytes, point_count: int, zoom: int | None = None) -> list[list[float]]:
+    # [[lat, lng], ...] of the track, simplified for `zoom` when given
+    lats, lngs, tolerances = unpack_track_points(zlib.decompress(packed), point_count)
+    if not point_count:
+        return []
+    pairs = zip(lats, lngs)
+    if zoom is not None:
+        tolerance = zoom_tolerance(zoom, lats[0] / GPX_COORD_SCALE)
+        pairs = compress(pairs, [value > tolerance for value in tolerances])
+    return [[lat / GPX_COORD_SCALE, lng / GPX_COORD_SCALE] for lat, lng in pairs]
@@ -0,0 +1,48 @@
+import asyncio
+from urllib.parse import urlsplit
+
+import httpx
+
+# Single app-lifetime client (opened/closed in main.lifespan) shared by map
+# providers, image downloads and the update check, so repeated calls to the same
+# host reuse a keep-alive (or HTTP/2) connection instead of a fresh TCP+TLS handshake.
+MAX_CONNECTIONS = 32
+MAX_CONNECTIONS_PER_HOST = 8
+KEEPALIVE_EXPIRY = 60
+DEFAULT_TIMEOUT = 10
+
+_client: httpx.AsyncClient | None = None
+_host_slots: dict[str, asyncio.Semaphore] = {}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    # Lazily (re)created so code running outside the app lifespan still works
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _client
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_slots.clear()
+
+
+async def http_request(method: str, url: str, **kwargs) -> httpx.Response:
+    # httpx only caps the pool as a whole; a per-host semaphore keeps one busy
+    # upstream (eg. a bulk Takeout import against Google) from starving the others.
+    host = urlsplit(url).netloc
+    slot = _host_slots.setdefault(host, asyncio.Semaphore(MAX_CONNECTIONS_PER_HOST))
+    async with slot:
+        return await get_http_client().request(method, url, **kwargs)
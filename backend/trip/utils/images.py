@@ -0,0 +1,133 @@
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from pathlib import Path
+
+from PIL import features
+
+from ..config import get_settings
+from .utils import (IMAGE_VARIANT_WIDTHS, image_variant_path, patch_image,
+                    save_image_to_file, save_image_variant)
+
+logger = logging.getLogger(__name__)
+
+# Pillow decode/resize/encode is CPU bound and holds the GIL: every image code
+# path hands it to a bounded pool of worker processes instead of running it in
+# the request (or threadpool) thread.
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _image_pool_size() -> int:
+    return max(1, min(get_settings().IMAGE_WORKERS, os.cpu_count() or 1))
+
+
+def get_image_pool() -> ProcessPoolExecutor:
+    # spawn, not fork: the server process runs threads (threadpool, notify loop)
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=_image_pool_size(), mp_context=get_context("spawn"))
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    # A worker died (e.g. OOM-killed decoding a huge image): the executor is broken for
+    # good, the next job starts a new one. Only if no other thread replaced it already.
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit(fn, *args) -> tuple[ProcessPoolExecutor, Future]:
+    pool = get_image_pool()
+    try:
+        return pool, pool.submit(fn, *args)
+    except BrokenProcessPool:
+        logger.warning("[IMAGE]: Pool broken, starting a new one")
+        _discard_pool(pool)
+        pool = get_image_pool()
+        return pool, pool.submit(fn, *args)
+
+
+def shutdown_image_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def _image_result(job: tuple[ProcessPoolExecutor, Future], deadline: float) -> tuple[str, int]:
+    pool, future = job
+    try:
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except FutureTimeoutError:
+        # Only bounds how long the request waits: cancel() drops a job still queued, a
+        # running one keeps its worker busy until it is done. The file it writes late
+        # is either shared with another Image or swept as an orphan on next boot.
+        logger.warning("[IMAGE]: Job timed out")
+        future.cancel()
+    except BrokenProcessPool:
+        logger.error("[IMAGE]: Job failed, its worker died")
+        _discard_pool(pool)
+    except Exception as exc:
+        logger.error(f"[IMAGE]: Job failed: {exc}")
+    return "", 0
+
+
+def process_image(content: bytes, size: int = 600) -> tuple[str, int]:
+    # Pool-backed save_image_to_file, ("", 0) on failure or timeout
+    job = _submit(save_image_to_file, content, size)
+    return _image_result(job, time.monotonic() + get_settings().IMAGE_JOB_TIMEOUT)
+
+
+def process_images(jobs: list[tuple[bytes, int]]) -> list[tuple[str, int]]:
+    # Batch counterpart of process_image, results come back in the order of `jobs`
+    submitted = [_submit(save_image_to_file, content, size) for content, size in jobs]
+    # One deadline for the batch, not one per job: the pool runs _image_pool_size()
+    # jobs at a time, each of them allowed IMAGE_JOB_TIMEOUT
+    rounds = math.ceil(len(submitted) / _image_pool_size())
+    deadline = time.monotonic() + rounds * get_settings().IMAGE_JOB_TIMEOUT
+    return [_image_result(job, deadline) for job in submitted]
+
+
+def process_patch_image(fp: str, size: int = 400) -> tuple[str, int]:
+    # Pool-backed patch_image, for files downloaded to the assets folder
+    job = _submit(patch_image, fp, size)
+    return _image_result(job, time.monotonic() + get_settings().IMAGE_JOB_TIMEOUT)
+
+
+def negotiate_image_variant(width: int, accept: str) -> tuple[int, str]:
+    # Smallest variant covering the requested width, AVIF when the client takes it
+    variant_width = next((size for size in IMAGE_VARIANT_WIDTHS if size >= width), IMAGE_VARIANT_WIDTHS[-1])
+    ext = "avif" if "image/avif" in accept and features.check("avif") else "webp"
+    return variant_width, ext
+
+
+def get_image_variant(filename: str, width: int, ext: str) -> Path | None:
+    # Cached derivative of an asset, generated in the pool on first request
+    variant_fp = image_variant_path(filename, width, ext)
+    if variant_fp.exists():
+        return variant_fp
+
+    pool, future = _submit(save_image_variant, filename, width, ext)
+    try:
+        if future.result(timeout=get_settings().IMAGE_JOB_TIMEOUT):
+            return variant_fp
+    except FutureTimeoutError:
+        logger.warning(f"[IMAGE]: Variant {variant_fp.name} timed out")
+    except BrokenProcessPool:
+        logger.error(f"[IMAGE]: Variant {variant_fp.name} failed, its worker died")
+        _discard_pool(pool)
+    except Exception as exc:
+        logger.error(f"[IMAGE]: Variant {variant_fp.name} failed: {exc}")
+    return None
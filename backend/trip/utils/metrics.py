@@ -0,0 +1,267 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from contextvars import ContextVar
+from functools import wraps
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..config import get_settings
+
+# Per-request timings (Server-Timing header) and process-wide aggregates, rendered
+# in the Prometheus text format by /api/admin/metrics. Counters live in this process:
+# each worker exposes its own.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500)
+SLOW_QUERY_SAMPLES = 50
+SLOW_QUERY_STATEMENT_LENGTH = 300
+UNMATCHED_ROUTE = "other"
+BACKGROUND_ROUTE = "background"
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class RequestTimings:
+    __slots__ = ("db_count", "db_time", "scope", "serialize_time", "serializing")
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.db_time = 0.0
+        self.db_count = 0
+        self.serialize_time = 0.0
+        self.serializing = False
+
+    @property
+    def route(self) -> str:
+        # Set by the router once matched: the path template, never the raw path
+        route = self.scope.get("route")
+        return getattr(route, "path", UNMATCHED_ROUTE)
+
+    def server_timing(self, total: float) -> str:
+        # db and serialize overlap: lazy loads during serialize count in both
+        return (
+            f"db;dur={self.db_time * 1000:.2f}, db-count;desc={self.db_count}, "
+            f"serialize;dur={self.serialize_time * 1000:.2f}, total;dur={total * 1000:.2f}"
+        )
+
+
+_request_timings: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "count", "counts", "sum")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _RouteStats:
+    __slots__ = ("db_seconds", "latency", "queries", "serialize_seconds")
+
+    def __init__(self):
+        self.latency = _Histogram(LATENCY_BUCKETS)
+        self.queries = _Histogram(QUERY_COUNT_BUCKETS)
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+
+class _SlowQuery:
+    __slots__ = ("count", "last_seconds", "last_seen", "max_seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.max_seconds = 0.0
+        self.last_seconds = 0.0
+        self.last_seen = 0.0
+
+
+# Updated from the event loop and threadpool threads alike
+_lock = threading.Lock()
+_route_stats: dict[tuple[str, str], _RouteStats] = {}
+_slow_queries: OrderedDict[tuple[str, str], _SlowQuery] = OrderedDict()
+
+
+def _record_request(method: str, timings: RequestTimings, elapsed: float):
+    key = (method, timings.route)
+    with _lock:
+        stats = _route_stats.get(key)
+        if stats is None:
+            stats = _route_stats[key] = _RouteStats()
+        stats.latency.observe(elapsed)
+        stats.queries.observe(timings.db_count)
+        stats.db_seconds += timings.db_time
+        stats.serialize_seconds += timings.serialize_time
+
+
+def _record_slow_query(route: str, statement: str, elapsed: float):
+    statement = _WHITESPACE_RE.sub(" ", statement).strip()[:SLOW_QUERY_STATEMENT_LENGTH]
+    key = (route, statement)
+    with _lock:
+        sample = _slow_queries.pop(key, None) or _SlowQuery()
+        _slow_queries[key] = sample  # most recently seen last
+        if len(_slow_queries) > SLOW_QUERY_SAMPLES:
+            _slow_queries.popitem(last=False)
+        sample.count += 1
+        sample.max_seconds = max(sample.max_seconds, elapsed)
+        sample.last_seconds = elapsed
+        sample.last_seen = time.time()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.db_time += elapsed
+        timings.db_count += 1
+
+    if elapsed * 1000 >= get_settings().METRICS_SLOW_QUERY_MS:
+        _record_slow_query(timings.route if timings is not None else BACKGROUND_ROUTE, statement, elapsed)
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute is skipped for a failed statement
+    if (conn := exception_context.connection) is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+def instrument_engine(engine: Engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def timed_serialize(func):
+    # For *Read.serialize classmethods, below @classmethod. Only the outermost call
+    # is timed: the nested serializers it calls are part of it.
+    @wraps(func)
+    def wrapper(cls, *args, **kwargs):
+        timings = _request_timings.get()
+        if timings is None or timings.serializing:
+            return func(cls, *args, **kwargs)
+
+        timings.serializing = True
+        start = time.perf_counter()
+        try:
+            return func(cls, *args, **kwargs)
+        finally:
+            timings.serialize_time += time.perf_counter() - start
+            timings.serializing = False
+
+    return wrapper
+
+
+class ServerTimingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Mutated in place, so queries run in threadpool copies of this context still land here
+        timings = RequestTimings(scope)
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timings.server_timing(time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            _record_request(scope["method"], timings, time.perf_counter() - start)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels.items())
+
+
+def _histogram_lines(name: str, labels: str, histogram: _Histogram) -> list[str]:
+    lines = []
+    cumulative = 0
+    for bucket, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bucket}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+    lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+    return lines
+
+
+def render_metrics() -> str:
+    lines = []
+    with _lock:
+        routes = sorted(_route_stats.items())
+
+        lines += [
+            "# HELP trip_http_request_duration_seconds Request latency by route.",
+            "# TYPE trip_http_request_duration_seconds histogram",
+        ]
+        for (method, route), stats in routes:
+            labels = _labels(method=method, route=route)
+            lines += _histogram_lines("trip_http_request_duration_seconds", labels, stats.latency)
+
+        lines += [
+            "# HELP trip_http_request_db_queries SQL statements executed per request.",
+            "# TYPE trip_http_request_db_queries histogram",
+        ]
+        for (method, route), stats in routes:
+            labels = _labels(method=method, route=route)
+            lines += _histogram_lines("trip_http_request_db_queries", labels, stats.queries)
+
+        lines += [
+            "# HELP trip_http_request_db_seconds_total Time spent in SQL statements by route.",
+            "# TYPE trip_http_request_db_seconds_total counter",
+        ]
+        for (method, route), stats in routes:
+            labels = _labels(method=method, route=route)
+            lines.append(f"trip_http_request_db_seconds_total{{{labels}}} {stats.db_seconds}")
+
+        lines += [
+            "# HELP trip_http_request_serialize_seconds_total Time spent in response serializers by route.",
+            "# TYPE trip_http_request_serialize_seconds_total counter",
+        ]
+        for (method, route), stats in routes:
+            labels = _labels(method=method, route=route)
+            lines.append(f"trip_http_request_serialize_seconds_total{{{labels}}} {stats.serialize_seconds}")
+
+        slow_metrics = (
+            ("trip_db_slow_queries_total", "counter", "Statements over METRICS_SLOW_QUERY_MS.", "count"),
+            ("trip_db_slow_query_max_seconds", "gauge", "Slowest run of a sampled statement.", "max_seconds"),
+            ("trip_db_slow_query_last_seconds", "gauge", "Latest run of a sampled statement.", "last_seconds"),
+            ("trip_db_slow_query_last_seen_timestamp_seconds", "gauge", "Latest run time.", "last_seen"),
+        )
+        for name, kind, help_text, attr in slow_metrics:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for (route, statement), sample in _slow_queries.items():
+                labels = _labels(route=route, statement=statement)
+                lines.append(f"{name}{{{labels}}} {getattr(sample, attr)}")
+
+    return "\n".join(lines) + "\n"
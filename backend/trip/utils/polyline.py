@@ -0,0 +1,73 @@
+import math
+import re
+from itertools import compress
+
+from .geo import EARTH_RADIUS_M
+from .gpx import douglas_peucker_tolerances
+
+# Encoded polylines (developers.google.com/maps/documentation/utilities/polylinealgorithm),
+# precision 5: one varint per coordinate delta, 5 bits per character offset by 63,
+# 0x20 set on every character but the last of a value.
+POLYLINE_SCALE = 1e5
+_POLYLINE_RE = re.compile(rb"[?-~]*")
+
+
+def decode_polyline(encoded: str) -> list[tuple[float, float]]:
+    # [(lng, lat), ...], the order of RoutingResponse.coordinates
+    try:
+        data = encoded.encode("ascii")
+    except UnicodeEncodeError:
+        raise ValueError("Malformed polyline string")
+    if not _POLYLINE_RE.fullmatch(data):
+        raise ValueError("Malformed polyline string")
+
+    coordinates = []
+    lat = lng = 0
+    value = shift = 0
+    is_lng = False
+    for byte in data:
+        byte -= 63
+        value |= (byte & 0x1F) << shift
+        if byte >= 0x20:
+            shift += 5
+            continue
+
+        delta = ~(value >> 1) if value & 1 else value >> 1
+        value = shift = 0
+        if is_lng:
+            lng += delta
+            coordinates.append((lng / POLYLINE_SCALE, lat / POLYLINE_SCALE))
+        else:
+            lat += delta
+        is_lng = not is_lng
+
+    if is_lng or shift:
+        raise ValueError("Truncated polyline string")
+    return coordinates
+
+
+def _encode_value(value: int, out: list[str]):
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        out.append(chr((0x20 | value & 0x1F) + 63))
+        value >>= 5
+    out.append(chr(value + 63))
+
+
+def encode_polyline(coordinates: list[tuple[float, float]]) -> str:
+    # Inverse of decode_polyline
+    out: list[str] = []
+    prev_lat = prev_lng = 0
+    for lng, lat in coordinates:
+        lat, lng = round(lat * POLYLINE_SCALE), round(lng * POLYLINE_SCALE)
+        _encode_value(lat - prev_lat, out)
+        _encode_value(lng - prev_lng, out)
+        prev_lat, prev_lng = lat, lng
+    return "".join(out)
+
+
+def simplify_polyline(coordinates: list[tuple[float, float]], tolerance: float) -> list[tuple[float, float]]:
+    # Douglas-Peucker: the route stays within `tolerance` meters of the original
+    tolerances = douglas_peucker_tolerances([(lat, lng) for lng, lat in coordinates])
+    threshold = math.degrees(tolerance / EARTH_RADIUS_M)
+    return list(compress(coordinates, [value > threshold for value in tolerances]))
@@ -1,15 +1,23 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from hashlib import sha256
+from typing import Any, Awaitable, Callable
 
 import httpx
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 
-from ...models.models import ProviderPlaceResult, RoutingQuery, RoutingResponse
+from ...models.models import (ProviderPlaceResult, RouteEncoding, RoutingQuery,
+                              RoutingResponse)
+from ..http import http_request
+from ..polyline import decode_polyline, encode_polyline, simplify_polyline
+from .cache import cache_get, cache_key, cache_set
 
 
 class BaseMapProvider(ABC):
     TYPES_MAPPER: dict[str, list[str]] = {}
     TIMEOUT = 10
+    CACHE_NAMESPACE = "base"
+    ROUTE_PRECISION = 5  # ~1m, enough to absorb float noise from the frontend
 
     def __init__(self, api_key: str | None = None):
         self.api_key = api_key
@@ -48,12 +56,17 @@ class BaseMapProvider(ABC):
         follow_redirects: bool = False,
     ) -> dict[str, Any] | str:
         try:
-            async with httpx.AsyncClient(timeout=self.TIMEOUT) as client:
-                response = await client.request(
-                    method, url, headers=headers, params=params, json=json, follow_redirects=follow_redirects
-                )
-                response.raise_for_status()
-                return response.json() if method != "GET" or not follow_redirects else str(response.url)
+            response = await http_request(
+                method,
+                url,
+                headers=headers,
+                params=params,
+                json=json,
+                follow_redirects=follow_redirects,
+                timeout=self.TIMEOUT,
+            )
+            response.raise_for_status()
+            return response.json() if method != "GET" or not follow_redirects else str(response.url)
 
         except httpx.HTTPStatusError as exc:
             error_msg = "Request failed"
@@ -66,49 +79,49 @@ class BaseMapProvider(ABC):
         except Exception as exc:
             raise HTTPException(status_code=400, detail=str(exc))
 
-    def _decode_encoded_polyline(self, encoded: str) -> list[tuple[float, float]]:
-        # based on gist.github.com/signed0/2031157 and nejohnson2/d41a27dea7b267986cce
-        # todo: use https://pypi.org/project/polyline/
-        coordinates = []
-        index = 0
-        lat = 0
-        lng = 0
-        length = len(encoded)
-
-        try:
-            while index < length:
-                # Decode lat
-                result = 0
-                shift = 0
-                while True:
-                    if index >= length:
-                        raise ValueError("Truncated polyline string")
-                    byte = ord(encoded[index]) - 63
-                    index += 1
-                    result |= (byte & 0x1F) << shift
-                    shift += 5
-                    if byte < 0x20:
-                        break
-
-                lat += ~(result >> 1) if result & 1 else (result >> 1)
-
-                # Decode lng
-                result = 0
-                shift = 0
-                while True:
-                    if index >= length:
-                        raise ValueError("Truncated polyline string")
-                    byte = ord(encoded[index]) - 63
-                    index += 1
-                    result |= (byte & 0x1F) << shift
-                    shift += 5
-                    if byte < 0x20:
-                        break
-
-                lng += ~(result >> 1) if result & 1 else (result >> 1)
-                coordinates.append([lng * 1e-5, lat * 1e-5])
-
-        except Exception:
-            raise ValueError("Malformed polyline string")
-
-        return coordinates
+    async def _cached(self, kind: str, params: Any, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        # Entries are scoped to the API key: results fetched with one user's key
+        # are never served to another (Google terms forbid sharing them).
+        scope = sha256(self.api_key.encode()).hexdigest() if self.api_key else ""
+        key = cache_key(self.CACHE_NAMESPACE, scope, kind, params)
+        if (value := await cache_get(key)) is not None:
+            return value
+
+        value = await fetch()
+        if value is not None:
+            await cache_set(key, kind, value)
+        return value
+
+    async def cached_route(self, data: RoutingQuery) -> RoutingResponse:
+        # Entries hold the encoded polyline, a fraction of the coordinates' size. Simplified
+        # routes are cached per tolerance on top of the full one.
+        coordinates = [
+            (round(c.lat, self.ROUTE_PRECISION), round(c.lng, self.ROUTE_PRECISION)) for c in data.coordinates
+        ]
+
+        async def _fetch() -> dict[str, Any]:
+            route = await self.get_route(data)
+            decode_polyline(route.polyline)  # Raises on a malformed polyline, before it is cached
+            return route.model_dump(include={"distance", "duration", "polyline"})
+
+        async def _fetch_simplified() -> dict[str, Any]:
+            route = await self._cached("route", [data.profile, coordinates, None], _fetch)
+            polyline = await run_in_threadpool(_simplify_polyline, route["polyline"], data.tolerance)
+            return {**route, "polyline": polyline}
+
+        if data.tolerance:
+            route = await self._cached("route", [data.profile, coordinates, data.tolerance], _fetch_simplified)
+        else:
+            route = await self._cached("route", [data.profile, coordinates, None], _fetch)
+
+        if data.encoding == RouteEncoding.POLYLINE:
+            return RoutingResponse(**route)
+        return RoutingResponse(
+            distance=route["distance"],
+            duration=route["duration"],
+            coordinates=decode_polyline(route["polyline"]),
+        )
+
+
+def _simplify_polyline(polyline: str, tolerance: float) -> str:
+    return encode_polyline(simplify_polyline(decode_polyline(polyline), tolerance))
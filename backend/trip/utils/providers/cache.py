@@ -0,0 +1,98 @@
+import json
+from datetime import datetime, timedelta
+from hashlib import sha256
+from typing import Any
+
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ...config import get_settings
+from ...db.core import get_async_engine
+from ...models.models import ProviderCache, ProviderCacheStats
+from ..date import dt_utc
+
+CACHE_TTLS: dict[str, timedelta] = {
+    "search": timedelta(days=7),
+    "geocode": timedelta(days=30),
+    "details": timedelta(days=7),
+    "photo": timedelta(days=1),
+    "cid": timedelta(days=90),
+    "shortlink": timedelta(days=90),
+    "route": timedelta(days=30),
+}
+
+# Every hit and miss would otherwise write to the database all requests share:
+# last_hit only needs to order entries for the LRU bound, and the bound may be
+# overshot by a few entries between two trims
+LAST_HIT_RESOLUTION = timedelta(hours=1)
+TRIM_EVERY_SETS = 100
+
+# Per-process counters, reset on restart
+_stats = {"hits": 0, "misses": 0}
+_sets_since_trim = 0
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.split()).casefold()
+
+
+def cache_key(*parts: Any) -> str:
+    return sha256(json.dumps(parts, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+async def cache_get(key: str) -> Any | None:
+    now = dt_utc()
+    async with AsyncSession(get_async_engine()) as session:
+        entry = await session.get(ProviderCache, key)
+        if not entry or entry.expires_at <= now:
+            _stats["misses"] += 1
+            return None
+
+        value = entry.value
+        if now - entry.last_hit >= LAST_HIT_RESOLUTION:
+            entry.last_hit = now
+            session.add(entry)
+            await session.commit()
+        _stats["hits"] += 1
+        return value
+
+
+async def cache_set(key: str, kind: str, value: Any):
+    global _sets_since_trim
+    now = dt_utc()
+    values = {"kind": kind, "value": value, "expires_at": now + CACHE_TTLS[kind], "last_hit": now}
+    async with AsyncSession(get_async_engine()) as session:
+        await session.exec(
+            sqlite_insert(ProviderCache)
+            .values(key=key, **values)
+            .on_conflict_do_update(index_elements=[ProviderCache.key], set_=values)
+        )
+        _sets_since_trim += 1
+        if _sets_since_trim >= TRIM_EVERY_SETS:
+            _sets_since_trim = 0
+            await _trim(session, now)
+        await session.commit()
+
+
+async def _trim(session: AsyncSession, now: datetime):
+    await session.exec(delete(ProviderCache).where(ProviderCache.expires_at <= now))
+
+    # LRU bound: drop the least recently hit entries above the limit
+    count = (await session.exec(select(func.count()).select_from(ProviderCache))).one()
+    overflow = count - get_settings().PROVIDER_CACHE_MAX_ENTRIES
+    if overflow > 0:
+        oldest = select(ProviderCache.key).order_by(ProviderCache.last_hit).limit(overflow)
+        await session.exec(delete(ProviderCache).where(ProviderCache.key.in_(oldest)))
+
+
+def cache_stats(session: Session) -> ProviderCacheStats:
+    entries = session.exec(select(func.count()).select_from(ProviderCache)).one()
+    return ProviderCacheStats(entries=entries, **_stats)
+
+
+def cache_clear(session: Session):
+    session.exec(delete(ProviderCache))
+    session.commit()
+    _stats["hits"] = _stats["misses"] = 0
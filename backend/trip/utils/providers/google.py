@@ -6,9 +6,11 @@ from fastapi import HTTPException
 from ...models.models import (ProviderBoundaries, ProviderPlaceResult,
                               RoutingQuery, RoutingResponse)
 from .base import BaseMapProvider
+from .cache import normalize_query
 
 
 class GoogleMapsProvider(BaseMapProvider):
+    CACHE_NAMESPACE = "google"
     TYPES_MAPPER: dict[str, list[str]] = {
         "Entertainment & Leisure": ["amusement", "aquarium", "cinema", "theatre"],
         "Culture": ["monument", "historical_place", "museum", "historical", "art_", "church", "cathedral"],
@@ -36,7 +38,7 @@ class GoogleMapsProvider(BaseMapProvider):
         url = "https://maps.googleapis.com/maps/api/place/details/json"
         params = {"cid": cid, "key": self.api_key, "fields": "place_id"}
 
-        data = await self._request("GET", url, params=params)
+        data = await self._cached("cid", cid, lambda: self._request("GET", url, params=params))
         return data.get("result", {}).get("place_id")
 
     async def _get_photo(self, name: str) -> str | None:
@@ -44,14 +46,18 @@ class GoogleMapsProvider(BaseMapProvider):
         params = {"key": self.api_key, "maxWidthPx": 1000}
 
         try:
-            result = await self._request("GET", url, params=params, follow_redirects=True)
+            result = await self._cached(
+                "photo", name, lambda: self._request("GET", url, params=params, follow_redirects=True)
+            )
             return result if isinstance(result, str) else None
         except Exception:
             return None
 
     async def _resolve_shortlink(self, link_id: str) -> str:
         url = f"https://maps.app.goo.gl/{link_id}"
-        return await self._request("GET", url, follow_redirects=True)
+        return await self._cached(
+            "shortlink", link_id, lambda: self._request("GET", url, follow_redirects=True)
+        )
 
     def _compute_avg_price(self, price_range: dict | None) -> float | None:
         if not price_range:
@@ -114,7 +120,11 @@ class GoogleMapsProvider(BaseMapProvider):
             "places.displayName,places.allowsDogs,places.photos,places.restroom,places.regularOpeningHours.weekdayDescriptions",
         }
 
-        data = await self._request("POST", url, headers=headers, json=body)
+        data = await self._cached(
+            "search",
+            [normalize_query(query), location],
+            lambda: self._request("POST", url, headers=headers, json=body),
+        )
         return data.get("places", [])
 
     async def search_nearby(self, location: dict[str, Any], radius: float = 1600.0) -> list[dict[str, Any]]:
@@ -143,7 +153,7 @@ class GoogleMapsProvider(BaseMapProvider):
             "internationalPhoneNumber,displayName,allowsDogs,photos,restroom,regularOpeningHours.weekdayDescriptions",
         }
 
-        return await self._request("GET", url, headers=headers)
+        return await self._cached("details", place_id, lambda: self._request("GET", url, headers=headers))
 
     async def url_to_place(self, url: str) -> dict[str, Any] | None:
         try:
@@ -165,7 +175,9 @@ class GoogleMapsProvider(BaseMapProvider):
         url = "https://maps.googleapis.com/maps/api/geocode/json"
         params = {"address": name, "key": self.api_key}
 
-        data = await self._request("GET", url, params=params)
+        data = await self._cached(
+            "geocode", normalize_query(name), lambda: self._request("GET", url, params=params)
+        )
 
         if data.get("status") != "OK" or not data.get("results"):
             return None
@@ -221,5 +233,5 @@ class GoogleMapsProvider(BaseMapProvider):
         return RoutingResponse(
             distance=route.get("distanceMeters", 0),
             duration=duration,
-            coordinates=self._decode_encoded_polyline(polyline),
+            polyline=polyline,
         )
@@ -5,9 +5,11 @@ from fastapi import HTTPException
 from ...models.models import (LatLng, ProviderBoundaries, ProviderPlaceResult,
                               RoutingQuery, RoutingResponse)
 from .base import BaseMapProvider
+from .cache import normalize_query
 
 
 class OpenStreetMapProvider(BaseMapProvider):
+    CACHE_NAMESPACE = "osm"
     TYPES_MAPPER: dict[str, list[str]] = {
         "Entertainment & Leisure": [
             "amusement_arcade",
@@ -167,7 +169,11 @@ class OpenStreetMapProvider(BaseMapProvider):
         }
         headers = {"User-Agent": self.USER_AGENT}
 
-        data = await self._request("GET", url, headers=headers, params=params)
+        data = await self._cached(
+            "search",
+            normalize_query(query),
+            lambda: self._request("GET", url, headers=headers, params=params),
+        )
         return data if isinstance(data, list) else []
 
     async def search_nearby(self, location: dict[str, Any], radius: float = 1600.0) -> list[dict[str, Any]]:
@@ -181,7 +187,11 @@ class OpenStreetMapProvider(BaseMapProvider):
         params = {"q": query, "format": "json", "limit": 1}
         headers = {"User-Agent": self.USER_AGENT}
 
-        data = await self._request("GET", url, headers=headers, params=params)
+        data = await self._cached(
+            "geocode",
+            normalize_query(query),
+            lambda: self._request("GET", url, headers=headers, params=params),
+        )
         bbox = data[0].get("boundingbox")
         if not bbox or len(bbox) != 4:
             return None
@@ -221,5 +231,5 @@ class OpenStreetMapProvider(BaseMapProvider):
         return RoutingResponse(
             distance=route.get("distance", 0),
             duration=route.get("duration", 0),
-            coordinates=self._decode_encoded_polyline(route.get("geometry")),
+            polyline=route.get("geometry"),
         )
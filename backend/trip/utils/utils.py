@@ -1,21 +1,35 @@
 import base64
 import logging
 import shutil
+from hashlib import sha256
 from io import BytesIO
 from pathlib import Path
 from secrets import token_urlsafe
 from uuid import uuid4
 
-import httpx
 from fastapi import HTTPException, UploadFile
 from PIL import Image
 
 from .. import __version__
 from ..config import get_settings
 from .date import dt_utc
+from .http import http_request
 
 logger = logging.getLogger(__name__)
 
+# Downscales by an integer factor with reduce() before the LANCZOS pass once the
+# source is this many times larger than the target, visually identical output
+IMAGE_REDUCING_GAP = 3.0
+
+# Responsive derivatives, generated on first request and cached on disk
+IMAGE_VARIANT_WIDTHS = (64, 256, 768, 1536)
+IMAGE_VARIANT_FORMATS = {"webp": "WEBP", "avif": "AVIF"}
+IMAGE_VARIANT_QUALITY = 75
+
+# A shared asset file reused this recently may back an Image row that is not
+# committed yet (eg. a long backup import): releasing it is left to the orphan sweep
+IMAGE_RELEASE_GRACE_SECONDS = 300
+
 
 def generate_urlsafe() -> str:
     return token_urlsafe(32)
@@ -29,6 +43,15 @@ def assets_folder_path() -> Path:
     return Path(get_settings().ASSETS_FOLDER)
 
 
+def image_variants_folder_path() -> Path:
+    return Path(get_settings().IMAGE_VARIANTS_FOLDER)
+
+
+def image_variant_path(filename: str, width: int, ext: str) -> Path:
+    # Named after the full source filename: x.jpg and x.png must not share variants
+    return image_variants_folder_path() / f"{Path(filename).name}_{width}.{ext}"
+
+
 def attachments_folder_path() -> Path:
     return Path(get_settings().ATTACHMENTS_FOLDER)
 
@@ -75,6 +98,8 @@ def remove_image(filename: str):
         if not image_fp.exists():
             return
         image_fp.unlink()
+        for variant_fp in image_variants_folder_path().glob(f"{image_fp.name}_*"):
+            variant_fp.unlink(missing_ok=True)
     except OSError:
         pass
 
@@ -88,10 +113,9 @@ async def httpx_get(link: str) -> dict:
     }
 
     try:
-        async with httpx.AsyncClient(follow_redirects=True, headers=headers, timeout=5) as client:
-            response = await client.get(link)
-            response.raise_for_status()
-            return response.json()
+        response = await http_request("GET", link, follow_redirects=True, headers=headers, timeout=5)
+        response.raise_for_status()
+        return response.json()
     except Exception:
         raise HTTPException(status_code=400, detail="Bad Request")
 
@@ -108,21 +132,18 @@ async def download_file(link: str) -> tuple[str, int]:
     }
 
     try:
-        async with httpx.AsyncClient(follow_redirects=True, headers=headers, timeout=5) as client:
-            response = await client.get(link)
-            response.raise_for_status()
-            content_type = response.headers.get("Content-Type", "")
-            if not content_type.startswith("image/"):
-                raise HTTPException(
-                    status_code=400, detail="Bad Request: provided image URL is not an image"
-                )
-            infer_extension = content_type.split("/")[1]
-            if not infer_extension:
-                infer_extension = "jpg"
-            file_size = len(response.content)
-            path = assets_folder_path() / generate_filename(infer_extension)
-            path.write_bytes(response.content)
-            return str(path), file_size
+        response = await http_request("GET", link, follow_redirects=True, headers=headers, timeout=5)
+        response.raise_for_status()
+        content_type = response.headers.get("Content-Type", "")
+        if not content_type.startswith("image/"):
+            raise HTTPException(status_code=400, detail="Bad Request: provided image URL is not an image")
+        infer_extension = content_type.split("/")[1]
+        if not infer_extension:
+            infer_extension = "jpg"
+        file_size = len(response.content)
+        path = assets_folder_path() / generate_filename(infer_extension)
+        path.write_bytes(response.content)
+        return str(path), file_size
     except HTTPException:
         raise
     except Exception as exc:
@@ -133,9 +154,8 @@ async def download_file(link: str) -> tuple[str, int]:
 async def check_update():
     url = "https://api.github.com/repos/itskovacs/trip/releases/latest"
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=5) as client:
-            response = await client.get(url)
-            response.raise_for_status()
+        response = await http_request("GET", url, follow_redirects=True, timeout=5)
+        response.raise_for_status()
 
         latest_version = response.json()["tag_name"]
         if __version__ != latest_version:
@@ -147,9 +167,15 @@ async def check_update():
         raise HTTPException(status_code=503, detail="Couldn't verify for update")
 
 
-def patch_image(fp: str, size: int = 400) -> bool:
+def patch_image(fp: str, size: int = 400) -> tuple[str, int]:
+    # Resizes a downloaded file and moves it to its content-addressed name
+    path = Path(fp)
+    content = None
     try:
-        with Image.open(fp) as im:
+        with Image.open(path) as im:
+            if size > 0 and im.format == "JPEG":
+                # Let libjpeg decode at the smallest 1/2^n scale still >= size
+                im.draft("RGB", (size, size))
             if im.mode not in ("RGB", "RGBA"):
                 im = im.convert("RGB")
 
@@ -164,7 +190,7 @@ def patch_image(fp: str, size: int = 400) -> bool:
                     new_width = size
                     new_height = int(size / im_ratio)
 
-                im = im.resize((new_width, new_height), Image.LANCZOS)
+                im = im.resize((new_width, new_height), Image.LANCZOS, reducing_gap=IMAGE_REDUCING_GAP)
 
                 left = (im.width - size) // 2
                 top = (im.height - size) // 2
@@ -173,18 +199,41 @@ def patch_image(fp: str, size: int = 400) -> bool:
 
                 im = im.crop((left, top, right, bottom))
 
-            im.save(fp)
-            return True
+            buffer = BytesIO()
+            im.save(buffer, format=Image.registered_extensions()[path.suffix.lower()])
+            content = buffer.getvalue()
 
     except Exception:
         ...
-    return False
+
+    try:
+        if content is None:  # Keep the file as downloaded
+            content = path.read_bytes()
+        path.unlink()
+        return store_image_content(content, path.suffix.lstrip(".").lower())
+    except OSError:
+        return "", 0
+
+
+def store_image_content(content: bytes, ext: str) -> tuple[str, int]:
+    # Assets are content-addressed: identical processed output is stored once and
+    # shared by every Image row pointing at it (see models.remove_unreferenced_images)
+    filename = f"{sha256(content).hexdigest()}.{ext}"
+    filepath = assets_folder_path() / filename
+    if filepath.exists():
+        filepath.touch()  # Marks it as in use for the release grace period
+    else:
+        tmp_fp = filepath.with_name(f"{filename}.{uuid4().hex}")
+        tmp_fp.write_bytes(content)
+        tmp_fp.replace(filepath)
+    return filename, len(content)
 
 
 def save_image_to_file(content: bytes, size: int = 600) -> tuple[str, int]:
-    filepath = None
     try:
         with Image.open(BytesIO(content)) as im:
+            if size > 0 and im.format == "JPEG":
+                im.draft("RGB", (size, size))
             if im.mode not in ("RGB", "RGBA"):
                 im = im.convert("RGB")
 
@@ -199,7 +248,7 @@ def save_image_to_file(content: bytes, size: int = 600) -> tuple[str, int]:
                     new_width = size
                     new_height = int(new_width / im_ratio)
 
-                im = im.resize((new_width, new_height), Image.LANCZOS)
+                im = im.resize((new_width, new_height), Image.LANCZOS, reducing_gap=IMAGE_REDUCING_GAP)
 
                 left = (im.width - size) // 2
                 top = (im.height - size) // 2
@@ -217,18 +266,39 @@ def save_image_to_file(content: bytes, size: int = 600) -> tuple[str, int]:
             else:
                 raise ValueError("Unsupported image format")
 
-            filename = generate_filename(image_ext)
-            filepath = assets_folder_path() / filename
-            im.save(filepath)
-            file_size = filepath.stat().st_size
-            return filename, file_size
+            buffer = BytesIO()
+            im.save(buffer, format=image_ext)
+            return store_image_content(buffer.getvalue(), image_ext)
 
     except Exception:
-        if filepath and filepath.exists():
-            filepath.unlink()
+        ...
     return "", 0
 
 
+def save_image_variant(filename: str, width: int, ext: str) -> bool:
+    variant_fp = image_variant_path(filename, width, ext)
+    tmp_fp = variant_fp.with_name(f"{variant_fp.name}.{uuid4().hex}")
+    try:
+        with Image.open(assets_folder_path() / filename) as im:
+            if im.format == "JPEG":
+                im.draft("RGB", (width, width))
+            if im.mode not in ("RGB", "RGBA"):
+                im = im.convert("RGB")
+
+            if im.width > width:  # Never upscale
+                new_height = max(1, round(im.height * width / im.width))
+                im = im.resize((width, new_height), Image.LANCZOS, reducing_gap=IMAGE_REDUCING_GAP)
+
+            variant_fp.parent.mkdir(parents=True, exist_ok=True)
+            im.save(tmp_fp, format=IMAGE_VARIANT_FORMATS[ext], quality=IMAGE_VARIANT_QUALITY)
+            tmp_fp.replace(variant_fp)
+            return True
+
+    except Exception:
+        tmp_fp.unlink(missing_ok=True)
+    return False
+
+
 def enforce_upload_size(file: UploadFile, max_size: int) -> None:
     if file.size is not None and file.size > max_size:
         raise HTTPException(status_code=400, detail="File is too large")
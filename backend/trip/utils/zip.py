@@ -2,10 +2,10 @@ import json
 import logging
 import sqlite3
 import tempfile
-from io import BytesIO
+import zlib
 from pathlib import Path
-from typing import Annotated
-from zipfile import ZIP_DEFLATED, ZipFile
+from typing import Annotated, Any, Callable, Iterator
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile, ZipInfo
 
 from fastapi import Depends, HTTPException, UploadFile
 from sqlalchemy.orm import selectinload
@@ -14,25 +14,34 @@ from sqlmodel import Session, select
 from .. import __version__ as trip_version
 from ..config import get_settings
 from ..db.core import get_engine
+from ..db.loaders import place_graph_options, trip_graph_options
 from ..deps import SessionDep, get_current_username
 from ..models.models import (Backup, BackupStatus, Category, CategoryRead,
-                             Image, Place, PlaceRead, Trip, TripAttachment,
-                             TripBooking, TripBookingAttachmentLink,
-                             TripChecklist, TripChecklistEntry,
-                             TripChecklistItem, TripChecklistItemRead,
-                             TripChecklistRead, TripDay, TripItem,
-                             TripItemAttachmentLink, TripItemImageLink,
-                             TripPackingList, TripPackingListEntry,
-                             TripPackingListItem, TripPackingListItemRead,
-                             TripPackingListRead, TripRead, User, UserRead)
+                             GpxTrackData, Image, Place, PlaceRead, Trip,
+                             TripAttachment, TripBooking,
+                             TripBookingAttachmentLink, TripChecklist,
+                             TripChecklistEntry, TripChecklistItem,
+                             TripChecklistItemRead, TripChecklistRead, TripDay,
+                             TripItem, TripItemAttachmentLink,
+                             TripItemImageLink, TripPackingList,
+                             TripPackingListEntry, TripPackingListItem,
+                             TripPackingListItemRead, TripPackingListRead,
+                             TripRead, User, UserRead,
+                             remove_unreferenced_images)
+from .backup_store import incremental_backup_export
 from .date import dt_utc, iso_to_dt
+from .gpx import GPX_DIGEST_RE
+from .images import process_images
 from .utils import (assets_folder_path, attachments_folder_path,
                     attachments_trip_folder_path, b64img_decode,
-                    generate_urlsafe, remove_image, save_image_to_file)
+                    generate_urlsafe)
 from .xml import parse_mymaps_kml
 
 logger = logging.getLogger(__name__)
 
+ZIP_STREAM_BLOCK_SIZE = 256 * 1024
+STORED_SUFFIXES = {".pdf", ".jpg", ".jpeg", ".png", ".webp", ".gif", ".zip"}
+
 
 def _stream_path_to_zip(zipf: ZipFile, path: Path, zip_dir: str):
     if not path.exists():
@@ -42,7 +51,8 @@ def _stream_path_to_zip(zipf: ZipFile, path: Path, zip_dir: str):
         if not fp.is_file():
             continue
         rel_path = fp.relative_to(path)
-        zipf.write(fp, f"{zip_dir}/{rel_path}")
+        compress_type = ZIP_STORED if fp.suffix.lower() in STORED_SUFFIXES else ZIP_DEFLATED
+        zipf.write(fp, f"{zip_dir}/{rel_path}", compress_type=compress_type)
 
 
 def _dedupe_zip_filename(filename: str, used_names: set[str]) -> str:
@@ -64,14 +74,49 @@ def _dedupe_zip_filename(filename: str, used_names: set[str]) -> str:
     return candidate
 
 
-def zip_trip_attachments(trip_id: int, attachments: list[TripAttachment], zip_fp: Path | BytesIO):
+class _ZipChunkSink:
+    # Write-only, non-seekable target: ZipFile then streams entries with data
+    # descriptors, and whatever it wrote so far can be drained after each block.
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_trip_attachments(trip_id: int, attachments: list[TripAttachment]) -> Iterator[bytes]:
+    # Yields the archive as it is built, so memory stays at one read block
+    # whatever the number/size of attachments.
     used_names: set[str] = set()
-    with ZipFile(zip_fp, "w", ZIP_DEFLATED, compresslevel=9) as zipf:
+    sink = _ZipChunkSink()
+    with ZipFile(sink, "w", ZIP_DEFLATED) as zipf:
         for attachment in attachments:
             att_path = attachments_trip_folder_path(trip_id) / attachment.stored_filename
             if not att_path.is_file():
                 continue
-            zipf.write(att_path, _dedupe_zip_filename(attachment.filename, used_names))
+
+            zinfo = ZipInfo.from_file(att_path, _dedupe_zip_filename(attachment.filename, used_names))
+            # PDFs (and images) are already compressed, deflating them again is wasted CPU
+            zinfo.compress_type = (
+                ZIP_STORED if Path(attachment.filename).suffix.lower() in STORED_SUFFIXES else ZIP_DEFLATED
+            )
+            with att_path.open("rb") as src, zipf.open(zinfo, "w") as dest:
+                while block := src.read(ZIP_STREAM_BLOCK_SIZE):
+                    dest.write(block)
+                    if data := sink.drain():
+                        yield data
+            if data := sink.drain():
+                yield data
+    yield sink.drain()
 
 
 def _admin_backup_export(zip_fp: Path):
@@ -90,7 +135,7 @@ def _user_backup_export(user: str, backup_dt, zip_fp: Path, session: Session):
     with ZipFile(zip_fp, "w", ZIP_DEFLATED, compresslevel=9) as zipf:
         user_settings = UserRead.serialize(session.get(User, user)).model_dump(mode="json")
         categories = session.exec(select(Category).where(Category.user == user)).all()
-        places = session.exec(select(Place).where(Place.user == user)).all()
+        places = session.exec(select(Place).options(*place_graph_options()).where(Place.user == user)).all()
 
         data = {
             "_": {
@@ -100,33 +145,18 @@ def _user_backup_export(user: str, backup_dt, zip_fp: Path, session: Session):
             },
             "settings": user_settings,
             "categories": [CategoryRead.serialize(c).model_dump(mode="json") for c in categories],
-            "places": [PlaceRead.serialize(p, exclude_gpx=False).model_dump(mode="json") for p in places],
+            "places": [PlaceRead.serialize(p).model_dump(mode="json") for p in places],
         }
 
         trips_query = (
             select(Trip)
             .where(Trip.user == user)
             .options(
-                selectinload(Trip.days)
-                .selectinload(TripDay.items)
-                .options(
-                    selectinload(TripItem.place).selectinload(Place.category).selectinload(Category.image),
-                    selectinload(TripItem.place).selectinload(Place.image),
-                    selectinload(TripItem.image),
-                    selectinload(TripItem.images),
-                ),
-                selectinload(Trip.places).options(
-                    selectinload(Place.category).selectinload(Category.image),
-                    selectinload(Place.image),
-                ),
-                selectinload(Trip.image),
-                selectinload(Trip.memberships),
-                selectinload(Trip.shares),
+                *trip_graph_options(),
                 selectinload(Trip.packing_items),
                 selectinload(Trip.checklist_items),
                 selectinload(Trip.packing_lists).selectinload(TripPackingList.items),
                 selectinload(Trip.checklists).selectinload(TripChecklist.items),
-                selectinload(Trip.attachments),
             )
             .execution_options(yield_per=10)
         )
@@ -151,10 +181,25 @@ def _user_backup_export(user: str, backup_dt, zip_fp: Path, session: Session):
         ]
         zipf.writestr("data.json", json.dumps(data, ensure_ascii=False))
 
-        for image in session.exec(select(Image).where(Image.user == user)):
-            img_path = assets_folder_path() / image.filename
+        # data.json only carries track digests, each GPX document is stored once
+        digests = {place["gpx"] for place in data["places"] if place.get("gpx")}
+        digests.update(
+            item["gpx"]
+            for trip in data["trips"]
+            for day in trip["days"]
+            for item in day["items"]
+            if item.get("gpx")
+        )
+        for digest in digests:
+            if track_data := session.get(GpxTrackData, digest):
+                zipf.writestr(f"gpx/{digest}.gpx", zlib.decompress(track_data.data))
+                session.expunge(track_data)
+
+        # Image rows can share one content-addressed file
+        for filename in session.exec(select(Image.filename).where(Image.user == user).distinct()):
+            img_path = assets_folder_path() / filename
             if img_path.is_file():
-                zipf.write(img_path, f"images/{image.filename}")
+                zipf.write(img_path, f"images/{filename}")
 
         attachment_query = select(TripAttachment).where(TripAttachment.uploaded_by == user)
         for att in session.exec(attachment_query):
@@ -163,7 +208,7 @@ def _user_backup_export(user: str, backup_dt, zip_fp: Path, session: Session):
                 zipf.write(att_path, f"attachments/{att.trip_id}/{att.stored_filename}")
 
 
-def process_backup_export(backup_id: int, full: bool = False):
+def process_backup_export(backup_id: int, full: bool = False, incremental: bool = False):
     engine = get_engine()
     with Session(engine) as session:
         db_backup = session.get(Backup, backup_id)
@@ -180,7 +225,9 @@ def process_backup_export(backup_id: int, full: bool = False):
         # This token is internal only: download endpoints rebuild a user-facing
         # filename from created_at/user at download time, so it never leaks out.
         unique_token = generate_urlsafe()[:8]
-        if full:
+        if incremental:
+            filename = f"TRIP_{iso_date}_incremental_backup_{unique_token}.zip"
+        elif full:
             filename = f"TRIP_{iso_date}_full_backup_{unique_token}.zip"
         else:
             filename = f"TRIP_{db_backup.user}_{iso_date}_backup_{unique_token}.zip"
@@ -189,7 +236,14 @@ def process_backup_export(backup_id: int, full: bool = False):
         zip_fp = backups_dir / filename
 
         try:
-            if full:
+            if incremental:
+                previous = session.exec(
+                    select(Backup.filename)
+                    .where(Backup.incremental.is_(True), Backup.status == BackupStatus.COMPLETED)
+                    .order_by(Backup.created_at.desc())
+                ).first()
+                incremental_backup_export(zip_fp, previous)
+            elif full:
                 _admin_backup_export(zip_fp)
             else:
                 _user_backup_export(db_backup.user, backup_dt, zip_fp, session)
@@ -222,6 +276,55 @@ def _read_bounded(zipf: ZipFile, name: str, max_size: int) -> bytes:
     return data
 
 
+IMPORT_IMAGE_BATCH_SIZE = 32
+
+
+def _import_images(
+    session: Session,
+    user: str,
+    jobs: list[tuple[Callable[[], bytes], int]],
+    created_image_filenames: list[str],
+) -> list[Image | None]:
+    # Image bytes are loaded a batch at a time (bounded memory), decoded/resized in
+    # the image pool, and all Image rows are inserted with one flush. The result is
+    # aligned with `jobs`, None where an image could not be restored.
+    images: list[Image | None] = []
+    for start in range(0, len(jobs), IMPORT_IMAGE_BATCH_SIZE):
+        batch = []
+        for load, size in jobs[start : start + IMPORT_IMAGE_BATCH_SIZE]:
+            try:
+                batch.append((load(), size))
+            except Exception as exc:
+                logger.warning(f"[BACKUP IMPORT]: Failed to read image: {exc}")
+                batch.append((b"", size))
+
+        for filename, file_size in process_images(batch):
+            if not filename:
+                images.append(None)
+                continue
+            created_image_filenames.append(filename)
+            images.append(Image(filename=filename, file_size=file_size, user=user))
+
+    if any(images):
+        session.add_all([image for image in images if image])
+        session.flush()
+    return images
+
+
+def _import_result(session: Session, user: str, place_ids: list[int]) -> dict:
+    places = session.exec(select(Place).options(*place_graph_options()).where(Place.id.in_(place_ids))).all()
+    return {
+        "places": [PlaceRead.serialize(p) for p in places],
+        "categories": [
+            CategoryRead.serialize(c)
+            for c in session.exec(
+                select(Category).options(selectinload(Category.image)).where(Category.user == user)
+            ).all()
+        ],
+        "settings": UserRead.serialize(session.get(User, user)),
+    }
+
+
 # use def instead of async def https://fastapi.tiangolo.com/async/#path-operation-functions
 def process_backup_import(
     session: SessionDep, current_user: Annotated[str, Depends(get_current_username)], file: UploadFile
@@ -266,53 +369,91 @@ def process_backup_import(
             if path.startswith("attachments/") and not path.endswith("/")
         }
 
+        gpx_files = {
+            path.split("/")[-1]: path for path in zip_filenames if path.startswith("gpx/") and not path.endswith("/")
+        }
+
+        def _gpx_of(entry: dict) -> str | None:
+            # Backups made before the track store embed the GPX document itself
+            gpx = entry.get("gpx")
+            if gpx and GPX_DIGEST_RE.fullmatch(gpx) and (path := gpx_files.get(f"{gpx}.gpx")):
+                return _read_bounded(zipf, path, get_settings().BACKUP_IMPORT_MAX_ENTRY_SIZE).decode()
+            return gpx
+
         error_details = "Bad request"
         created_image_filenames = []
         created_attachment_trips = []
         try:
+            max_entry_size = get_settings().BACKUP_IMPORT_MAX_ENTRY_SIZE
+            place_image_size = get_settings().PLACE_IMAGE_SIZE
+
             existing_categories = {
                 category.name: category
                 for category in session.exec(select(Category).where(Category.user == current_user)).all()
             }
 
+            # Stage 1: collect every image data.json references, then decode/resize
+            # them all in the image pool and insert the Image rows in one go.
+            image_jobs: list[tuple[Callable[[], bytes], int]] = []
+            image_refs: dict[int, list[tuple[int, Any]]] = {}
+
+            def _queue_image(entry: dict, url: str | None, size: int, ref: Any = None):
+                image_filename = (url or "").split("/")[-1]
+                if not image_filename or image_filename not in image_files:
+                    return
+                image_refs.setdefault(id(entry), []).append((len(image_jobs), ref))
+                zip_path = image_files[image_filename]
+                image_jobs.append((lambda: _read_bounded(zipf, zip_path, max_entry_size), size))
+
+            for category in data.get("categories", []):
+                category_exists = existing_categories.get(category.get("name"))
+                if category.get("image_id") and (
+                    not category_exists or category.get("image_id") != category_exists.image_id
+                ):
+                    _queue_image(category, category.get("image"), place_image_size)
+
+            for place in data.get("places", []):
+                if place.get("image_id"):
+                    _queue_image(place, place.get("image"), place_image_size)
+
+            for trip in data.get("trips", []):
+                if trip.get("image_id"):
+                    _queue_image(trip, trip.get("image"), get_settings().TRIP_IMAGE_SIZE)
+                for day in trip.get("days", []):
+                    for item in day.get("items", []):
+                        # Newer backups carry an "images" gallery; older ones only have the
+                        # single cover image/image_id, normalized into the same shape.
+                        image_entries = item.get("images")
+                        if not image_entries and item.get("image_id"):
+                            image_entries = [{"id": item.get("image_id"), "url": item.get("image", "")}]
+                        for img_entry in image_entries or []:
+                            _queue_image(item, img_entry.get("url"), place_image_size, img_entry.get("id"))
+
+            images = _import_images(session, current_user, image_jobs, created_image_filenames)
+
+            def _images_of(entry: dict) -> list[tuple[Image, Any]]:
+                return [(images[idx], ref) for idx, ref in image_refs.get(id(entry), []) if images[idx]]
+
+            # Stage 2: every table is inserted with a single flush, old ids are
+            # remapped in memory through the flushed objects.
             categories_to_add = []
             for category in data.get("categories", []):
                 category_name = category.get("name")
                 category_exists = existing_categories.get(category_name)
+                restored = _images_of(category)
 
                 if category_exists:
                     if category.get("color"):
                         category_exists.color = category["color"]
 
-                    if category.get("image_id") and category.get("image_id") != category_exists.image_id:
-                        category_filename = category.get("image").split("/")[-1]
-                        if category_filename and category_filename in image_files:
-                            try:
-                                image_bytes = _read_bounded(
-                                    zipf,
-                                    image_files[category_filename],
-                                    get_settings().BACKUP_IMPORT_MAX_ENTRY_SIZE,
-                                )
-                                filename, file_size = save_image_to_file(
-                                    image_bytes, get_settings().PLACE_IMAGE_SIZE
-                                )
-                                if filename:
-                                    image = Image(filename=filename, file_size=file_size, user=current_user)
-                                    session.add(image)
-                                    session.flush()
-                                    session.refresh(image)
-                                    created_image_filenames.append(filename)
-
-                                    if category_exists.image_id:
-                                        old_image = session.get(Image, category_exists.image_id)
-                                        if old_image:
-                                            session.delete(old_image)
-                                            category_exists.image_id = None
-                                            session.flush()
-
-                                    category_exists.image_id = image.id
-                            except Exception as exc:
-                                logger.warning(f"[BACKUP IMPORT]: Failed to restore category image: {exc}")
+                    if restored:
+                        if category_exists.image_id:
+                            old_image = session.get(Image, category_exists.image_id)
+                            if old_image:
+                                session.delete(old_image)
+                                category_exists.image_id = None
+                                session.flush()
+                        category_exists.image_id = restored[0][0].id
 
                     session.add(category_exists)
                     existing_categories[category_name] = category_exists
@@ -322,41 +463,18 @@ def process_backup_import(
                     key: category[key] for key in category.keys() if key not in {"id", "image", "image_id"}
                 }
                 new_category["user"] = current_user
-
-                if category.get("image_id"):
-                    category_filename = category.get("image").split("/")[-1]
-                    if category_filename and category_filename in image_files:
-                        try:
-                            image_bytes = _read_bounded(
-                                zipf,
-                                image_files[category_filename],
-                                get_settings().BACKUP_IMPORT_MAX_ENTRY_SIZE,
-                            )
-                            filename, file_size = save_image_to_file(
-                                image_bytes, get_settings().PLACE_IMAGE_SIZE
-                            )
-                            if filename:
-                                image = Image(filename=filename, file_size=file_size, user=current_user)
-                                session.add(image)
-                                session.flush()
-                                session.refresh(image)
-                                created_image_filenames.append(filename)
-                                new_category["image_id"] = image.id
-                        except Exception as exc:
-                            logger.warning(f"[BACKUP IMPORT]: Failed to restore new category image: {exc}")
-
-                new_category = Category(**new_category)
-                categories_to_add.append(new_category)
-                session.add(new_category)
+                if restored:
+                    new_category["image_id"] = restored[0][0].id
+                categories_to_add.append(Category(**new_category))
 
             if categories_to_add:
+                session.add_all(categories_to_add)
                 session.flush()
                 for category in categories_to_add:
                     existing_categories[category.name] = category
 
             places = []
-            places_to_add = []
-            place_old_ids = []
+            places_by_old_id: dict[int, Place] = {}
             for place in data.get("places", []):
                 category_name = place.get("category", {}).get("name")
                 category = existing_categories.get(category_name)
@@ -370,36 +488,16 @@ def process_backup_import(
                 }
                 new_place["user"] = current_user
                 new_place["category_id"] = category.id
-
-                if place.get("image_id"):
-                    place_filename = place.get("image").split("/")[-1]
-                    if place_filename and place_filename in image_files:
-                        try:
-                            image_bytes = _read_bounded(
-                                zipf,
-                                image_files[place_filename],
-                                get_settings().BACKUP_IMPORT_MAX_ENTRY_SIZE,
-                            )
-                            filename, file_size = save_image_to_file(
-                                image_bytes, get_settings().PLACE_IMAGE_SIZE
-                            )
-                            if filename:
-                                image = Image(filename=filename, file_size=file_size, user=current_user)
-                                session.add(image)
-                                session.flush()
-                                session.refresh(image)
-                                created_image_filenames.append(filename)
-                                new_place["image_id"] = image.id
-                        except Exception as exc:
-                            logger.warning(f"[BACKUP IMPORT]: Failed to restore place image: {exc}")
+                new_place["gpx"] = _gpx_of(place)
+                if restored := _images_of(place):
+                    new_place["image_id"] = restored[0][0].id
 
                 new_place = Place(**new_place)
-                places_to_add.append(new_place)
                 places.append(new_place)
-                place_old_ids.append(place.get("id"))
+                places_by_old_id[place.get("id")] = new_place
 
-            if places_to_add:
-                session.add_all(places_to_add)
+            if places:
+                session.add_all(places)
                 session.flush()
 
             db_user = session.get(User, current_user)
@@ -423,15 +521,23 @@ def process_backup_import(
                     db_user.do_not_display = ",".join(settings_data["do_not_display"])
 
                 session.add(db_user)
-                session.flush()
 
-            trip_place_id_map = {old_id: new_p.id for old_id, new_p in zip(place_old_ids, places)}
-            packing_to_add = []
-            checklist_to_add = []
-            packing_lists_to_add = []
-            checklists_to_add = []
-            attachment_links_to_add = []
-            for trip in data.get("trips", []):
+            trips = data.get("trips", [])
+            paid_by = {
+                item["paid_by"]
+                for trip in trips
+                for day in trip.get("days", [])
+                for item in day.get("items", [])
+                if item.get("paid_by")
+            }
+            if paid_by:
+                known_users = set(session.exec(select(User.username).where(User.username.in_(paid_by))).all())
+                if missing_users := sorted(paid_by - known_users):
+                    error_details = f"User <{missing_users[0]}> does not exist and is specified in Paid By"
+                    raise ValueError(error_details)
+
+            new_trips = []
+            for trip in trips:
                 new_trip = {
                     key: trip[key]
                     for key in trip.keys()
@@ -452,40 +558,24 @@ def process_backup_import(
                     }
                 }
                 new_trip["user"] = current_user
-
-                if trip.get("image_id"):
-                    trip_filename = trip.get("image").split("/")[-1]
-                    if trip_filename and trip_filename in image_files:
-                        try:
-                            image_bytes = _read_bounded(
-                                zipf, image_files[trip_filename], get_settings().BACKUP_IMPORT_MAX_ENTRY_SIZE
-                            )
-                            filename, file_size = save_image_to_file(
-                                image_bytes, get_settings().TRIP_IMAGE_SIZE
-                            )
-                            if filename:
-                                image = Image(filename=filename, file_size=file_size, user=current_user)
-                                session.add(image)
-                                session.flush()
-                                session.refresh(image)
-                                created_image_filenames.append(filename)
-                                new_trip["image_id"] = image.id
-                        except Exception as exc:
-                            logger.warning(f"[BACKUP IMPORT]: Failed to restore trip image: {exc}")
+                if restored := _images_of(trip):
+                    new_trip["image_id"] = restored[0][0].id
 
                 new_trip = Trip(**new_trip)
-                session.add(new_trip)
-                session.flush()
-                session.refresh(new_trip)
+                new_trip.places = [
+                    places_by_old_id[place.get("id")]
+                    for place in trip.get("places", [])
+                    if place.get("id") in places_by_old_id
+                ]
+                new_trips.append(new_trip)
 
-                for place in trip.get("places", []):
-                    old_id = place.get("id")
-                    new_place_id = trip_place_id_map.get(old_id)
-                    if new_place_id:
-                        db_place = session.get(Place, new_place_id)
-                        if db_place:
-                            new_trip.places.append(db_place)
+            if new_trips:
+                session.add_all(new_trips)
+                session.flush()
 
+            attachments_to_add = []
+            trip_attachment_mappings: list[dict[int, TripAttachment]] = []
+            for trip, new_trip in zip(trips, new_trips):
                 trip_attachment_mapping = {}
                 for attachment in trip.get("attachments", []):
                     stored_filename = attachment.get("stored_filename")
@@ -511,188 +601,141 @@ def process_backup_import(
                             attachment_path = attachments_trip_folder_path(new_trip.id) / stored_filename
                             created_attachment_trips.append(new_trip.id)
                             attachment_path.write_bytes(attachment_bytes)
-                            session.add(new_attachment_obj)
-                            session.flush()
-                            session.refresh(new_attachment_obj)
-                            trip_attachment_mapping[old_attachment_id] = new_attachment_obj.id
+                            attachments_to_add.append(new_attachment_obj)
+                            trip_attachment_mapping[old_attachment_id] = new_attachment_obj
 
                         except Exception as exc:
                             logger.warning(f"[BACKUP IMPORT]: Failed to restore attachment: {exc}")
                             continue
+                trip_attachment_mappings.append(trip_attachment_mapping)
+
+            if attachments_to_add:
+                session.add_all(attachments_to_add)
+                session.flush()
 
+            new_days = []
+            for trip, new_trip, trip_attachment_mapping in zip(trips, new_trips, trip_attachment_mappings):
                 for day in trip.get("days", []):
                     day_data = {key: day[key] for key in day if key not in {"id", "items", "bookings"}}
                     if "dt" in day_data and isinstance(day_data["dt"], str):
                         day_data["dt"] = iso_to_dt(day_data["dt"])
-                    new_day = TripDay(**day_data, trip_id=new_trip.id)
-                    session.add(new_day)
-                    session.flush()
-
-                    for booking in day.get("bookings", []):
-                        booking_data = {
-                            key: booking[key] for key in booking if key not in {"id", "attachments"}
-                        }
-                        new_booking = TripBooking(**booking_data, day_id=new_day.id, trip_id=new_trip.id)
-                        session.add(new_booking)
-                        session.flush()
-                        session.refresh(new_booking)
-                        for attachment in booking.get("attachments", []):
-                            attachment_id = attachment.get("id")
-                            if attachment_id and attachment_id in trip_attachment_mapping:
-                                new_attachment_id = trip_attachment_mapping[attachment_id]
-                                link = TripBookingAttachmentLink(
-                                    booking_id=new_booking.id, attachment_id=new_attachment_id
-                                )
-                                attachment_links_to_add.append(link)
+                    new_days.append((day, TripDay(**day_data, trip_id=new_trip.id), trip_attachment_mapping))
 
-                    for item in day.get("items", []):
-                        if item.get("paid_by"):
-                            u = item.get("paid_by")
-                            db_user = session.get(User, u)
-                            if not db_user:
-                                error_details = f"User <{u}> does not exist and is specified in Paid By"
-                                raise ValueError(error_details)
-
-                        item_data = {
-                            key: item[key]
-                            for key in item
-                            if key
-                            not in {"id", "place", "place_id", "image", "image_id", "images", "attachments"}
-                        }
-                        item_data["day_id"] = new_day.id
-
-                        place = item.get("place")
-                        if place and (place_id := place.get("id")):
-                            new_place_id = trip_place_id_map.get(place_id)
-                            item_data["place_id"] = new_place_id
-
-                        # Restore the image gallery. Newer backups carry an "images" list;
-                        # older ones only have the single cover image/image_id, which we
-                        # normalize into the same one-entry shape.
-                        old_cover_id = item.get("image_id")
-                        image_entries = item.get("images")
-                        if not image_entries and old_cover_id:
-                            image_entries = [{"id": old_cover_id, "url": item.get("image", "")}]
+            if new_days:
+                session.add_all([new_day for _, new_day, _ in new_days])
+                session.flush()
 
-                        restored_images: list[Image] = []
-                        cover_image: Image | None = None
-                        for img_entry in image_entries or []:
-                            img_filename = img_entry.get("url", "").split("/")[-1]
-                            if not img_filename or img_filename not in image_files:
-                                continue
-                            try:
-                                image_bytes = _read_bounded(
-                                    zipf,
-                                    image_files[img_filename],
-                                    get_settings().BACKUP_IMPORT_MAX_ENTRY_SIZE,
-                                )
-                                filename, file_size = save_image_to_file(
-                                    image_bytes, get_settings().PLACE_IMAGE_SIZE
-                                )
-                                if filename:
-                                    image = Image(filename=filename, file_size=file_size, user=current_user)
-                                    session.add(image)
-                                    session.flush()
-                                    session.refresh(image)
-                                    created_image_filenames.append(filename)
-                                    restored_images.append(image)
-                                    if img_entry.get("id") == old_cover_id:
-                                        cover_image = image
-                            except Exception as exc:
-                                logger.warning(f"[BACKUP IMPORT]: Failed to restore item image: {exc}")
-
-                        if restored_images:
-                            item_data["image_id"] = (cover_image or restored_images[0]).id
-
-                        trip_item = TripItem(**item_data)
-                        session.add(trip_item)
-                        session.flush()
-                        session.refresh(trip_item)
-
-                        for image in restored_images:
-                            session.add(TripItemImageLink(item_id=trip_item.id, image_id=image.id))
-
-                        for attachment in item.get("attachments", []):
-                            attachment_id = attachment.get("id")
-                            if attachment_id and attachment_id in trip_attachment_mapping:
-                                new_attachment_id = trip_attachment_mapping[attachment_id]
-                                link = TripItemAttachmentLink(
-                                    item_id=trip_item.id, attachment_id=new_attachment_id
-                                )
-                                attachment_links_to_add.append(link)
+            new_bookings = []
+            new_items = []
+            for day, new_day, trip_attachment_mapping in new_days:
+                for booking in day.get("bookings", []):
+                    booking_data = {key: booking[key] for key in booking if key not in {"id", "attachments"}}
+                    new_booking = TripBooking(**booking_data, day_id=new_day.id, trip_id=new_day.trip_id)
+                    new_bookings.append((booking, new_booking, trip_attachment_mapping))
 
-                for item in trip.get("packing_items", []):
-                    new_packing = {
-                        key: item[key] for key in item.keys() if key not in {"id", "trip_id", "trip"}
+                for item in day.get("items", []):
+                    item_data = {
+                        key: item[key]
+                        for key in item
+                        if key not in {"id", "place", "place_id", "image", "image_id", "images", "attachments"}
                     }
+                    item_data["day_id"] = new_day.id
+                    item_data["gpx"] = _gpx_of(item)
+
+                    place = item.get("place")
+                    if place and (place_id := place.get("id")):
+                        new_place = places_by_old_id.get(place_id)
+                        item_data["place_id"] = new_place.id if new_place else None
+
+                    restored = _images_of(item)
+                    if restored:
+                        cover_image = next(
+                            (image for image, ref in restored if ref == item.get("image_id")), restored[0][0]
+                        )
+                        item_data["image_id"] = cover_image.id
+
+                    new_items.append((item, TripItem(**item_data), restored, trip_attachment_mapping))
+
+            if new_bookings or new_items:
+                session.add_all([new_booking for _, new_booking, _ in new_bookings])
+                session.add_all([trip_item for _, trip_item, _, _ in new_items])
+                session.flush()
+
+            rows_to_add = []
+            for booking, new_booking, trip_attachment_mapping in new_bookings:
+                for attachment in booking.get("attachments", []):
+                    attachment_id = attachment.get("id")
+                    if attachment_id and attachment_id in trip_attachment_mapping:
+                        rows_to_add.append(
+                            TripBookingAttachmentLink(
+                                booking_id=new_booking.id,
+                                attachment_id=trip_attachment_mapping[attachment_id].id,
+                            )
+                        )
+
+            for item, trip_item, restored, trip_attachment_mapping in new_items:
+                for image, _ in restored:
+                    rows_to_add.append(TripItemImageLink(item_id=trip_item.id, image_id=image.id))
+
+                for attachment in item.get("attachments", []):
+                    attachment_id = attachment.get("id")
+                    if attachment_id and attachment_id in trip_attachment_mapping:
+                        rows_to_add.append(
+                            TripItemAttachmentLink(
+                                item_id=trip_item.id, attachment_id=trip_attachment_mapping[attachment_id].id
+                            )
+                        )
+
+            new_packing_lists = []
+            new_checklists = []
+            for trip, new_trip in zip(trips, new_trips):
+                for item in trip.get("packing_items", []):
+                    new_packing = {key: item[key] for key in item.keys() if key not in {"id", "trip_id", "trip"}}
                     new_packing["trip_id"] = new_trip.id
-                    packing_to_add.append(TripPackingListItem(**new_packing))
+                    rows_to_add.append(TripPackingListItem(**new_packing))
 
                 for item in trip.get("checklist_items", []):
-                    new_checklist = {
-                        key: item[key] for key in item.keys() if key not in {"id", "trip_id", "trip"}
-                    }
+                    new_checklist = {key: item[key] for key in item.keys() if key not in {"id", "trip_id", "trip"}}
                     new_checklist["trip_id"] = new_trip.id
-                    checklist_to_add.append(TripChecklistItem(**new_checklist))
+                    rows_to_add.append(TripChecklistItem(**new_checklist))
 
                 for packing_list in trip.get("packing_lists", []):
                     new_list = TripPackingList(name=packing_list["name"], trip_id=new_trip.id)
-                    session.add(new_list)
-                    session.flush()
-                    for item in packing_list.get("items", []):
-                        new_item = {
-                            key: item[key] for key in item.keys() if key not in {"id", "packing_list_id"}
-                        }
-                        new_item["packing_list_id"] = new_list.id
-                        packing_lists_to_add.append(TripPackingListEntry(**new_item))
+                    new_packing_lists.append((packing_list, new_list))
 
                 for checklist in trip.get("checklists", []):
                     new_checklist_list = TripChecklist(name=checklist["name"], trip_id=new_trip.id)
-                    session.add(new_checklist_list)
-                    session.flush()
-                    for item in checklist.get("items", []):
-                        new_item = {
-                            key: item[key] for key in item.keys() if key not in {"id", "checklist_id"}
-                        }
-                        new_item["checklist_id"] = new_checklist_list.id
-                        checklists_to_add.append(TripChecklistEntry(**new_item))
-
-            if attachment_links_to_add:
-                session.add_all(attachment_links_to_add)
+                    new_checklists.append((checklist, new_checklist_list))
 
-            if packing_to_add:
-                session.add_all(packing_to_add)
+            if new_packing_lists or new_checklists:
+                session.add_all([new_list for _, new_list in new_packing_lists])
+                session.add_all([new_list for _, new_list in new_checklists])
+                session.flush()
 
-            if checklist_to_add:
-                session.add_all(checklist_to_add)
+            for packing_list, new_list in new_packing_lists:
+                for item in packing_list.get("items", []):
+                    new_item = {key: item[key] for key in item.keys() if key not in {"id", "packing_list_id"}}
+                    new_item["packing_list_id"] = new_list.id
+                    rows_to_add.append(TripPackingListEntry(**new_item))
 
-            if packing_lists_to_add:
-                session.add_all(packing_lists_to_add)
+            for checklist, new_list in new_checklists:
+                for item in checklist.get("items", []):
+                    new_item = {key: item[key] for key in item.keys() if key not in {"id", "checklist_id"}}
+                    new_item["checklist_id"] = new_list.id
+                    rows_to_add.append(TripChecklistEntry(**new_item))
 
-            if checklists_to_add:
-                session.add_all(checklists_to_add)
+            if rows_to_add:
+                session.add_all(rows_to_add)
 
-            # BOOM!
+            # BOOM! (ids read before commit expires every object)
+            place_ids = [place.id for place in places]
             session.commit()
-
-            return {
-                "places": [PlaceRead.serialize(p) for p in places],
-                "categories": [
-                    CategoryRead.serialize(c)
-                    for c in session.exec(
-                        select(Category)
-                        .options(selectinload(Category.image))
-                        .where(Category.user == current_user)
-                    ).all()
-                ],
-                "settings": UserRead.serialize(session.get(User, current_user)),
-            }
+            return _import_result(session, current_user, place_ids)
 
         except Exception as exc:
             logger.error(f"[BACKUP IMPORT]: {exc}")
             session.rollback()
-            for filename in created_image_filenames:
-                remove_image(filename)
+            remove_unreferenced_images(session.get_bind(), created_image_filenames)
             for trip_id in created_attachment_trips:
                 try:
                     folder = attachments_trip_folder_path(trip_id)
@@ -725,6 +768,38 @@ def process_legacy_import(
             category.name: category
             for category in session.exec(select(Category).where(Category.user == current_user)).all()
         }
+        b64_images = data.get("images", {})
+
+        # Same staging as process_backup_import: decode every image in the pool
+        # first, then insert each table with a single flush.
+        image_jobs: list[tuple[Callable[[], bytes], int]] = []
+        image_refs: dict[int, int] = {}
+
+        def _queue_image(entry: dict, size: int):
+            b64_image = b64_images.get(str(entry.get("image_id")))
+            if b64_image:
+                image_refs[id(entry)] = len(image_jobs)
+                image_jobs.append((lambda: b64img_decode(b64_image), size))
+
+        for category in data.get("categories", []):
+            if category.get("image_id"):
+                _queue_image(category, get_settings().PLACE_IMAGE_SIZE)
+        for place in data.get("places", []):
+            if place.get("image_id"):
+                _queue_image(place, get_settings().PLACE_IMAGE_SIZE)
+        for trip in data.get("trips", []):
+            if trip.get("image_id"):
+                _queue_image(trip, get_settings().TRIP_IMAGE_SIZE)
+            for day in trip.get("days", []):
+                for item in day.get("items", []):
+                    if item.get("image_id"):
+                        _queue_image(item, get_settings().TRIP_IMAGE_SIZE)
+
+        images = _import_images(session, current_user, image_jobs, created_image_filenames)
+
+        def _image_of(entry: dict) -> Image | None:
+            idx = image_refs.get(id(entry))
+            return images[idx] if idx is not None else None
 
         categories_to_add = []
         for category in data.get("categories", []):
@@ -735,34 +810,23 @@ def process_legacy_import(
                 if category.get("color"):
                     category_exists.color = category.get("color")
 
-                if category.get("image_id"):
-                    b64_image = data.get("images", {}).get(str(category.get("image_id")))
-                    if b64_image:
-                        image_bytes = b64img_decode(b64_image)
-                        filename, file_size = save_image_to_file(
-                            image_bytes, get_settings().PLACE_IMAGE_SIZE
-                        )
-                        if not filename:
-                            raise HTTPException(status_code=500, detail="Error saving image")
-
-                        image = Image(filename=filename, file_size=file_size, user=current_user)
-                        session.add(image)
-                        session.flush()
-                        session.refresh(image)
-                        created_image_filenames.append(filename)
+                if id(category) in image_refs:
+                    image = _image_of(category)
+                    if not image:
+                        raise HTTPException(status_code=500, detail="Error saving image")
 
-                        if category_exists.image_id:
-                            old_image = session.get(Image, category_exists.image_id)
-                            try:
-                                session.delete(old_image)
-                                category_exists.image_id = None
-                                session.flush()
-                            except Exception:
-                                raise HTTPException(
-                                    status_code=500, detail="Failed to remove old image during import"
-                                )
+                    if category_exists.image_id:
+                        old_image = session.get(Image, category_exists.image_id)
+                        try:
+                            session.delete(old_image)
+                            category_exists.image_id = None
+                            session.flush()
+                        except Exception:
+                            raise HTTPException(
+                                status_code=500, detail="Failed to remove old image during import"
+                            )
 
-                        category_exists.image_id = image.id
+                    category_exists.image_id = image.id
 
                 session.add(category_exists)
                 existing_categories[category_name] = category_exists
@@ -774,32 +838,21 @@ def process_legacy_import(
             category_data["user"] = current_user
 
             if category.get("image_id"):
-                b64_image = data.get("images", {}).get(str(category.get("image_id")))
-                if b64_image is None:
+                if id(category) not in image_refs:
                     continue
-
-                image_bytes = b64img_decode(b64_image)
-                filename, file_size = save_image_to_file(image_bytes, get_settings().PLACE_IMAGE_SIZE)
-                if filename:
-                    image = Image(filename=filename, file_size=file_size, user=current_user)
-                    session.add(image)
-                    session.flush()
-                    session.refresh(image)
-                    created_image_filenames.append(filename)
+                if image := _image_of(category):
                     category_data["image_id"] = image.id
 
-            new_category = Category(**category_data)
-            categories_to_add.append(new_category)
-            session.add(new_category)
+            categories_to_add.append(Category(**category_data))
 
         if categories_to_add:
+            session.add_all(categories_to_add)
             session.flush()
             for category in categories_to_add:
                 existing_categories[category.name] = category
 
         places = []
-        places_to_add = []
-        place_old_ids = []
+        places_by_old_id: dict[int, Place] = {}
         for place in data.get("places", []):
             category_name = place.get("category", {}).get("name")
             category = existing_categories.get(category_name)
@@ -813,27 +866,15 @@ def process_legacy_import(
             }
             place_data["user"] = current_user
             place_data["category_id"] = category.id
-
-            if place.get("image_id"):
-                b64_image = data.get("images", {}).get(str(place.get("image_id")))
-                if b64_image:
-                    image_bytes = b64img_decode(b64_image)
-                    filename, file_size = save_image_to_file(image_bytes, get_settings().PLACE_IMAGE_SIZE)
-                    if filename:
-                        image = Image(filename=filename, file_size=file_size, user=current_user)
-                        session.add(image)
-                        session.flush()
-                        session.refresh(image)
-                        created_image_filenames.append(filename)
-                        place_data["image_id"] = image.id
+            if image := _image_of(place):
+                place_data["image_id"] = image.id
 
             new_place = Place(**place_data)
-            places_to_add.append(new_place)
             places.append(new_place)
-            place_old_ids.append(place.get("id"))
+            places_by_old_id[place.get("id")] = new_place
 
-        if places_to_add:
-            session.add_all(places_to_add)
+        if places:
+            session.add_all(places)
             session.flush()
 
         db_user = session.get(User, current_user)
@@ -857,113 +898,81 @@ def process_legacy_import(
                 db_user.do_not_display = ",".join(settings_data["do_not_display"])
 
             session.add(db_user)
-            session.flush()
 
-        trip_place_id_map = {old_id: new_p.id for old_id, new_p in zip(place_old_ids, places)}
-        for trip in data.get("trips", []):
+        trips = data.get("trips", [])
+        new_trips = []
+        for trip in trips:
             trip_data = {
                 key: trip[key]
                 for key in trip.keys()
                 if key not in {"id", "image", "image_id", "places", "days", "shared"}
             }
             trip_data["user"] = current_user
-
-            if trip.get("image_id"):
-                b64_image = data.get("images", {}).get(str(trip.get("image_id")))
-                if b64_image:
-                    image_bytes = b64img_decode(b64_image)
-                    filename, file_size = save_image_to_file(image_bytes, get_settings().TRIP_IMAGE_SIZE)
-                    if filename:
-                        image = Image(filename=filename, file_size=file_size, user=current_user)
-                        session.add(image)
-                        session.flush()
-                        session.refresh(image)
-                        created_image_filenames.append(filename)
-                        trip_data["image_id"] = image.id
+            if image := _image_of(trip):
+                trip_data["image_id"] = image.id
 
             new_trip = Trip(**trip_data)
-            session.add(new_trip)
-            session.flush()
+            new_trip.places = [
+                places_by_old_id[place["id"]] for place in trip.get("places", []) if place["id"] in places_by_old_id
+            ]
+            new_trips.append(new_trip)
 
-            for place in trip.get("places", []):
-                old_id = place["id"]
-                new_place_id = trip_place_id_map.get(old_id)
-                if new_place_id:
-                    db_place = session.get(Place, new_place_id)
-                    if db_place:
-                        new_trip.places.append(db_place)
+        if new_trips:
+            session.add_all(new_trips)
+            session.flush()
 
+        new_days = []
+        for trip, new_trip in zip(trips, new_trips):
             for day in trip.get("days", []):
                 day_data = {key: day[key] for key in day if key not in {"id", "items"}}
-                new_day = TripDay(**day_data, trip_id=new_trip.id)
-                session.add(new_day)
-                session.flush()
+                new_days.append((day, TripDay(**day_data, trip_id=new_trip.id)))
 
-                for item in day.get("items", []):
-                    item_data = {
-                        key: item[key]
-                        for key in item
-                        if key not in {"id", "place", "place_id", "image", "image_id"}
-                    }
-                    item_data["day_id"] = new_day.id
+        if new_days:
+            session.add_all([new_day for _, new_day in new_days])
+            session.flush()
 
-                    place = item.get("place")
-                    if (
-                        place
-                        and (place_id := place.get("id"))
-                        and (new_place_id := trip_place_id_map.get(place_id))
-                    ):
-                        item_data["place_id"] = new_place_id
-
-                    cover_image: Image | None = None
-                    if item.get("image_id"):
-                        b64_image = data.get("images", {}).get(str(item.get("image_id")))
-                        if b64_image:
-                            image_bytes = b64img_decode(b64_image)
-                            filename, file_size = save_image_to_file(
-                                image_bytes, get_settings().TRIP_IMAGE_SIZE
-                            )
-                            if filename:
-                                image = Image(filename=filename, file_size=file_size, user=current_user)
-                                session.add(image)
-                                session.flush()
-                                session.refresh(image)
-                                created_image_filenames.append(filename)
-                                item_data["image_id"] = image.id
-                                cover_image = image
+        new_items = []
+        for day, new_day in new_days:
+            for item in day.get("items", []):
+                item_data = {
+                    key: item[key] for key in item if key not in {"id", "place", "place_id", "image", "image_id"}
+                }
+                item_data["day_id"] = new_day.id
+
+                place = item.get("place")
+                if place and (new_place := places_by_old_id.get(place.get("id"))):
+                    item_data["place_id"] = new_place.id
 
-                    trip_item = TripItem(**item_data)
-                    session.add(trip_item)
-                    session.flush()
+                cover_image = _image_of(item)
+                if cover_image:
+                    item_data["image_id"] = cover_image.id
+                new_items.append((TripItem(**item_data), cover_image))
 
-                    # Link the cover into the gallery so it shows in the multi-image view.
-                    if cover_image:
-                        session.add(TripItemImageLink(item_id=trip_item.id, image_id=cover_image.id))
+        if new_items:
+            session.add_all([trip_item for trip_item, _ in new_items])
+            session.flush()
 
+        # Link the cover into the gallery so it shows in the multi-image view.
+        session.add_all(
+            [
+                TripItemImageLink(item_id=trip_item.id, image_id=cover_image.id)
+                for trip_item, cover_image in new_items
+                if cover_image
+            ]
+        )
+
+        place_ids = [place.id for place in places]
         session.commit()
-        return {
-            "places": [PlaceRead.serialize(p) for p in places],
-            "categories": [
-                CategoryRead.serialize(c)
-                for c in session.exec(
-                    select(Category)
-                    .options(selectinload(Category.image))
-                    .where(Category.user == current_user)
-                ).all()
-            ],
-            "settings": UserRead.serialize(session.get(User, current_user)),
-        }
+        return _import_result(session, current_user, place_ids)
 
     except HTTPException:
         session.rollback()
-        for filename in created_image_filenames:
-            remove_image(filename)
+        remove_unreferenced_images(session.get_bind(), created_image_filenames)
         raise
     except Exception as exc:
         logger.error(f"[LEGACY IMPORT]: {exc}")
         session.rollback()
-        for filename in created_image_filenames:
-            remove_image(filename)
+        remove_unreferenced_images(session.get_bind(), created_image_filenames)
         raise HTTPException(status_code=400, detail="Bad request")
 
 
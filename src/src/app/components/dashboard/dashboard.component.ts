@@ -51,7 +51,7 @@ import {
   createMap,
   placeToMarker,
   createClusterGroup,
-  gpxToPolyline,
+  gpxTrackPolyline,
   isPointInBounds,
   placeToDotMarker,
   openNavigation,
@@ -913,45 +913,27 @@ export class DashboardComponent implements OnInit, AfterViewInit {
     }
     this.gpxLayerGroup.clearLayers();
 
-    try {
-      const gpxPolyline = gpxToPolyline(gpx);
-      const selectedPlaceWithGPX = { ...selected, gpx };
-
-      gpxPolyline.on('click', () => {
-        this.selectedPlaceGPX.set(selectedPlaceWithGPX);
-      });
-      this.gpxLayerGroup?.addLayer(gpxPolyline);
-      this.map.fitBounds(gpxPolyline.getBounds(), { padding: [20, 20] });
-    } catch {
-      this.utilsService.toast(
-        'error',
-        this.translocoService.translate('common.status.error'),
-        this.translocoService.translate('messages.could_not_parse_gpx'),
-      );
-    }
+    const leafletMap = this.map;
+    const gpxPolyline = gpxTrackPolyline(leafletMap, (zoom) => this.apiService.getGPXTrack(gpx, zoom), {
+      onLoad: (track) => leafletMap.fitBounds(track.getBounds(), { padding: [20, 20] }),
+      onError: () =>
+        this.utilsService.toast(
+          'error',
+          this.translocoService.translate('common.status.error'),
+          this.translocoService.translate('messages.could_not_retrieve_gpx'),
+        ),
+    });
+    gpxPolyline.on('click', () => {
+      this.selectedPlaceGPX.set(selected);
+    });
+    this.gpxLayerGroup.addLayer(gpxPolyline);
     this.closePlaceBox();
   }
 
   getPlaceGPX() {
     const selected = this.selectedPlace();
-    if (!selected) return;
-
-    this.apiService
-      .getPlaceGPX(selected.id)
-      .pipe(take(1))
-      .subscribe({
-        next: (p) => {
-          if (!p.gpx) {
-            this.utilsService.toast(
-              'error',
-              this.translocoService.translate('common.status.error'),
-              this.translocoService.translate('messages.could_not_retrieve_gpx'),
-            );
-            return;
-          }
-          this.displayGPXOnMap(p.gpx);
-        },
-      });
+    if (!selected?.gpx) return;
+    this.displayGPXOnMap(selected.gpx);
   }
 
   toggleSettings() {
@@ -1295,8 +1277,12 @@ export class DashboardComponent implements OnInit, AfterViewInit {
     const selected = this.selectedPlaceGPX();
     if (!selected?.gpx) return;
 
-    const dataBlob = new Blob([selected.gpx]);
-    saveBlobAs(dataBlob, `TRIP_${selected.name}.gpx`);
+    this.apiService
+      .getGPXFile(selected.gpx)
+      .pipe(take(1))
+      .subscribe({
+        next: (dataBlob) => saveBlobAs(dataBlob, `TRIP_${selected.name}.gpx`),
+      });
   }
 
   removePlaceGPX() {
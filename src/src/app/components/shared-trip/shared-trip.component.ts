@@ -43,7 +43,7 @@ import {
   createClusterGroup,
   openNavigation,
   tripDayMarker,
-  gpxToPolyline,
+  gpxTrackPolyline,
   toDotMarker,
   getGeolocationLatLng,
 } from '../../shared/map';
@@ -544,7 +544,10 @@ export class SharedTripComponent implements AfterViewInit, OnDestroy {
           });
           layerGroup.addLayer(marker);
         });
-        data.gpxData.forEach((gpx) => layerGroup.addLayer(gpxToPolyline(gpx)));
+        const leafletMap = this.map;
+        data.gpxData.forEach((gpx) =>
+          layerGroup.addLayer(gpxTrackPolyline(leafletMap, (zoom) => this.apiService.getGPXTrack(gpx, zoom))),
+        );
 
         this.tripMapAntLayer = layerGroup;
         requestAnimationFrame(() => {
@@ -1217,18 +1220,19 @@ export class SharedTripComponent implements AfterViewInit, OnDestroy {
     if (!this.gpxLayerGroup) this.gpxLayerGroup = L.layerGroup().addTo(this.map);
     this.gpxLayerGroup.clearLayers();
 
-    try {
-      const polyline = gpxToPolyline(item.gpx);
-      this.gpxLayerGroup.addLayer(polyline);
-      this.map.fitBounds(polyline.getBounds(), { padding: [20, 20] });
-      this.displayedItemGpxId.set(item.id);
-    } catch {
-      this.utilsService.toast(
-        'error',
-        this.translocoService.translate('common.status.error'),
-        this.translocoService.translate('messages.could_not_parse_gpx'),
-      );
-    }
+    const leafletMap = this.map;
+    const gpx = item.gpx;
+    const polyline = gpxTrackPolyline(leafletMap, (zoom) => this.apiService.getGPXTrack(gpx, zoom), {
+      onLoad: (track) => leafletMap.fitBounds(track.getBounds(), { padding: [20, 20] }),
+      onError: () =>
+        this.utilsService.toast(
+          'error',
+          this.translocoService.translate('common.status.error'),
+          this.translocoService.translate('messages.could_not_retrieve_gpx'),
+        ),
+    });
+    this.gpxLayerGroup.addLayer(polyline);
+    this.displayedItemGpxId.set(item.id);
   }
 
   clearItemGPX() {
@@ -1338,8 +1342,12 @@ export class SharedTripComponent implements AfterViewInit, OnDestroy {
     if (!gpx) return;
 
     const itemName = item?.text || placeItems[this.selectedPlaceActiveTabIndex()]?.text || 'item';
-    const dataBlob = new Blob([gpx]);
-    saveBlobAs(dataBlob, `${tripFilename(this.trip()!.name)}_${itemName}.gpx`);
+    this.apiService
+      .getGPXFile(gpx)
+      .pipe(take(1))
+      .subscribe({
+        next: (dataBlob) => saveBlobAs(dataBlob, `${tripFilename(this.trip()!.name)}_${itemName}.gpx`),
+      });
   }
 
   itemToNavigation() {
@@ -39,13 +39,14 @@ import {
   HighlightData,
 } from '../../types/trip';
 import { Category, Place } from '../../types/poi';
+import { RoutingProfile } from '../../types/provider';
 import {
   createMap,
   placeToMarker,
   createClusterGroup,
   openNavigation,
   tripDayMarker,
-  gpxToPolyline,
+  gpxTrackPolyline,
   toDotMarker,
   getGeolocationLatLng,
 } from '../../shared/map';
@@ -600,7 +601,10 @@ export class TripComponent implements AfterViewInit, OnDestroy {
           });
           layerGroup.addLayer(marker);
         });
-        data.gpxData.forEach((gpx) => layerGroup.addLayer(gpxToPolyline(gpx)));
+        const leafletMap = this.map;
+        data.gpxData.forEach((gpx) =>
+          layerGroup.addLayer(gpxTrackPolyline(leafletMap, (zoom) => this.apiService.getGPXTrack(gpx, zoom))),
+        );
 
         this.tripMapAntLayer = layerGroup;
         requestAnimationFrame(() => {
@@ -1508,18 +1512,19 @@ export class TripComponent implements AfterViewInit, OnDestroy {
     if (!this.gpxLayerGroup) this.gpxLayerGroup = L.layerGroup().addTo(this.map);
     this.gpxLayerGroup.clearLayers();
 
-    try {
-      const polyline = gpxToPolyline(item.gpx);
-      this.gpxLayerGroup.addLayer(polyline);
-      this.map.fitBounds(polyline.getBounds(), { padding: [20, 20] });
-      this.displayedItemGpxId.set(item.id);
-    } catch {
-      this.utilsService.toast(
-        'error',
-        this.translocoService.translate('common.status.error'),
-        this.translocoService.translate('messages.could_not_parse_gpx'),
-      );
-    }
+    const leafletMap = this.map;
+    const gpx = item.gpx;
+    const polyline = gpxTrackPolyline(leafletMap, (zoom) => this.apiService.getGPXTrack(gpx, zoom), {
+      onLoad: (track) => leafletMap.fitBounds(track.getBounds(), { padding: [20, 20] }),
+      onError: () =>
+        this.utilsService.toast(
+          'error',
+          this.translocoService.translate('common.status.error'),
+          this.translocoService.translate('messages.could_not_retrieve_gpx'),
+        ),
+    });
+    this.gpxLayerGroup.addLayer(polyline);
+    this.displayedItemGpxId.set(item.id);
   }
 
   clearItemGPX() {
@@ -2897,8 +2902,12 @@ export class TripComponent implements AfterViewInit, OnDestroy {
     if (!gpx) return;
 
     const itemName = item?.text || placeItems[this.selectedPlaceActiveTabIndex()]?.text || 'item';
-    const dataBlob = new Blob([gpx]);
-    saveBlobAs(dataBlob, `${tripFilename(this.trip()!.name)}_${itemName}.gpx`);
+    this.apiService
+      .getGPXFile(gpx)
+      .pipe(take(1))
+      .subscribe({
+        next: (dataBlob) => saveBlobAs(dataBlob, `${tripFilename(this.trip()!.name)}_${itemName}.gpx`),
+      });
   }
 
   itemToNavigation() {
@@ -3453,49 +3462,62 @@ export class TripComponent implements AfterViewInit, OnDestroy {
       this.tripMapAntLayer.addTo(this.map);
     });
 
-    let completedRoutes = 0;
-    routeSegments.forEach((segment, index) => {
+    // Consecutive legs sharing a profile are fetched in a single /routes call
+    const runs: Array<{ profile: RoutingProfile; segments: typeof routeSegments }> = [];
+    routeSegments.forEach((segment) => {
       const profile = this.routeManager.getProfile(segment.start, segment.end);
+      const last = runs[runs.length - 1];
+      if (last?.profile === profile) last.segments.push(segment);
+      else runs.push({ profile, segments: [segment] });
+    });
+
+    let completedRoutes = 0;
+    const updateProgress = (done: number) => {
+      completedRoutes += done;
+      this.utilsService.setLoading(
+        completedRoutes === routeSegments.length
+          ? ''
+          : this.translocoService.translate('routing.calculating_count', {
+              n: completedRoutes,
+              count: routeSegments.length,
+            }),
+      );
+    };
+    const routingError = (err: unknown) => {
+      this.utilsService.toast(
+        'error',
+        this.translocoService.translate('routing.error'),
+        this.translocoService.translate('routing.failed'),
+      );
+      console.error('Routing error:', err);
+    };
+
+    runs.forEach(({ profile, segments }) => {
+      const points = [segments[0].start, ...segments.map((segment) => segment.end)];
       this.apiService
-        .completionRouting({
-          coordinates: [
-            { lat: segment.start[0], lng: segment.start[1] },
-            { lat: segment.end[0], lng: segment.end[1] },
-          ],
-          profile,
-        })
+        .completionRoutingLegs({ coordinates: points.map(([lat, lng]) => ({ lat, lng })), profile })
         .subscribe({
-          next: (resp) => {
-            completedRoutes++;
-            this.utilsService.setLoading(
-              completedRoutes === routeSegments.length
-                ? ''
-                : this.translocoService.translate('routing.calculating_count', {
-                    n: completedRoutes,
-                    count: routeSegments.length,
-                  }),
-            );
+          next: (legs) => {
+            updateProgress(segments.length);
+            legs.forEach((resp, index) => {
+              const segment = segments[index];
+              if (!resp) return routingError(`no route for ${segment.start} -> ${segment.end}`);
+
+              const layer = this.routeManager.addRoute({
+                id: this.routeManager.createRouteId(segment.start, segment.end, profile),
+                coordinates: resp.coordinates,
+                distance: resp.distance ?? 0,
+                duration: resp.duration ?? 0,
+                profile,
+              });
 
-            const layer = this.routeManager.addRoute({
-              id: this.routeManager.createRouteId(segment.start, segment.end, profile),
-              coordinates: resp.coordinates,
-              distance: resp.distance ?? 0,
-              duration: resp.duration ?? 0,
-              profile,
+              const currentMap = this.map;
+              if (currentMap) layer.addTo(currentMap);
             });
-
-            const currentMap = this.map;
-            if (currentMap) layer.addTo(currentMap);
           },
           error: (err) => {
-            completedRoutes++;
-            if (completedRoutes === routeSegments.length) this.utilsService.setLoading('');
-            this.utilsService.toast(
-              'error',
-              this.translocoService.translate('routing.error'),
-              this.translocoService.translate('routing.failed'),
-            );
-            console.error(`Routing error for segment ${index + 1}:`, err);
+            updateProgress(segments.length);
+            routingError(err);
           },
         });
     });
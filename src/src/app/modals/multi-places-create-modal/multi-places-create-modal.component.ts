@@ -8,6 +8,7 @@ import { PlaceCreateModalComponent } from '../place-create-modal/place-create-mo
 import { map, take } from 'rxjs';
 import { DialogModule } from 'primeng/dialog';
 import { TripBase } from '../../types/trip';
+import { ProviderPlaceResult } from '../../types/provider';
 import { toSignal } from '@angular/core/rxjs-interop';
 import { PopoverModule } from 'primeng/popover';
 import { YesNoModalComponent } from '../yes-no-modal/yes-no-modal.component';
@@ -39,20 +40,13 @@ export class MultiPlacesCreateModalComponent {
   categoryIdByName = computed(() => new Map(this.categories().map((c: Category) => [c.name, c.id])));
   validPlaces = computed(() => this.places().filter((p) => this.isPlaceValid(p)).length);
   hasInvalidPlace = computed(() => this.places().some((p) => !this.isPlaceValid(p)));
+  // Imported places the server matched to an existing place of the user (duplicate_of)
+  duplicateIds = signal<Set<number>>(new Set());
   duplicatePlaceNames = computed(() => {
-    const places = this.places();
-    const seen = new Map<string, Place[]>();
-
-    places.forEach((p) => {
-      const key = `${p.name?.trim().toLowerCase() || ''}_${p.lat?.toFixed(6) || ''}_${p.lng?.toFixed(6) || ''}`;
-      if (!seen.has(key)) seen.set(key, []);
-      seen.get(key)!.push(p);
-    });
-    const duplicateNames: string[] = [];
-    seen.forEach((group) => {
-      if (group.length > 1 && group[0].name) duplicateNames.push(group[0].name);
-    });
-    return duplicateNames;
+    const duplicateIds = this.duplicateIds();
+    return this.places()
+      .filter((p) => duplicateIds.has(p.id) && p.name)
+      .map((p) => p.name);
   });
 
   hasDuplicates = computed(() => this.duplicatePlaceNames().length > 0);
@@ -67,10 +61,12 @@ export class MultiPlacesCreateModalComponent {
       const categories = this.categories();
       if (!categories.length || this.places().length) return;
 
-      const parsedPlaces = this.config.data.places.map((p: Place, i: number) => {
-        const category_id = this.categoryIdByName().get(p.category as unknown as string);
-        return { ...p, id: i, category_id };
+      const results: ProviderPlaceResult[] = this.config.data.places;
+      const parsedPlaces = results.map((p, i) => {
+        const category_id = this.categoryIdByName().get(p.category ?? '');
+        return { ...p, id: i, category_id } as unknown as Place;
       });
+      this.duplicateIds.set(new Set(results.flatMap((p, i) => (p.duplicate_of != null ? [i] : []))));
 
       this.sortAndSetPlaces(parsedPlaces);
     });
@@ -188,17 +184,7 @@ export class MultiPlacesCreateModalComponent {
   }
 
   removeDuplicates() {
-    const seen = new Map<string, Place>();
-    const unique: Place[] = [];
-
-    this.places().forEach((p) => {
-      const key = `${p.name?.trim().toLowerCase() || ''}_${p.lat?.toFixed(6) || ''}_${p.lng?.toFixed(6) || ''}`;
-      if (!seen.has(key)) {
-        seen.set(key, p);
-        unique.push(p);
-      }
-    });
-
-    this.sortAndSetPlaces(unique);
+    const duplicateIds = this.duplicateIds();
+    this.places.update((places) => places.filter((p) => !duplicateIds.has(p.id)));
   }
 }
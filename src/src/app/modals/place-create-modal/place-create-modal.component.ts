@@ -156,7 +156,6 @@ export class PlaceCreateModalComponent {
     } else {
       delete ret['image_id'];
     }
-    if (ret['gpx'] == '1') delete ret['gpx'];
     if (!ret['links']?.length) ret['links'] = null;
     ret['lat'] = +ret['lat'];
     ret['lng'] = +ret['lng'];
@@ -19,7 +19,7 @@ import { InputGroupAddonModule } from 'primeng/inputgroupaddon';
 import { Popover, PopoverModule } from 'primeng/popover';
 import { ApiService } from '../../services/api.service';
 import { take } from 'rxjs';
-import { TranslocoDirective, TranslocoService } from '@jsverse/transloco';
+import { TranslocoDirective } from '@jsverse/transloco';
 
 /** One gallery slot while editing: an existing image (`id`) or a freshly picked one (`data`). */
 interface EditImage {
@@ -77,7 +77,6 @@ export class TripCreateDayItemModalComponent {
     private config: DynamicDialogConfig,
     private apiService: ApiService,
     private utilsService: UtilsService,
-    private translocoService: TranslocoService,
   ) {
     this.statuses = this.utilsService.statuses;
 
@@ -186,7 +185,6 @@ export class TripCreateDayItemModalComponent {
     }
     ret['images'] = this.images().map((img) => (img.id != null ? { id: img.id } : { data: img.data }));
     ret['cover_index'] = this.coverIndex();
-    if (ret['gpx'] == '1') delete ret['gpx'];
     if (!ret['place']) ret['place'] = null;
     if (ret['attachments']) {
       ret['attachment_ids'] = ret['attachments'];
@@ -205,28 +203,10 @@ export class TripCreateDayItemModalComponent {
     if (!this.itemForm.get('text')?.value) this.itemForm.get('text')?.setValue(p.name);
     if (p.description && !this.itemForm.get('comment')?.value) this.itemForm.get('comment')?.setValue(p.description);
 
-    // Places embedded in the trip carry a '1' placeholder instead of the real GPX (payload-size
-    // optimization) so the full track has to be fetched separately before it can be copied onto the item.
-    if (p.gpx === '1' && !this.itemForm.get('gpx')?.value) {
-      this.apiService
-        .getPlaceGPX(p.id)
-        .pipe(take(1))
-        .subscribe({
-          next: (full) => {
-            if (!full.gpx || full.gpx === '1') return;
-            if (this.itemForm.get('place')?.value !== pid) return;
-            if (this.itemForm.get('gpx')?.value) return;
-            this.itemForm.get('gpx')?.setValue(full.gpx);
-            this.itemForm.get('gpx')?.markAsDirty();
-          },
-          error: () => {
-            this.utilsService.toast(
-              'error',
-              this.translocoService.translate('common.status.error'),
-              this.translocoService.translate('messages.could_not_retrieve_gpx'),
-            );
-          },
-        });
+    // The place's track is copied by reference: the backend takes a known track digest as is
+    if (p.gpx && !this.itemForm.get('gpx')?.value) {
+      this.itemForm.get('gpx')?.setValue(p.gpx);
+      this.itemForm.get('gpx')?.markAsDirty();
     }
   }
 
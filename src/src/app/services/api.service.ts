@@ -1,6 +1,6 @@
 import { inject, Injectable } from '@angular/core';
 import { HttpClient } from '@angular/common/http';
-import { Category, ProviderBoundaries, Place } from '../types/poi';
+import { Category, GPXTrackGeometry, ProviderBoundaries, Place } from '../types/poi';
 import { RoutingQuery, RoutingResponse, ProviderPlaceResult } from '../types/provider';
 import { BehaviorSubject, map, Observable, shareReplay, take, tap } from 'rxjs';
 import { Info } from '../types/info';
@@ -24,6 +24,7 @@ import {
 } from '../types/trip';
 import { AdminUser, APP_CONFIG_MB_FIELDS, AppConfig, MagicLink } from '../types/admin';
 import { TranslocoService } from '@jsverse/transloco';
+import { decodePolyline } from '../shared/utils';
 
 const NO_AUTH_HEADER = {
   no_auth: '1',
@@ -132,8 +133,19 @@ export class ApiService {
     return this.httpClient.delete<null>(`${this.apiBaseUrl}/places/${placeId}`);
   }
 
-  getPlaceGPX(placeId: number): Observable<Place> {
-    return this.httpClient.get<Place>(`${this.apiBaseUrl}/places/${placeId}`);
+  getGPXTrack(digest: string, zoom?: number): Observable<GPXTrackGeometry> {
+    const params = zoom !== undefined ? { zoom } : undefined;
+    return this.httpClient.get<GPXTrackGeometry>(`${this.apiBaseUrl}/gpx/${digest}`, {
+      headers: NO_AUTH_HEADER,
+      params,
+    });
+  }
+
+  getGPXFile(digest: string): Observable<Blob> {
+    return this.httpClient.get(`${this.apiBaseUrl}/gpx/${digest}/file`, {
+      headers: NO_AUTH_HEADER,
+      responseType: 'blob',
+    });
   }
 
   getTrips(): Observable<TripBase[]> {
@@ -519,7 +531,21 @@ export class ApiService {
   }
 
   completionRouting(data: RoutingQuery): Observable<RoutingResponse> {
-    return this.httpClient.post<RoutingResponse>(`${this.apiBaseUrl}/completions/route`, data);
+    // Fetched as an encoded polyline, a fraction of the coordinates' JSON
+    return this.httpClient
+      .post<RoutingResponse>(`${this.apiBaseUrl}/completions/route`, { ...data, encoding: 'polyline' })
+      .pipe(map((resp) => ({ ...resp, coordinates: decodePolyline(resp.polyline ?? '') })));
+  }
+
+  completionRoutingLegs(data: RoutingQuery): Observable<(RoutingResponse | null)[]> {
+    // Every consecutive leg of the coordinates in one call, null for a leg that failed
+    return this.httpClient
+      .post<(RoutingResponse | null)[]>(`${this.apiBaseUrl}/completions/routes`, { ...data, encoding: 'polyline' })
+      .pipe(
+        map((legs) =>
+          legs.map((resp) => (resp ? { ...resp, coordinates: decodePolyline(resp.polyline ?? '') } : null)),
+        ),
+      );
   }
 
   completionBulk(data: string[]): Observable<ProviderPlaceResult[]> {
@@ -38,6 +38,8 @@ import { TripItemImage } from '../../types/trip';
                focus-visible:outline-none focus-visible:ring-2 focus-visible:ring-primary-500">
             <img
               [src]="coverImg.url"
+              [attr.srcset]="coverImg.srcset"
+              sizes="160px"
               loading="lazy"
               class="size-full object-cover transition duration-500 ease-out
                  group-hover:scale-105 group-hover:brightness-105" />
@@ -54,6 +56,8 @@ import { TripItemImage } from '../../types/trip';
                      focus-visible:outline-none focus-visible:ring-2 focus-visible:ring-primary-500">
                   <img
                     [src]="img.url"
+                    [attr.srcset]="img.srcset"
+                    sizes="80px"
                     loading="lazy"
                     class="size-full object-cover transition duration-500 ease-out
                        group-hover:scale-105 group-hover:brightness-105" />
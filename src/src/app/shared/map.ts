@@ -1,9 +1,11 @@
 import * as L from 'leaflet';
 import 'leaflet.markercluster';
 import 'leaflet-contextmenu';
-import { ProviderBoundaries, Place } from '../types/poi';
+import { Observable, take } from 'rxjs';
+import { GPXTrackGeometry, ProviderBoundaries, Place } from '../types/poi';
 import { TripItem } from '../types/trip';
 
+export const GPX_MAX_ZOOM = 22;
 export const DEFAULT_TILE_URL = 'https://{s}.basemaps.cartocdn.com/rastertiles/voyager/{z}/{x}/{y}{r}.png';
 export interface ContextMenuItem {
   text: string;
@@ -138,13 +140,16 @@ export function placeToMarker(
   };
 
   const markerImage = isLowNet ? place.category.image : (place.image ?? place.category.image);
+  // The place image variants, sized for the 56px marker rather than the full image
+  const markerSrcset =
+    !isLowNet && place.image && place.image_srcset ? ` srcset="${place.image_srcset}" sizes="56px"` : '';
 
-  let markerClasses = 'w-full h-full rounded-full bg-center bg-cover bg-white dark:bg-primary-900';
+  let markerClasses = 'w-full h-full rounded-full object-cover bg-white dark:bg-primary-900';
   if (grayscale) markerClasses += ' grayscale';
 
   const iconHtml = `
     <div class="flex items-center justify-center relative rounded-full marker-anchor size-14 box-border" style="border: 2px solid ${place.category.color};">
-      <div class="${markerClasses}" style="background-image: url('${markerImage}');"></div>
+      <img class="${markerClasses}" src="${markerImage}"${markerSrcset} alt="" />
       ${gpxInBubble && place.gpx ? '<div class="absolute -top-1 -left-1 size-6 flex justify-center items-center bg-white dark:bg-primary-900 border-2 border-black rounded-full"><i class="pi pi-compass"></i></div>' : ''}
     </div>
   `;
@@ -172,16 +177,51 @@ export function placeToMarker(
   return marker;
 }
 
-export function gpxToPolyline(gpx: string): L.Polyline {
-  const parser = new DOMParser();
-  const gpxDoc = parser.parseFromString(gpx, 'application/xml');
+export interface GPXTrackOptions {
+  onLoad?: (polyline: L.Polyline) => void;
+  onError?: () => void;
+}
+
+// Tracks are served simplified for a zoom level: zooming in refetches them in more detail
+export function gpxTrackPolyline(
+  map: L.Map,
+  fetchTrack: (zoom: number) => Observable<GPXTrackGeometry>,
+  options: GPXTrackOptions = {},
+): L.Polyline {
+  const polyline = L.polyline([], { color: 'blue' });
+  let requestedZoom = -1;
+  let loaded = false;
+
+  const load = () => {
+    const zoom = Math.min(Math.ceil(map.getZoom()), GPX_MAX_ZOOM);
+    if (zoom <= requestedZoom) return;
+    requestedZoom = zoom;
 
-  const trkpts = Array.from(gpxDoc.querySelectorAll('trkpt'));
-  const latlngs = trkpts.map(
-    (pt) => [parseFloat(pt.getAttribute('lat')!), parseFloat(pt.getAttribute('lon')!)] as [number, number],
-  );
+    fetchTrack(zoom)
+      .pipe(take(1))
+      .subscribe({
+        next: (track) => {
+          if (zoom !== requestedZoom) return;
+          if (!track.coordinates.length) {
+            options.onError?.();
+            return;
+          }
+          polyline.setLatLngs(track.coordinates);
+          if (!loaded) {
+            loaded = true;
+            options.onLoad?.(polyline);
+          }
+        },
+        error: () => options.onError?.(),
+      });
+  };
 
-  return L.polyline(latlngs, { color: 'blue' });
+  polyline.on('add', () => {
+    map.on('zoomend', load);
+    load();
+  });
+  polyline.on('remove', () => map.off('zoomend', load));
+  return polyline;
 }
 
 export function isPointInBounds(lat: number, lng: number, bounds: ProviderBoundaries): boolean {
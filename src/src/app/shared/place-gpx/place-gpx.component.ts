@@ -1,3 +1,4 @@
+import { DecimalPipe } from '@angular/common';
 import { ChangeDetectionStrategy, Component, EventEmitter, Input, Output } from '@angular/core';
 import { ButtonModule } from 'primeng/button';
 import { Place } from '../../types/poi';
@@ -5,7 +6,7 @@ import { Place } from '../../types/poi';
 @Component({
   selector: 'app-place-gpx',
   standalone: true,
-  imports: [ButtonModule],
+  imports: [ButtonModule, DecimalPipe],
   templateUrl: './place-gpx.component.html',
   styleUrls: ['./place-gpx.component.scss'],
   changeDetection: ChangeDetectionStrategy.OnPush,
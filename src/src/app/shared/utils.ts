@@ -16,6 +16,31 @@ export function computeDistLatLng(lat1: number, lon1: number, lat2: number, lon2
   return R * c;
 }
 
+// Encoded polyline, precision 5, as [lng, lat] pairs (RoutingResponse.coordinates order)
+export function decodePolyline(encoded: string): [number, number][] {
+  const coordinates: [number, number][] = [];
+  let index = 0;
+  let lat = 0;
+  let lng = 0;
+  const next = (): number => {
+    let result = 0;
+    let shift = 0;
+    let byte: number;
+    do {
+      byte = encoded.charCodeAt(index++) - 63;
+      result |= (byte & 0x1f) << shift;
+      shift += 5;
+    } while (byte >= 0x20);
+    return result & 1 ? ~(result >> 1) : result >> 1;
+  };
+  while (index < encoded.length) {
+    lat += next();
+    lng += next();
+    coordinates.push([lng / 1e5, lat / 1e5]);
+  }
+  return coordinates;
+}
+
 export function bookingTypeIcon(type: string): string {
   const icons: Record<string, string> = {
     flight: '✈️',
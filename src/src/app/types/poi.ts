@@ -16,8 +16,10 @@ export interface Place {
   category_id?: number;
 
   user?: string;
-  gpx?: string;
+  gpx?: string; // Track digest, see getGPXTrack
+  track?: GPXTrack | null;
   image?: string;
+  image_srcset?: string | null; // Resized variants of image, for <img srcset>
   image_id?: number;
   price?: number;
   description?: string;
@@ -30,6 +32,19 @@ export interface Place {
   trip_count?: number;
 }
 
+export interface GPXTrack {
+  point_count: number;
+  distance: number; // meters
+  elevation_gain: number | null; // meters, null without elevation data
+  elevation_loss: number | null;
+  bbox: [number, number, number, number] | null; // west, south, east, north
+}
+
+export interface GPXTrackGeometry {
+  point_count: number;
+  coordinates: [number, number][];
+}
+
 export interface ProviderBoundaries {
   northeast: { lat: number; lng: number };
   southwest: { lat: number; lng: number };
@@ -12,17 +12,21 @@ export interface ProviderPlaceResult {
   description: string;
   image: string;
   restroom?: boolean;
+  duplicate_of?: number | null;
 }
 
 export interface RoutingResponse {
   distance: number;
   duration: number;
-  coordinates: [number, number][];
+  coordinates: [number, number][]; // [lng, lat]
+  polyline?: string | null; // With encoding 'polyline'
 }
 
 export interface RoutingQuery {
   coordinates: { lat: number; lng: number }[];
   profile: RoutingProfile;
+  tolerance?: number; // meters, server-side Douglas-Peucker simplification
+  encoding?: 'coordinates' | 'polyline';
 }
 
 export interface RouteData {
@@ -1,4 +1,4 @@
-import { Place } from './poi';
+import { GPXTrack, Place } from './poi';
 
 export interface TripBase {
   id: number;
@@ -79,6 +79,7 @@ export interface TripItem {
   image_id?: number;
   images?: TripItemImage[];
   gpx?: string;
+  track?: GPXTrack | null;
   paid_by?: string;
   attachments?: TripAttachment[];
   links?: string[];
@@ -87,6 +88,7 @@ export interface TripItem {
 export interface TripItemImage {
   id: number;
   url: string;
+  srcset: string;
 }
 
 export interface TripStatus {
@@ -113,6 +115,7 @@ export interface FlattenedTripItem {
   image_id?: number;
   images?: TripItemImage[];
   gpx?: string;
+  track?: GPXTrack | null;
   paid_by?: string;
   attachments?: TripAttachment[];
   links?: string[];